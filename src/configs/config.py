@@ -11,31 +11,86 @@ Example:
         cfg = format_config(cfg)
 
 """
-from omegaconf import DictConfig, open_dict
+from typing import Union
+import numpy as np
+from omegaconf import DictConfig, ListConfig, open_dict
 from scipy.constants import pi, Stefan_Boltzmann, zero_Celsius, day
 from astropy.constants import R_earth, g0
 
+# atm parameters that can be lists, to solve an ensemble of members at once.
+MEMBER_PARAM = ["eps_days", "k_days", "e_frac", "h_q"]
+
+
+def member_param(atm: DictConfig, name: str) -> Union[float, np.ndarray]:
+    """
+    Return an atm parameter, as an array along the member axis if it is a list.
+
+    Args:
+        atm (DictConfig): the atm part of the config.
+        name (str): name of the parameter.
+
+    Returns:
+        Union[float, np.ndarray]: the value, or the values for each member.
+    """
+    value = atm[name]
+    if isinstance(value, (ListConfig, list, tuple)):
+        return np.array(list(value), dtype=np.float64)
+    return value
+
+
+def number_members(atm: DictConfig) -> int:
+    """
+    Number of ensemble members, from the length of any list parameters.
+
+    Args:
+        atm (DictConfig): the atm part of the config.
+
+    Returns:
+        int: the number of members, or 0 if there is no ensemble.
+    """
+    lengths = set(
+        len(atm[x]) for x in MEMBER_PARAM if isinstance(atm[x], (ListConfig, list))
+    )
+    assert len(lengths) <= 1, "atm parameter lists must be the same length"
+    return lengths.pop() if lengths else 0
+
+
+def _to_cfg(value: Union[float, np.ndarray]) -> Union[float, list]:
+    # omegaconf cannot store numpy arrays.
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
 
 def derived_param(cfg: DictConfig) -> DictConfig:
     """
     Calculate dervied paramters using fundamental constants.
 
+    Any of the `MEMBER_PARAM` can be given as lists, in which case the
+    parameters derived from them are lists along the member axis.
+
     Args:
         cfg (DictConfig): constants configuration.
 
     Returns:
         DictConfig: the config with all the derived param added.
     """
+    # the atmosphere solve returns the state of its last pass.
+    assert cfg.atm.number_iterations >= 1, "atm.number_iterations must be >= 1"
     with open_dict(cfg):
         cfg.atm["temp_surface_bar"] = zero_Celsius + cfg.atm.temp_surface_bar_celsius
         cfg.atm["qlh_coeff"] = cfg.atm.rho_air * cfg.atm.c_e * cfg.atm.latent_heat_vap
         cfg.atm["qlw_coeff"] = cfg.atm.emmisivity * Stefan_Boltzmann
-        cfg.atm["eps_p"] = (
-            pi / cfg.atm.height_tropopause ** 2 / cfg.atm.nbsq / cfg.atm.k_days / day
+        number_members(cfg.atm)  # check any ensemble parameters are consistent.
+        k_days = member_param(cfg.atm, "k_days")
+        cfg.atm["eps_p"] = _to_cfg(
+            pi / cfg.atm.height_tropopause ** 2 / cfg.atm.nbsq / k_days / day
         )
-        cfg.atm["eps"] = 1.0 / cfg.atm.eps_days / day
+        cfg.atm["eps"] = _to_cfg(1.0 / member_param(cfg.atm, "eps_days") / day)
         cfg.atm["eps_u"] = cfg.atm.eps
-        cfg.atm["eps_v"] = cfg.atm.eps * cfg.atm.e_frac
+        cfg.atm["eps_v"] = _to_cfg(
+            member_param(cfg.atm, "eps") * member_param(cfg.atm, "e_frac")
+        )
         cfg.atm["b_coeff"] = float(
             (
                 g0.to_value()
@@ -45,7 +100,7 @@ def derived_param(cfg: DictConfig) -> DictConfig:
                 / cfg.atm["height_tropopause"]
             )
         )
-        cfg.atm["newtonian_cooling_coeff_k1"] = cfg.atm.b_coeff / cfg.atm.k_days / day
+        cfg.atm["newtonian_cooling_coeff_k1"] = _to_cfg(cfg.atm.b_coeff / k_days / day)
         cfg.atm["omega_2"] = 2 * (2 * pi / day)
         cfg.atm["pr_max"] = cfg.atm.pr_max_mm_day / day
         cfg.atm["beta"] = float(cfg.atm["omega_2"] / R_earth.to_value())
@@ -38,6 +38,8 @@ OCEAN_DATA_PATH = OCEAN_PATH / "DATA"
 OCEAN_RUN_PATH = OCEAN_PATH / "RUN"
 OCEAN_SRC_PATH = OCEAN_PATH / "SRC"
 OCEAN_OUTPUT_PATH = OCEAN_PATH / "output"
+OCEAN_BUILD_PATH = OCEAN_PATH / "build"
+OCEAN_SPIN_CACHE_PATH = OCEAN_PATH / "spin_cache"
 ATMOS_PATH = PROJECT_PATH / "atmos"
 ATMOS_DATA_PATH = ATMOS_PATH / "DATA"
 ATMOS_TMP_PATH = ATMOS_PATH / "tmp"
@@ -326,3 +328,7 @@ SEL_DICT = {
     "nino5": {"X": (120, 140), "Y": (-5, 5), "color": "black"},
     "nino6": {"X": (140, 160), "Y": (8, 16), "color": "black"},
 }
+
+# Limits (degrees celsius) on the mean SST of the ocean model for a run
+# not to have blown up.
+BLOW_UP_LIMITS = {"mean_pac": [15, 30], "mean_nino3.4": [20, 30]}
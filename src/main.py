@@ -23,6 +23,7 @@ from src.constants import (
 from src.utils import timeit
 from src.models.coupling import Coupling
 from src.models.model_setup import ModelSetup
+from src.models.checkpoint import Checkpoint
 from src.configs.config import format_config
 from src.wandb_utils import start_wandb
 from src.data_loading.download import get_data
@@ -63,7 +64,10 @@ def sub_main(cfg: DictConfig, unit_test: bool = False) -> None:
     if cfg.wandb:
         start_wandb(cfg, unit_test=unit_test)
 
-    setup = ModelSetup(run_p, cfg)
+    # an interrupted run is resumed in place, without copying the files again.
+    setup = ModelSetup(run_p, cfg, make_move=False)
+    if not (cfg.coup.resume and Checkpoint(setup).last_complete() >= 0):
+        setup.move_files()
     couple = Coupling(cfg, setup)
     couple.run()
 
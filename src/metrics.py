@@ -7,7 +7,7 @@ TODO:
 
 """
 import os
-from typing import Tuple
+from typing import Optional, Tuple
 import xarray as xr
 from src.constants import (
     NOAA_DATA_PATH,
@@ -135,24 +135,60 @@ def replace_nino3_4_from_noaa() -> None:
     clim.to_netcdf(str(DATA_PATH / "nino3_4_noaa_clim.nc"))
 
 
+@timeit
+def get_sst_trends(path_of_run2f: str) -> dict:
+    """
+    Get the trends and means of the sst in the nino regions.
+
+    The same "trend_" and "mean_" values as
+    `src.visualisation.nino.get_nino_trend`, without the plots.
+
+    Args:
+        path_of_run2f (str): path to the main output netcdf.
+
+    Returns:
+        dict: nino dict.
+    """
+    sst_output = can_coords(open_dataset(path_of_run2f).SST_SST)
+    sst_output = sst_output.where(sst_output != 0.0)
+    nino_dict = dict()
+
+    for reg in reversed(sorted(SEL_DICT)):
+        metric, _ = nino_calculate(sst_output, reg=reg)
+        nino_dict["trend_" + reg] = get_trend(metric, uncertainty=True).n
+        nino_dict["mean_" + reg] = metric.attrs["mean_state"]
+
+    return nino_dict
+
+
 @timeit
 def get_other_trends(
     setup: ModelSetup,
+    path_of_run2f: Optional[str] = None,
+    path_of_tcam: Optional[str] = None,
 ) -> dict:
     """
     Get trends in nino regions for other variables other than sst.
 
     Args:
         setup (ModelSetup): the filespace object to find things using.
+        path_of_run2f (Optional[str], optional): path to the main ocean
+            output netcdf. Defaults to None, which is setup.om_run2f_nc().
+        path_of_tcam (Optional[str], optional): path to the atmosphere
+            output netcdf. Defaults to None, which is setup.tcam_output().
 
     Returns:
         dict: nino dict.
     """
+    if path_of_run2f is None:
+        path_of_run2f = setup.om_run2f_nc()
+    if path_of_tcam is None:
+        path_of_tcam = setup.tcam_output()
     nino_dict = dict()
 
     for field in ["TDEEP_HMODEL", "SST_QNET", "SST_W1"]:
 
-        output = can_coords(open_dataset(setup.om_run2f_nc())[field])
+        output = can_coords(open_dataset(path_of_run2f)[field])
         output = output.where(output != 0.0)
 
         metric_l = list()
@@ -191,7 +227,7 @@ def get_other_trends(
 
     for field in ["PRtrend", "utrend", "vtrend"]:
 
-        tcam_output = can_coords(open_dataset(setup.tcam_output())[field])
+        tcam_output = can_coords(open_dataset(path_of_tcam)[field])
         for reg in reversed(sorted(SEL_DICT)):
             nino_dict["trend_" + field + "_" + reg] = float(
                 spatial_mean(sel(tcam_output, reg=reg)).values
@@ -104,11 +104,12 @@ Example:
         self.c_bar = 0.6  # C is the cloud cover. perhaps C_bar is the average.
 
 """
-from typing import Tuple, Union, Any
+from typing import Tuple, Union, Any, Optional, Dict
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy.interpolate import interp2d
-from scipy.fftpack import fft, ifft
+from scipy.fft import rfft, irfft
 from scipy.constants import zero_Celsius
 from astropy.constants import R_earth
 import matplotlib.pyplot as plt
@@ -116,9 +117,18 @@ import xarray as xr
 from typeguard import typechecked
 from omegaconf import DictConfig
 from src.models.model_setup import ModelSetup
+from src.configs.config import member_param, number_members
+from src.models.tdma import tdma_solve, tdma_factor, tdma_substitute
+from src.models.fixed_point import Anderson
+from src.models.smooth import smooth121
+from src.models.regrid import regrid
 from src.utils import timeit
 from src.constants import MODEL_NAMES, VAR_DICT
 
+# Factorised S91 operators, keyed by grid and parameters (see `Atmos.s91_factor`).
+# Kept at module level so that they persist across coupling iterations and runs.
+S91_FACTOR_CACHE: dict = {}
+
 
 class Atmos:
     """Atmos class."""
@@ -133,6 +143,16 @@ class Atmos:
         self.atm = cfg.atm
         self.setup = setup
         self.it = 0
+        # background thread for writing the outputs, see write_output.
+        if self.atm.async_write:
+            self.writer: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(
+                max_workers=1
+            )
+        else:
+            self.writer = None
+        self.writes: list = []
+        # converged state of the last solve, see warm_start.
+        self.warm: Optional[Dict[str, np.ndarray]] = None
 
         # make axes
         self.x_axis = np.linspace(0, 360 - self.atm.dx, self.atm.nx)  # degrees
@@ -162,21 +182,11 @@ class Atmos:
         self.dym = self.y_spacing * R_earth.to_value() * np.pi / 180
         self.dym_2 = self.dym * self.dym
 
-        # need to have the correct ordering of the wave numbers for fft
+        # zonal wave numbers of the rfft coefficients along x. The Nyquist wave
+        # of an even grid has no well defined derivative, so is given 0.
+        self.kk_wavenumber = np.arange(0, self.atm.nx // 2 + 1, dtype=np.float64)
         if self.atm.nx % 2 == 0:
-            self.kk_wavenumber = np.asarray(
-                list(range(0, self.atm.nx // 2))
-                + [0]
-                + list(range(-self.atm.nx // 2 + 1, 0)),
-                np.float64,
-            )
-        else:
-            self.kk_wavenumber = np.asarray(
-                list(range(0, (self.atm.nx - 1) // 2))
-                + [0]
-                + list(range(-(self.atm.nx - 1) // 2, 0)),
-                np.float64,
-            )
+            self.kk_wavenumber[-1] = 0.0
 
         # the different model names in a dict? - used by key from self.mem.
         self.names: dict = MODEL_NAMES
@@ -185,8 +195,48 @@ class Atmos:
         self.var: dict = VAR_DICT
         # temperature of the surface, cloud area fraction, surface wind, rel humidity.
 
+        # preallocated work arrays for the solvers, keyed by name and shape.
+        self._buffers: dict = {}
+
+        # convergence information from the last run, logged by the coupling.
+        self.metrics: dict = {}
+
         # END INIT.
 
+    def _buffer(self, name: str, shape: tuple, dtype: type) -> np.ndarray:
+        """Return a preallocated work array, reused between calls.
+
+        Args:
+            name (str): name of the work array.
+            shape (tuple): shape of the work array.
+            dtype (type): data type of the work array.
+
+        Returns:
+            np.ndarray: uninitialised work array.
+        """
+        key = (name, shape, dtype)
+        if key not in self._buffers:
+            self._buffers[key] = np.empty(shape, dtype=dtype)
+        return self._buffers[key]
+
+    def param(self, name: str) -> Union[float, np.ndarray]:
+        """Return an atm parameter, ready to broadcast against the fields.
+
+        For an ensemble (see `src.configs.config.member_param`) the values
+        are along the member axis, shape (member, 1, 1), so that they
+        broadcast against fields of shape (..., member, ny, nx).
+
+        Args:
+            name (str): name of the parameter, e.g. "eps_u".
+
+        Returns:
+            Union[float, np.ndarray]: the value(s) of the parameter.
+        """
+        value = member_param(self.atm, name)
+        if isinstance(value, np.ndarray):
+            return value[:, np.newaxis, np.newaxis]
+        return value
+
     @typechecked
     def f_cor(self, y_axis: np.ndarray) -> np.ndarray:
         """Corriolis force coeff. Makes beta plane approximation.
@@ -488,6 +538,64 @@ class Atmos:
             + 12 * temperature ** 2 * self.atm.delta_temp
         )
 
+    @typechecked
+    def f_flux_terms(
+        self,
+        temperature: np.ndarray,
+        u_sp: np.ndarray,
+        cloud_cover: np.ndarray,
+        rh_loc: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Fused flux kernel for alh, alw, blw and dtemp_se.
+
+        Gives the same result as `f_dqlh_dtemp`, `f_dqlw_dtemp` and
+        `f_dqlw_df`, but works on arrays, and computes the saturation
+        humidity terms once for all the variants of u_sp and cloud_cover
+        stacked along the leading axis.
+
+        Args:
+            temperature (np.ndarray): temperature in Kelvin.
+            u_sp (np.ndarray): wind speed, shape (variant, ...).
+            cloud_cover (np.ndarray): cloud cover, shape (variant, ...).
+            rh_loc (np.ndarray): relative humidity.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: alh, alw, blw,
+                dtemp_se, each of shape (variant, ...).
+        """
+        temp_c = temperature - zero_Celsius
+        q_s = (
+            self.atm.e_factor
+            * (self.atm.es_0 * np.exp(17.67 * temp_c / (temp_c + 243.5)))
+            / self.atm.p_s
+        )
+        dqs_dtemp = q_s * (17.67 * 243.5) / (temp_c + 243.5) ** 2
+        e_bar = rh_loc * q_s * self.atm.p_s / self.atm.e_factor
+        if not self.atm.vary_cloud_const:
+            a_cloud_const = self.atm.a_cloud_const
+        else:
+            # same as get_cloud_const.
+            a_cloud_const = np.where(
+                temp_c < self.atm.dc_threshold_temp,
+                self.atm.a_cloud_const_dc,
+                self.atm.a_cloud_const_norm,
+            )
+        cloud = 1 - a_cloud_const * cloud_cover ** 2
+        temp_3 = temperature ** 3
+        alh = self.atm.qlh_coeff * u_sp * dqs_dtemp * (1 - rh_loc)
+        alw = self.atm.qlw_coeff * (
+            cloud
+            * temp_3
+            * (
+                4 * self.atm.f1_bar
+                - self.atm.f2 * np.sqrt(e_bar) * (4 + temperature * dqs_dtemp / 2 / q_s)
+            )
+            + 12 * temperature ** 2 * self.atm.delta_temp
+        )
+        blw = self.atm.qlw_coeff * cloud * (temp_3 * temperature)
+        dtemp_se = -blw * self.atm.f1prime / (alh + alw)
+        return alh, alw, blw, dtemp_se
+
     @typechecked
     def f_qa(self, t_s: np.ndarray, s_p: np.ndarray) -> np.ndarray:
         """Flux qa.
@@ -551,6 +659,8 @@ class Atmos:
         uniform in our standard model.
         (N.B., v is on y_axis_v points, u,q are on y_axis_u points)
 
+        Any leading axes are treated as a stack of independent fields.
+
         Args:
             q_a (np.ndarray): surface air humidity
             u (np.ndarray): low level winds in m/s
@@ -560,15 +670,53 @@ class Atmos:
             np.ndarray: Moisture convergence in kg/m^2/s.
 
         """
+        ny = self.atm.ny
         qu = q_a * u
-        qux = ifft(1.0j * self.kk_wavenumber * fft(qu) / R_earth.to_value()).real
-        aq = (q_a[1 : self.atm.ny - 1, :] + q_a[0 : self.atm.ny - 2, :]) / 2.0
-        qv = aq * v[1 : self.atm.ny - 1, :]
-        z = np.zeros((1, self.atm.nx))
-        qv = np.concatenate((z, qv, z), axis=0)
+        qux = irfft(
+            1.0j * self.kk_wavenumber * self.f_rfft(qu) / R_earth.to_value(),
+            n=self.atm.nx,
+            workers=self.atm.fft_workers,
+        )
+        aq = (q_a[..., 1 : ny - 1, :] + q_a[..., 0 : ny - 2, :]) / 2.0
+        # qv is zero at the southern and northern boundaries.
+        qv = np.zeros(
+            np.broadcast_shapes(qu.shape[:-2], v.shape[:-2]) + (ny, self.atm.nx)
+        )
+        qv[..., 1 : ny - 1, :] = aq * v[..., 1 : ny - 1, :]
         # qvy = qv.diff('Yu')/dym
-        qvy = (qv[1 : self.atm.ny, :] - qv[0 : self.atm.ny - 1, :]) / self.dym
-        return -self.atm.h_q * (qux + qvy) * self.atm.rho_air
+        qvy = (qv[..., 1:ny, :] - qv[..., 0 : ny - 1, :]) / self.dym
+        return -self.param("h_q") * (qux + qvy) * self.atm.rho_air
+
+    def f_rfft(self, field: np.ndarray) -> np.ndarray:
+        """Fourier transform a real field in longitude.
+
+        As the field is real, only the coefficients of the non-negative
+        wave numbers (`kk_wavenumber`) are needed.
+
+        Args:
+            field (np.ndarray): real field, shape (..., nx).
+
+        Returns:
+            np.ndarray: complex coefficients, shape (..., nx // 2 + 1).
+        """
+        return rfft(field, workers=self.atm.fft_workers)
+
+    @typechecked
+    def f_residual(self, new: np.ndarray, old: np.ndarray) -> Union[np.ndarray, float]:
+        """Relative change between iterations of a field.
+
+        Args:
+            new (np.ndarray): field after the iteration, shape (..., ny, nx).
+            old (np.ndarray): field before the iteration, shape (..., ny, nx).
+
+        Returns:
+            Union[np.ndarray, float]: max |new - old| / max |new| over the grid,
+                shape (...).
+        """
+        scale = np.max(np.abs(new), axis=(-2, -1))
+        return np.max(np.abs(new - old), axis=(-2, -1)) / np.where(
+            scale > 0, scale, 1.0
+        )
 
     # ---------------- equation solvers ---------------------
 
@@ -580,6 +728,7 @@ class Atmos:
         b: np.ndarray,
         c: np.ndarray,
         d: np.ndarray,
+        out: Optional[np.ndarray] = None,
     ) -> np.ndarray:
         """tdma solver.
 
@@ -590,33 +739,92 @@ class Atmos:
         E.g.
         https://gist.github.com/cbellei/8ab3ab8551b8dfc8b081c518ccd9ada9
 
+        Solves every wavenumber, and any stacked leading axes, at once
+        using `src.models.tdma.tdma_solve`. The coefficients are not copied,
+        and the modified super-diagonal is kept in a reused work array.
+
         Args:
-            ny_loc (int): local version of ny_loc.
-            a_loc (np.ndarray): [description]
-            b (np.ndarray): [description]
-            c (np.ndarray): [description]
-            d (np.ndarray): [description]
+            ny_loc (int): local version of ny_loc, the number of equations.
+            a_loc (np.ndarray): sub-diagonal, shape (..., ny_loc, nx).
+            b (np.ndarray): diagonal, shape (..., ny_loc, nx).
+            c (np.ndarray): super-diagonal, shape (..., ny_loc, nx).
+            d (np.ndarray): right hand side, shape (..., ny_loc, nx).
+            out (Optional[np.ndarray], optional): preallocated output buffer.
+                Defaults to None, which allocates a new array.
 
         Returns:
             np.ndarray: xc
 
         """
+        assert d.shape[-2] == ny_loc
+        coeff_shape = np.broadcast_shapes(a_loc.shape, b.shape, c.shape)
+        work = self._buffer(
+            "tdma_work", (2,) + coeff_shape, np.result_type(a_loc, b, c).type
+        )
+        return tdma_solve(a_loc, b, c, d, out=out, work=work)
 
-        nf = ny_loc  # number of equations
-        ac, bc, cc, dc = map(np.array, (a_loc, b, c, d))  # copy arrays
+    def s91_key(self) -> str:
+        """Key of the S91 operator, which only depends on the grid and parameters.
 
-        for it in range(1, nf):
-            mc = ac[it, :] / bc[it - 1, :]
-            bc[it, :] = bc[it, :] - mc * cc[it - 1, :]
-            dc[it, :] = dc[it, :] - mc * dc[it - 1, :]
+        Hashes the arrays that the operator is built from, so any change to
+        the grid (e.g. y_north_lim) or the Coriolis parameter (omega_2) is a
+        new key.
 
-        xc = bc
-        xc[-1, :] = dc[-1, :] / bc[-1, :]
+        Returns:
+            str: hex digest of fcu, dym, y_axis_u, kk_wavenumber, and eps_u,
+                eps_v, eps_p and beta for every ensemble member.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for array in [
+            self.fcu,
+            self.dym,
+            self.y_axis_u,
+            self.kk_wavenumber,
+            *(member_param(self.atm, x) for x in ["eps_u", "eps_v", "eps_p", "beta"]),
+        ]:
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def s91_factor(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return the factorised S91 operator, from the cache if possible.
+
+        The tri-diagonal coefficients ak, bk and ck only depend on the grid,
+        eps_u, eps_v, eps_p and beta, not on the heating q1. They are formed and
+        forward eliminated once, and stored in `S91_FACTOR_CACHE`, so that each
+        call to `s91_solver` only needs the substitution passes.
+
+        For an ensemble, the coefficients have a member axis, shape
+        (member, ny - 2, nk).
 
-        for il in range(nf - 2, -1, -1):
-            xc[il, :] = (dc[il, :] - cc[il, :] * xc[il + 1, :]) / bc[il, :]
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: km, ak,
+                factor, coeff. The zonal wavenumber in m-1, the sub-diagonal,
+                the output of `src.models.tdma.tdma_factor`, and the
+                denominator for u.
+        """
+        key = self.s91_key()
+        if key not in S91_FACTOR_CACHE:
+            ny = self.atm.ny
+            km = self.kk_wavenumber / R_earth.to_value()
+            eps_u, eps_v, eps_p = (self.param(x) for x in ["eps_u", "eps_v", "eps_p"])
+            rk = 1.0j * km * self.atm.beta - eps_u * eps_v * eps_p - eps_v * km ** 2
+
+            fcp = self.fcu[1 : ny - 1] ** 2 / 4.0
+            fcm = self.fcu[0 : ny - 2] ** 2 / 4.0
+
+            ak = eps_u / self.dym_2 - eps_p * fcm[:, np.newaxis]
+            ck = eps_u / self.dym_2 - eps_p * fcp[:, np.newaxis]
+            bk = (
+                -2 * eps_u / self.dym_2
+                - eps_p * (fcm[:, np.newaxis] + fcp[:, np.newaxis])
+                + rk
+            )
+            coeff = eps_u * eps_p + km * km
+            S91_FACTOR_CACHE[key] = (km, ak, tdma_factor(ak, bk, ck), coeff)
 
-        return xc
+        return S91_FACTOR_CACHE[key]
 
     @typechecked
     def s91_solver(self, q1: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
@@ -631,61 +839,59 @@ class Atmos:
         differenced, and the resulting tri-diagonal system is solved by matrix
         inversion, transforming back into longitude.
 
-        Usef fft, ifft.
+        Uses rfft, irfft, as the heating and winds are real.
 
               g . pi . N ^ 2
         q1 = ---------------- . (k . theta_s . Q_c)
               theta_00 . z_t
 
+        The tri-diagonal operator is factorised once per grid and set of
+        parameters (see `s91_factor`), so each call only does the
+        substitution passes.
+
+        Any leading axes of q1 are treated as a stack of independent
+        heatings, which are all solved at once.
+
         Args:
-            q1 (np.ndarray): modified heating that drives winds.
+            q1 (np.ndarray): modified heating that drives winds,
+                shape (..., ny - 1, nx).
 
         Returns:
             Tuple[np.ndarray, np.ndarray, np.ndarray]: u, v, phi
 
         """
 
-        q1_time = fft(q1)
+        ny = self.atm.ny
+        km, ak, factor, coeff = self.s91_factor()
+        nk = km.shape[0]
+        q1_time = self.f_rfft(q1)
         f_q = self.fcu[:, np.newaxis] * q1_time
-        a_f_q = (f_q[1 : self.atm.ny - 1, :] + f_q[0 : self.atm.ny - 2, :]) / 2.0
-        km = self.kk_wavenumber / R_earth.to_value()
-        d_q = (
-            q1_time[1 : self.atm.ny - 1, :] - q1_time[0 : self.atm.ny - 2, :]
-        ) / self.dym
-        rk = (
-            1.0j * km * self.atm.beta
-            - self.atm.eps_u * self.atm.eps_v * self.atm.eps_p
-            - self.atm.eps_v * km ** 2
-        )
-
-        fcp = self.fcu[1 : self.atm.ny - 1] ** 2 / 4.0
-        fcm = self.fcu[0 : self.atm.ny - 2] ** 2 / 4.0
-
-        ak = self.atm.eps_u / self.dym_2 - self.atm.eps_p * fcm[:, np.newaxis]
-        ck = self.atm.eps_u / self.dym_2 - self.atm.eps_p * fcp[:, np.newaxis]
-        bk = (
-            -2 * self.atm.eps_u / self.dym_2
-            - self.atm.eps_p * (fcm[:, np.newaxis] + fcp[:, np.newaxis])
-            + rk[np.newaxis, :]
-        )
-        dk = -self.atm.eps_u * d_q + 1.0j * km[np.newaxis, :] * a_f_q
-
-        # find tdma using it
-        vtk = self.tdma_solver(self.atm.ny - 2, ak, bk, ck, dk)
-
-        z = np.zeros((1, self.atm.nx))
-        v_t = np.concatenate((z, vtk, z), axis=0)
-        av = (v_t[1 : self.atm.ny, :] + v_t[0 : self.atm.ny - 1, :]) / 2.0
+        a_f_q = (f_q[..., 1 : ny - 1, :] + f_q[..., 0 : ny - 2, :]) / 2.0
+        d_q = (q1_time[..., 1 : ny - 1, :] - q1_time[..., 0 : ny - 2, :]) / self.dym
+        dk = -self.param("eps_u") * d_q + 1.0j * km[np.newaxis, :] * a_f_q
+
+        # find tdma using the cached factorisation, solving straight into
+        # the interior of v_t, which has v = 0 at the southern and
+        # northern boundaries.
+        stack_shape = np.broadcast_shapes(dk.shape, factor.shape[1:])[:-2]
+        v_t = self._buffer("v_t", stack_shape + (ny, nk), dk.dtype.type)
+        v_t[..., 0, :] = 0.0
+        v_t[..., ny - 1, :] = 0.0
+        tdma_substitute(ak, factor, dk, out=v_t[..., 1 : ny - 1, :])
+
+        av = (v_t[..., 1:ny, :] + v_t[..., 0 : ny - 1, :]) / 2.0
         fav = self.fcu[:, np.newaxis] * av
-        dv = (v_t[1 : self.atm.ny, :] - v_t[0 : self.atm.ny - 1, :]) / self.dym
-        coeff = self.atm.eps_u * self.atm.eps_p + km * km
-        u_t = (
-            self.atm.eps_p * fav + 1.0j * (q1_time + dv) * km[np.newaxis, :]
-        ) / coeff[np.newaxis, :]
-        phi_t = -(q1_time + 1.0j * u_t * km[np.newaxis, :] + dv) / self.atm.eps_p
-        v = ifft(v_t).real
-        u = ifft(u_t).real
-        phi = ifft(phi_t).real
+        dv = (v_t[..., 1:ny, :] - v_t[..., 0 : ny - 1, :]) / self.dym
+        eps_p = self.param("eps_p")
+        u_t = self._buffer("u_t", stack_shape + (ny - 1, nk), q1_time.dtype.type)
+        np.divide(
+            eps_p * fav + 1.0j * (q1_time + dv) * km[np.newaxis, :], coeff, out=u_t
+        )
+        phi_t = self._buffer("phi_t", stack_shape + (ny - 1, nk), q1_time.dtype.type)
+        np.divide(-(q1_time + 1.0j * u_t * km[np.newaxis, :] + dv), eps_p, out=phi_t)
+        v = irfft(v_t, n=self.atm.nx, workers=self.atm.fft_workers)
+        u = irfft(u_t, n=self.atm.nx, workers=self.atm.fft_workers)
+        phi = irfft(phi_t, n=self.atm.nx, workers=self.atm.fft_workers)
 
         return (u, v, phi)
 
@@ -702,6 +908,9 @@ class Atmos:
     ) -> xr.DataArray:
         """Applies [0.25, 0.5, 0.25] stencil in sdims, one at a time.
 
+        Wraps `src.models.smooth.smooth121`, which does the work on the
+        underlying array.
+
         Args:
             da (xr.DataArray): xarray.DataArray - e.g., ds.var
             sdims (list): list of dimensions over which to smooth - e.g., ['lat','lon']
@@ -714,33 +923,127 @@ class Atmos:
             xr.DataArray: smoothed output.
 
         """
-        mask = da.notnull()
-        weight = xr.DataArray([0.25, 0.5, 0.25], dims=["window"])
-        v = da.copy()
-        origdims = v.dims
-
-        for dim in sdims:
-            for _ in range(0, number_smooths):
-                if dim in perdims:
-                    v0 = xr.concat(
-                        [v.isel(**{dim: -1}), v, v.isel(**{dim: 0})], dim=dim
-                    )
-                else:
-                    v0 = xr.concat(
-                        [v.isel(**{dim: 0}), v, v.isel(**{dim: -1})], dim=dim
-                    )
-                v1 = v0.bfill(dim, limit=1)
-                v0 = v1.ffill(dim, limit=1)
-                v1 = v0.rolling(**{dim: 3}, center=True).construct("window").dot(weight)
-                v = v1.isel(**{dim: slice(1, -1, None)})
+        axes = [da.dims.index(dim) for dim in sdims]
+        periodic_axes = [da.dims.index(dim) for dim in perdims if dim in da.dims]
+        return da.copy(
+            data=smooth121(
+                da.values,
+                axes,
+                number_smooths=number_smooths,
+                periodic_axes=periodic_axes,
+            )
+        )
+
+    # ------------------ precipitation iterations ----------------------
+
+    @typechecked
+    def iterate(
+        self,
+        pr: np.ndarray,
+        pr_c: np.ndarray,
+        q_th: np.ndarray,
+        e1: np.ndarray,
+        qa1: np.ndarray,
+        mask: np.ndarray,
+        uv: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> Tuple[
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+    ]:
+        """
+        Iterate through.
+
+        Finds the fixed point of the precipitation, heating and winds.
+        The inputs can have leading axes, e.g. to solve the beg and
+        end states as one stacked batch.
+
+        The fixed point is found with either plain Picard iteration
+        (atm.solver = "picard"), or with Anderson mixing
+        (atm.solver = "anderson", see `src.models.fixed_point.Anderson`).
+
+        Stops early once the relative change in pr_c (and in u and v
+        if atm.uv_tol > 0) is below atm.pr_tol for every state, or after
+        atm.number_iterations.
 
-        return v.where(mask, np.nan).transpose(*origdims)
+        Args:
+            pr (np.ndarray): precipitation default.
+            pr_c (np.ndarray): new precipation.
+            q_th (np.ndarray): q th.
+            e1 (np.ndarray): evaporation.
+            qa1 (np.ndarray): heat flux.
+            mask (np.ndarray): land mask.
+            uv (Optional[Tuple[np.ndarray, np.ndarray]], optional): the winds
+                of the solve that pr_c comes from, when warm started, so that
+                the first pass can already meet atm.uv_tol. Defaults to None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+                np.ndarray, np.ndarray]: pr_c, u1, v1, phi1, mc1, pr_res, uv_res.
+                The residuals have shape (iterations, ...).
+        """
+        assert self.atm.solver in ["picard", "anderson"]
+        if self.atm.solver == "anderson":
+            mixer = Anderson(
+                depth=self.atm.anderson_depth, batch_ndim=pr_c.ndim - 2, lower=0.0
+            )
+        else:
+            mixer = None
+
+        pr_res = []
+        uv_res = []
+        u1, v1 = (None, None) if uv is None else uv
+        # Find total pr, u and v at end
+        for _ in range(0, self.atm.number_iterations):
+            # Start main calculation
+            q_c = (
+                np.pi
+                * self.atm.latent_heat_vap
+                * pr_c
+                / (2 * self.atm.cp_air * self.atm.rho_00 * self.atm.height_tropopause)
+            )  # heating from precip
+            # convective heating part, Qc
+            q1 = self.atm.b_coeff * (q_c + q_th)
+            # Q1 is a modified heating since the part
+            # involving θ is on the left-hand side
+            (u_new, v_new, phi1) = self.s91_solver(q1)
+            mc1 = smooth121(self.f_mc(qa1, u_new, v_new), [-2, -1], periodic_axes=[-1])
+            if self.atm.prcp_land:
+                pr_new = (1 - mask) * (mc1 + e1) + mask * pr
+            else:
+                pr_new = (1 - mask) * (mc1 + e1)
+            pr_new[pr_new < 0] = 0
+            # pr[pr > pr_max] = pr_max
+
+            pr_res.append(self.f_residual(pr_new, pr_c))
+            if u1 is None:
+                uv_res.append(np.full(pr_res[-1].shape, np.inf))
+            else:
+                uv_res.append(
+                    np.maximum(self.f_residual(u_new, u1), self.f_residual(v_new, v1))
+                )
+            u1, v1 = u_new, v_new
+
+            if self.atm.pr_tol > 0 and np.all(pr_res[-1] < self.atm.pr_tol):
+                if self.atm.uv_tol <= 0 or np.all(uv_res[-1] < self.atm.uv_tol):
+                    break
+
+            if mixer is None:
+                pr_c = pr_new
+            else:
+                pr_c = mixer.update(pr_c, pr_new)
+
+        return pr_new, u1, v1, phi1, mc1, np.array(pr_res), np.array(uv_res)
 
     # ------------------ output functions -------------------------
 
     @timeit
     @typechecked
-    def output_trends(self) -> None:
+    def output_trends(self) -> xr.Dataset:
         """Output trends ds.
 
         Runs the Matsuno-Gill model with the trends in preipitation and
@@ -753,7 +1056,23 @@ class Atmos:
 
         𝜀𝜙 . 𝜙 + 𝑢 . 𝑥 + 𝑣 . 𝑦 = −𝑄1  (3)
 
+        If any of atm.eps_days, atm.k_days, atm.e_frac or atm.h_q are lists,
+        every member of the ensemble is solved at once, and the fields that
+        depend on them have a leading "member" dimension.
+
+        Example:
+            An atmosphere only sensitivity scan::
+
+                from omegaconf import open_dict
+                from src.configs.config import derived_param
+
+                with open_dict(cfg):
+                    cfg.atm.eps_days = [0.5, 0.75, 1.0]
+                    cfg.atm.k_days = [8, 10, 12]
+                Atmos(derived_param(cfg), setup).output_trends()
+
         """
+        members = number_members(self.atm)
 
         ds = xr.Dataset(
             {
@@ -766,62 +1085,79 @@ class Atmos:
         ds.Yu.attrs = [("units", "degree_north")]
         ds.Yv.attrs = [("units", "degree_north")]
 
-        ds["K"] = self.atm.k_days
+        if members:
+            ds = ds.assign_coords(member=np.arange(members))
+
+        # the fields that depend on the ensemble parameters have a member axis.
+        m_dims = ["member"] if members else []
+
+        def param_var(value: Union[float, np.ndarray]) -> Union[float, tuple]:
+            if isinstance(value, np.ndarray):
+                return (m_dims, value)
+            return value
+
+        ds["K"] = param_var(member_param(self.atm, "k_days"))
         ds.K.attrs = [("units", "day")]
-        ds["epsu"] = self.atm.eps_days
+        ds["epsu"] = param_var(member_param(self.atm, "eps_days"))
         ds.epsu.attrs = [("units", "day")]
-        ds["epsv"] = self.atm.eps_days / self.atm.e_frac
+        ds["epsv"] = param_var(
+            member_param(self.atm, "eps_days") / member_param(self.atm, "e_frac")
+        )
         ds.epsv.attrs = [("units", "day")]
-        ds["hq"] = self.atm.h_q
+        ds["hq"] = param_var(member_param(self.atm, "h_q"))
         ds.hq.attrs = [("units", "m")]
 
         # CLIMATOLOGIES
 
+        def on_grid(ds_in: xr.Dataset, var: str) -> np.ndarray:
+            # bilinear regrid from the data grid onto (Yu, X).
+            return regrid(
+                ds_in.X.values,
+                ds_in.Y.values,
+                ds_in[var].values,
+                self.x_axis,
+                self.y_axis_u,
+            )
+
         def get_clim():
             # the average condions from ECMWF
             # Gets the windspeed, surface temperature, precipation, and surface pressure
             # VAR_DICT = {0: "ts", 1: "clt", 2: "sfcWind", 3: "rh", 4: "pr", 5: "ps", 6: "tau"}
             # "sfcWind"
             ds_clim = xr.open_dataset(self.setup.clim_file("sfcWind", path=True))
-            # this needs to be replaced
-            fwnsp = interp2d(ds_clim.X, ds_clim.Y, ds_clim.sfcWind, kind="linear")
+            wnsp = on_grid(ds_clim, "sfcWind")
             ds_clim = xr.open_dataset(self.setup.ts_clim(self.it))
-            fts = interp2d(ds_clim.X, ds_clim.Y, ds_clim.ts, kind="linear")
+            ts_clim = on_grid(ds_clim, "ts")
             ds_clim = xr.open_dataset(self.setup.clim_file("pr", path=True))
-            fpr = interp2d(ds_clim.X, ds_clim.Y, ds_clim.pr, kind="linear")
+            pr_clim = on_grid(ds_clim, "pr")
             ds_clim = xr.open_dataset(self.setup.clim_file("ps", path=True))
-            fps = interp2d(ds_clim.X, ds_clim.Y, ds_clim.ps, kind="linear")
-            # Return interpolation objects
-            return fwnsp, fts, fpr, fps
-
-        fwnsp, fts, fpr, fps = get_clim()
+            ps_clim = on_grid(ds_clim, "ps")
+            # Return regridded climatologies
+            return wnsp, ts_clim, pr_clim, ps_clim
 
-        # Regrid:
+        wnsp, ts_clim, pr_clim, ps_clim = get_clim()
 
-        wnsp = fwnsp(self.x_axis, self.y_axis_u)
         wnsp[wnsp < self.atm.wnsp_min] = self.atm.wnsp_min
         ds["wnspClim"] = (["Yu", "X"], wnsp)
-        ds["tsClim"] = (["Yu", "X"], fts(self.x_axis, self.y_axis_u))
-        ds["prClim"] = (["Yu", "X"], fpr(self.x_axis, self.y_axis_u))
-        ds["spClim"] = (["Yu", "X"], fps(self.x_axis, self.y_axis_u))
+        ds["tsClim"] = (["Yu", "X"], ts_clim)
+        ds["prClim"] = (["Yu", "X"], pr_clim)
+        ds["spClim"] = (["Yu", "X"], ps_clim)
 
         # TRENDS
         def get_trend():
-            # return interpolation functions of the original trends
+            # return the original trends regridded
             ds_trend = xr.open_dataset(self.setup.ts_trend(self.it))
-            fts_trend = interp2d(ds_trend.X, ds_trend.Y, ds_trend.ts, kind="linear")
+            ts_trend = on_grid(ds_trend, "ts")
             ds_trend = xr.open_dataset(
                 self.setup.clim_file("pr", typ="trend", path=True)
             )
-            fpr_trend = interp2d(ds_trend.X, ds_trend.Y, ds_trend.pr, kind="linear")
-            return fts_trend, fpr_trend
+            pr_trend = on_grid(ds_trend, "pr")
+            return ts_trend, pr_trend
 
-        fts_trend, fpr_trend = get_trend()
+        ts_trend, pr_trend = get_trend()
 
-        ts_trend = fts_trend(self.x_axis, self.y_axis_u)
         ds["tsTrend"] = (["Yu", "X"], ts_trend)
 
-        pr_trend = fpr_trend(self.x_axis, self.y_axis_u)
         pr_trend[abs(self.y_axis_u) > 25] = 0
         # get rid of anything above 25 degrees north/south
         pr_trend[pr_trend > 5e-5] = 5e-5
@@ -838,8 +1174,7 @@ class Atmos:
         dsmask = xr.open_dataset(
             os.path.join(self.setup.atmos_data_path, "mask-360x180.nc")
         )
-        fmask = interp2d(dsmask.X, dsmask.Y, dsmask.mask, kind="linear")
-        ds["mask"] = (["Yu", "X"], fmask(self.x_axis, self.y_axis_u))
+        ds["mask"] = (["Yu", "X"], on_grid(dsmask, "mask"))
 
         # tsClim = ds.tsClim.values
         sp_clim = ds.spClim.values
@@ -859,10 +1194,10 @@ class Atmos:
 
         # ts trend passed to q_th
         q_th_end = (
-            self.atm.newtonian_cooling_coeff_k1 * (ts_end - 30) / self.atm.b_coeff
+            self.param("newtonian_cooling_coeff_k1") * (ts_end - 30) / self.atm.b_coeff
         )
         q_th_beg = (
-            self.atm.newtonian_cooling_coeff_k1 * (ts_beg - 30) / self.atm.b_coeff
+            self.param("newtonian_cooling_coeff_k1") * (ts_beg - 30) / self.atm.b_coeff
         )
         # passed to qa_end
         qa_end = self.f_qa(ts_end, sp_clim)
@@ -880,95 +1215,152 @@ class Atmos:
         pr_c_beg[pr_c_beg < 0] = 0
         # pr_beg[pr_beg>pr_max] = pr_max
 
-        def iterate(pr, pr_c, q_th, e1, qa1) -> Tuple[np.ndarray]:
-            """
-            Iterate through.
-
-            Args:
-                pr ([type]): precipitation default.
-                pr_c ([type]): new precipation.
-                q_th ([type]): q th.
-                e1 ([type]): evaporation.
-                qa1 ([type]): heat flux.
-
-            Returns:
-                Tuple[np.ndarray]: pr_c, u1, v1, phi1, mc1
-            """
-            # Find total pr, u and v at end
-            for _ in range(0, self.atm.number_iterations):
-                # Start main calculation
-                q_c = (
-                    np.pi
-                    * self.atm.latent_heat_vap
-                    * pr_c
-                    / (
-                        2
-                        * self.atm.cp_air
-                        * self.atm.rho_00
-                        * self.atm.height_tropopause
-                    )
-                )  # heating from precip
-                # convective heating part, Qc
-                q1 = self.atm.b_coeff * (q_c + q_th)
-                # Q1 is a modified heating since the part
-                # involving θ is on the left-hand side
-                (u1, v1, phi1) = self.s91_solver(q1)
-                d_amc = xr.DataArray(self.f_mc(qa1, u1, v1), dims=["Yu", "X"])
-                mc1 = self.smooth121(d_amc, ["Yu", "X"], perdims=["X"]).values
-                if self.atm.prcp_land:
-                    pr_c = (1 - mask) * (mc1 + e1) + mask * pr
-                else:
-                    pr_c = (1 - mask) * (mc1 + e1)
-                pr_c[pr_c < 0] = 0
-                # pr[pr > pr_max] = pr_max
-            return pr_c, u1, v1, phi1, mc1
+        if members:
+            # every member starts from the same precipitation.
+            member_shape = (members,) + mask.shape
+            pr_c_end = np.broadcast_to(pr_c_end, member_shape).copy()
+            pr_c_beg = np.broadcast_to(pr_c_beg, member_shape).copy()
+            q_th_end = np.broadcast_to(q_th_end, member_shape)
+            q_th_beg = np.broadcast_to(q_th_beg, member_shape)
+
+        # start from the last solve if there is one, see warm_start.
+        uv_end, uv_beg = None, None
+        if self.warm is not None and self.warm["pr_c_end"].shape == pr_c_end.shape:
+            pr_c_end = self.warm["pr_c_end"].copy()
+            pr_c_beg = self.warm["pr_c_beg"].copy()
+            uv_end = (self.warm["u_end"], self.warm["v_end"])
+            uv_beg = (self.warm["u_beg"], self.warm["v_beg"])
 
         # pr, pr_c, q_th, e1, qa1
-        # pr_c, u1, v1, phi1, mc1
-
-        pr_c_end, u_end, v_end, phi_end, mc_end = iterate(
-            pr_end,
-            pr_c_end,
-            q_th_end,
-            e_end,
-            qa_end,
-        )
+        # pr_c, u1, v1, phi1, mc1, pr_res, uv_res
+
+        if self.atm.stack_states:
+
+            def stack(end: np.ndarray, beg: np.ndarray) -> np.ndarray:
+                # stack the states along a leading axis, before any member axis.
+                stacked = np.stack([end, beg])
+                if members and end.ndim == 2:
+                    return stacked[:, np.newaxis]
+                return stacked
+
+            # solve the end and beg states together along a leading axis.
+            (
+                (pr_c_end, pr_c_beg),
+                (u_end, u_beg),
+                (v_end, v_beg),
+                (phi_end, phi_beg),
+                (mc_end, mc_beg),
+                pr_res,
+                uv_res,
+            ) = self.iterate(
+                stack(pr_end, pr_beg),
+                stack(pr_c_end, pr_c_beg),
+                stack(q_th_end, q_th_beg),
+                stack(e_end, e_beg),
+                stack(qa_end, qa_beg),
+                mask,
+                uv=None
+                if uv_end is None
+                else (
+                    stack(uv_end[0], uv_beg[0]),
+                    stack(uv_end[1], uv_beg[1]),
+                ),
+            )
+            # residuals have shape (iteration, state, ...).
+            pr_res_end, pr_res_beg = np.moveaxis(pr_res, 1, 0)
+            uv_res_end, uv_res_beg = np.moveaxis(uv_res, 1, 0)
+        else:
+            (
+                pr_c_end,
+                u_end,
+                v_end,
+                phi_end,
+                mc_end,
+                pr_res_end,
+                uv_res_end,
+            ) = self.iterate(
+                pr_end,
+                pr_c_end,
+                q_th_end,
+                e_end,
+                qa_end,
+                mask,
+                uv=uv_end,
+            )
 
-        pr_c_beg, u_beg, v_beg, phi_beg, mc_beg = iterate(
-            pr_beg,
-            pr_c_beg,
-            q_th_beg,
-            e_beg,
-            qa_beg,
-        )
+            (
+                pr_c_beg,
+                u_beg,
+                v_beg,
+                phi_beg,
+                mc_beg,
+                pr_res_beg,
+                uv_res_beg,
+            ) = self.iterate(
+                pr_beg,
+                pr_c_beg,
+                q_th_beg,
+                e_beg,
+                qa_beg,
+                mask,
+                uv=uv_beg,
+            )
+
+        # record the convergence of the iterations for each state.
+        ds = ds.assign_coords(state=["end", "beg"])
+        iterations = [len(pr_res_end), len(pr_res_beg)]
+        ds["iterations"] = (["state"], iterations)
+        pr_residual = np.full((2, max(iterations)) + pr_res_end.shape[1:], np.nan)
+        uv_residual = np.full((2, max(iterations)) + pr_res_end.shape[1:], np.nan)
+        for i, (pr_res, uv_res) in enumerate(
+            [(pr_res_end, uv_res_end), (pr_res_beg, uv_res_beg)]
+        ):
+            pr_residual[i, : len(pr_res)] = pr_res
+            uv_residual[i, : len(uv_res)] = uv_res
+        ds["pr_residual"] = (["state", "iteration"] + m_dims, pr_residual)
+        ds["uv_residual"] = (["state", "iteration"] + m_dims, uv_residual)
+        ds = ds.assign_coords(iteration=np.arange(1, max(iterations) + 1))
+        self.metrics = {}
+        for i, state in enumerate(["end", "beg"]):
+            # the worst member, for an ensemble.
+            self.metrics["atmos_iterations_" + state] = iterations[i]
+            self.metrics["atmos_pr_residual_" + state] = np.max(
+                pr_residual[i, iterations[i] - 1]
+            )
+            self.metrics["atmos_uv_residual_" + state] = np.max(
+                uv_residual[i, iterations[i] - 1]
+            )
+        print("atmos iterations", iterations)
 
         # save and plot the trends
-        ds["utrend"] = (["Yu", "X"], u_end - u_beg)
-        ds["vtrend"] = (["Yv", "X"], v_end - v_beg)
-        ds["phitrend"] = (["Yu", "X"], phi_end - phi_beg)
+        ds["utrend"] = (m_dims + ["Yu", "X"], u_end - u_beg)
+        ds["vtrend"] = (m_dims + ["Yv", "X"], v_end - v_beg)
+        ds["phitrend"] = (m_dims + ["Yu", "X"], phi_end - phi_beg)
         ds["tstrend"] = (["Yu", "X"], ts_end - ts_beg)
-        ds["PRtrend"] = (["Yu", "X"], pr_c_end - pr_c_beg)
-        ds["Qthtrend"] = (["Yu", "X"], q_th_end - q_th_beg)
-        ds["uend"] = (["Yu", "X"], u_end)  # u at end
-        ds["vend"] = (["Yv", "X"], v_end)  # v at end.
+        ds["PRtrend"] = (m_dims + ["Yu", "X"], pr_c_end - pr_c_beg)
+        ds["Qthtrend"] = (m_dims + ["Yu", "X"], q_th_end - q_th_beg)
+        ds["uend"] = (m_dims + ["Yu", "X"], u_end)  # u at end
+        ds["vend"] = (m_dims + ["Yv", "X"], v_end)  # v at end.
         ds["wend"] = (["Yu", "X"], w_end)
-        ds["phiend"] = (["Yu", "X"], phi_end)
+        ds["phiend"] = (m_dims + ["Yu", "X"], phi_end)
         ds["tsend"] = (["Yu", "X"], ts_end)
-        ds["PRend"] = (["Yu", "X"], pr_c_end)
-        ds["Qthend"] = (["Yu", "X"], q_th_end)
+        ds["PRend"] = (m_dims + ["Yu", "X"], pr_c_end)
+        ds["Qthend"] = (m_dims + ["Yu", "X"], q_th_end)
         ds["Eend"] = (["Yu", "X"], e_end)
-        ds["MCend"] = (["Yu", "X"], mc_end)
+        ds["MCend"] = (m_dims + ["Yu", "X"], mc_end)
         ds["qaend"] = (["Yu", "X"], qa_end)
-        ds["ubeg"] = (["Yu", "X"], u_beg)
-        ds["vbeg"] = (["Yv", "X"], v_beg)
+        ds["ubeg"] = (m_dims + ["Yu", "X"], u_beg)
+        ds["vbeg"] = (m_dims + ["Yv", "X"], v_beg)
         ds["wbeg"] = (["Yu", "X"], w_beg)
-        ds["phibeg"] = (["Yu", "X"], phi_beg)
+        ds["phibeg"] = (m_dims + ["Yu", "X"], phi_beg)
         ds["tsbeg"] = (["Yu", "X"], ts_beg)
-        ds["PRbeg"] = (["Yu", "X"], pr_c_beg)
-        ds["Qthbeg"] = (["Yu", "X"], q_th_beg)
+        ds["PRbeg"] = (m_dims + ["Yu", "X"], pr_c_beg)
+        ds["Qthbeg"] = (m_dims + ["Yu", "X"], q_th_beg)
         ds["Ebeg"] = (["Yu", "X"], e_beg)
-        ds["MCbeg"] = (["Yu", "X"], mc_beg)
+        ds["MCbeg"] = (m_dims + ["Yu", "X"], mc_beg)
         ds["qabeg"] = (["Yu", "X"], qa_beg)
+        if self.atm.warm_start:
+            self.warm_start(ds)
 
         # There is 2 gridpoint noise in the phi field - so add a smooth in X:
         ds["phitrend"] = self.smooth121(
@@ -1004,6 +1396,8 @@ class Atmos:
         ds.phitrend.attrs = [("units", "m2/s2")]
         ds.PRtrend.attrs = [("units", "m/s")]
         ds.Qthtrend.attrs = [("units", "K/s")]
+        ds.pr_residual.attrs = [("units", "dimensionless")]
+        ds.uv_residual.attrs = [("units", "dimensionless")]
 
         en_dict = {
             "K": {"dtype": "f4"},
@@ -1016,7 +1410,7 @@ class Atmos:
 
         print(outfile)
 
-        ds.to_netcdf(outfile, encoding=en_dict)
+        self.write_output(ds, outfile, encoding=en_dict)
 
         # warnings.filterwarnings("ignore")
         do_plot = False  # False
@@ -1081,6 +1475,55 @@ class Atmos:
             )
             plt.clf()
 
+        return ds
+
+    def warm_start(self, tcam: xr.Dataset) -> None:
+        """
+        Start the next solve from the converged state of a TCAM output.
+
+        The next coupling iteration only changes the SST a little, so
+        starting the precipitation iterations from the last pr_c, u and v
+        for the beg and end states, rather than from the evaporation, means
+        that they meet atm.pr_tol in a few passes. phi is not kept, as it is
+        recomputed from pr_c in each pass.
+
+        Args:
+            tcam (xr.Dataset): output of `output_trends`, e.g. as read back
+                from `tcam_output` when resuming.
+        """
+        self.warm = {
+            name + "_" + state: np.array(tcam[var + state].values, dtype=np.float64)
+            for name, var in [("pr_c", "PR"), ("u", "u"), ("v", "v")]
+            for state in ["end", "beg"]
+        }
+
+    def write_output(self, ds: xr.Dataset, path: str, **kwargs) -> None:
+        """
+        Write an output dataset to disk, in the background if atm.async_write.
+
+        The coupling takes the datasets from `run_all` in memory, so the files
+        are for the archive, the diagnostics, the plots and the checkpoint.
+        The last file is removed first rather than truncated, as the
+        checkpoint may hold a hard link to it.
+
+        Args:
+            ds (xr.Dataset): the output.
+            path (str): the file to write to.
+            **kwargs: passed on to `xr.Dataset.to_netcdf`.
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        if self.writer is None:
+            ds.to_netcdf(path, **kwargs)
+        else:
+            self.writes.append(self.writer.submit(ds.load().to_netcdf, path, **kwargs))
+
+    def wait_for_output(self) -> None:
+        """Wait until the outputs being written in the background are on disk."""
+        for future in self.writes:
+            future.result()
+        self.writes = []
+
     # ##--------------------------- Begin dQ ----------------------------
 
     def load_clim60(self) -> xr.Dataset:
@@ -1198,28 +1641,33 @@ class Atmos:
         rh_loc = dclim_loc.rh / 100.0
         f1p = self.atm.f1prime  # -0.003  # f1prime
 
-        alh0 = self.f_dqlh_dtemp(t_sb_loc, self.atm.u_bar, rh_loc)
-        alw0 = self.f_dqlw_dtemp(t_sb_loc, self.atm.c_bar, self.atm.f1_bar, rh_loc)
-        blw0 = self.f_dqlw_df(t_sb_loc, self.atm.c_bar)
-        dtemp_se0 = -blw0 * f1p / (alh0 + alw0)
-        dclim_loc["dTse0"] = dtemp_se0
-
-        alh1 = self.f_dqlh_dtemp(t_sb_loc, u_b_loc, rh_loc)
-        alw1 = self.f_dqlw_dtemp(t_sb_loc, self.atm.c_bar, self.atm.f1_bar, rh_loc)
-        blw1 = self.f_dqlw_df(t_sb_loc, self.atm.c_bar)
-        dtemp_se1 = -blw1 * f1p / (alh1 + alw1)
-        dclim_loc["dTse1"] = dtemp_se1
-
-        alh2 = self.f_dqlh_dtemp(t_sb_loc, self.atm.u_bar, rh_loc)
-        alw2 = self.f_dqlw_dtemp(t_sb_loc, c_b_loc, self.atm.f1_bar, rh_loc)
-        blw2 = self.f_dqlw_df(t_sb_loc, c_b_loc)
-        dtemp_se2 = -blw2 * f1p / (alh2 + alw2)
-        dclim_loc["dTse2"] = dtemp_se2
-
-        alh_loc = self.f_dqlh_dtemp(t_sb_loc, u_b_loc, rh_loc)
-        alw_loc = self.f_dqlw_dtemp(t_sb_loc, c_b_loc, self.atm.f1_bar, rh_loc)
-        blw_loc = self.f_dqlw_df(t_sb_loc, c_b_loc)
-        dtemp_se_loc = -blw_loc * f1p / (alh_loc + alw_loc)
+        def ts_values(da: xr.DataArray) -> np.ndarray:
+            # the kernel works by position, so put each field on the ts grid.
+            return da.transpose(*t_sb_loc.dims).reindex_like(t_sb_loc).values
+
+        # the variants dTse0, dTse1, dTse2 and dTse differ only in whether the
+        # wind speed and cloud cover are uniform or climatological.
+        u_b = ts_values(u_b_loc)
+        c_b = ts_values(c_b_loc)
+        u_bar = np.full(u_b.shape, float(self.atm.u_bar))
+        c_bar = np.full(c_b.shape, float(self.atm.c_bar))
+        alh, alw, blw, dtemp_se = self.f_flux_terms(
+            t_sb_loc.values,
+            np.stack([u_bar, u_b, u_bar, u_b]),
+            np.stack([c_bar, c_bar, c_b, c_b]),
+            ts_values(rh_loc),
+        )
+
+        def on_ts_grid(values: np.ndarray) -> xr.DataArray:
+            return xr.DataArray(values, coords=t_sb_loc.coords, dims=t_sb_loc.dims)
+
+        for i in range(3):
+            dclim_loc["dTse" + str(i)] = on_ts_grid(dtemp_se[i])
+
+        alh_loc = on_ts_grid(alh[3])
+        alw_loc = on_ts_grid(alw[3])
+        blw_loc = on_ts_grid(blw[3])
+        dtemp_se_loc = on_ts_grid(dtemp_se[3])
 
         dclim_loc["dTse"] = dtemp_se_loc
         dclim_loc["ALH"] = alh_loc
@@ -1227,7 +1675,7 @@ class Atmos:
         dclim_loc["BLW"] = blw_loc
         dclim_loc["QLW"] = alw_loc + blw_loc * f1p / dtemp_se_loc
 
-        dclim_loc.to_netcdf(self.setup.q_output())
+        self.write_output(dclim_loc, self.setup.q_output())
 
         return (
             dclim_loc,
@@ -1242,8 +1690,12 @@ class Atmos:
         )
 
     @typechecked
-    def output_dq(self) -> None:
-        """Outputs "dQ.nc"."""
+    def output_dq(self) -> xr.Dataset:
+        """Outputs "dQ.nc".
+
+        Returns:
+            xr.Dataset: the dQ dataset.
+        """
 
         dclim, u_b, alh, alw, blw, dtemp_se, rh, c_b, t_sb = self.get_dclim()
 
@@ -1275,7 +1727,8 @@ class Atmos:
         dq["Cb"] = c_b
         dq["Tsb"] = t_sb
 
-        dq.to_netcdf(self.setup.dq_output())
+        self.write_output(dq, self.setup.dq_output())
+        return dq
 
     @typechecked
     def make_figure(
@@ -1350,8 +1803,20 @@ class Atmos:
             os.path.join(self.setup.atmos_path, "Tsp4.eps"), format="eps", dpi=1000
         )
 
-    def run_all(self, it: int = 0) -> None:
+    def run_all(self, it: int = 0) -> Tuple[xr.Dataset, xr.Dataset]:
+        """
+        Run the atmosphere for a coupling iteration.
+
+        Args:
+            it (int, optional): iteration. Defaults to 0.
+
+        Returns:
+            Tuple[xr.Dataset, xr.Dataset]: the TCAM output and the dQ output,
+                as written to `tcam_output` and `dq_output`.
+        """
+        self.wait_for_output()
         self.it = it
-        self.output_trends()
-        self.output_dq()
+        tcam = self.output_trends()
+        dq = self.output_dq()
         self.make_figure()
+        return tcam, dq
@@ -0,0 +1,313 @@
+"""Benchmarks for the atmosphere model solvers.
+
+Times the per iteration cost of the atmosphere solve, so that changes to the
+solvers can be checked against the old behaviour.
+
+Example:
+    Usage of script::
+
+        python3 src/models/benchmark.py
+
+"""
+from typing import Callable, Optional, Tuple, Union
+import time
+import numpy as np
+from scipy.fftpack import fft, ifft
+from scipy.constants import zero_Celsius
+from astropy.constants import R_earth
+from omegaconf import DictConfig, open_dict
+from src.configs.load_config import load_config
+from src.configs.config import derived_param
+from src.models.model_setup import ModelSetup
+from src.models.atmos import Atmos, S91_FACTOR_CACHE
+from src.constants import TEST_DIREC
+from src.utils import hr_time
+
+
+def bench_atmos(cfg: Optional[DictConfig] = None) -> Atmos:
+    """
+    Make an atmosphere model to benchmark, without moving any files.
+
+    Args:
+        cfg (Optional[DictConfig], optional): config. Defaults to None,
+            which loads the test config.
+
+    Returns:
+        Atmos: the atmosphere model.
+    """
+    if cfg is None:
+        cfg = load_config()
+    return Atmos(cfg, ModelSetup(str(TEST_DIREC), cfg, make_move=False))
+
+
+def baseline_s91_solver(
+    atmos: Atmos, q1: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The S91 solver as it was before the rfft and cached factorisation.
+
+    Complex fft over the full set of wave numbers, with the tri-diagonal
+    operator rebuilt, and eliminated in a Python loop over y, on every call.
+
+    Args:
+        atmos (Atmos): the atmosphere model, for its grid and parameters.
+        q1 (np.ndarray): modified heating that drives winds, shape (ny - 1, nx).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: u, v, phi
+    """
+    atm, ny, nx = atmos.atm, atmos.atm.ny, atmos.atm.nx
+    # fft ordering of the wave numbers, with the Nyquist wave given 0.
+    if nx % 2 == 0:
+        kk_wavenumber = np.asarray(
+            list(range(0, nx // 2)) + [0] + list(range(-nx // 2 + 1, 0)), np.float64
+        )
+    else:
+        kk_wavenumber = np.asarray(
+            list(range(0, (nx - 1) // 2)) + [0] + list(range(-(nx - 1) // 2, 0)),
+            np.float64,
+        )
+    q1_time = fft(q1)
+    f_q = atmos.fcu[:, np.newaxis] * q1_time
+    a_f_q = (f_q[1 : ny - 1, :] + f_q[0 : ny - 2, :]) / 2.0
+    km = kk_wavenumber / R_earth.to_value()
+    d_q = (q1_time[1 : ny - 1, :] - q1_time[0 : ny - 2, :]) / atmos.dym
+    rk = 1.0j * km * atm.beta - atm.eps_u * atm.eps_v * atm.eps_p - atm.eps_v * km ** 2
+    fcp = atmos.fcu[1 : ny - 1] ** 2 / 4.0
+    fcm = atmos.fcu[0 : ny - 2] ** 2 / 4.0
+    ak = atm.eps_u / atmos.dym_2 - atm.eps_p * fcm[:, np.newaxis]
+    ck = atm.eps_u / atmos.dym_2 - atm.eps_p * fcp[:, np.newaxis]
+    bk = (
+        -2 * atm.eps_u / atmos.dym_2
+        - atm.eps_p * (fcm[:, np.newaxis] + fcp[:, np.newaxis])
+        + rk[np.newaxis, :]
+    )
+    dk = -atm.eps_u * d_q + 1.0j * km[np.newaxis, :] * a_f_q
+
+    # Thomas algorithm, one row at a time.
+    ac, bc, cc, dc = map(np.array, (ak, bk, ck, dk))
+    for it in range(1, ny - 2):
+        mc = ac[it, :] / bc[it - 1, :]
+        bc[it, :] = bc[it, :] - mc * cc[it - 1, :]
+        dc[it, :] = dc[it, :] - mc * dc[it - 1, :]
+    vtk = bc
+    vtk[-1, :] = dc[-1, :] / bc[-1, :]
+    for il in range(ny - 4, -1, -1):
+        vtk[il, :] = (dc[il, :] - cc[il, :] * vtk[il + 1, :]) / bc[il, :]
+
+    z = np.zeros((1, nx))
+    v_t = np.concatenate((z, vtk, z), axis=0)
+    av = (v_t[1:ny, :] + v_t[0 : ny - 1, :]) / 2.0
+    fav = atmos.fcu[:, np.newaxis] * av
+    dv = (v_t[1:ny, :] - v_t[0 : ny - 1, :]) / atmos.dym
+    coeff = atm.eps_u * atm.eps_p + km * km
+    u_t = (atm.eps_p * fav + 1.0j * (q1_time + dv) * km[np.newaxis, :]) / coeff[
+        np.newaxis, :
+    ]
+    phi_t = -(q1_time + 1.0j * u_t * km[np.newaxis, :] + dv) / atm.eps_p
+    return (ifft(u_t).real, ifft(v_t).real, ifft(phi_t).real)
+
+
+def bench_s91(number: int = 200, cfg: Optional[DictConfig] = None) -> dict:
+    """
+    Time the per iteration cost of `Atmos.s91_solver`.
+
+    "before" is `baseline_s91_solver`, the fft and Python loop solver,
+    "after" is `Atmos.s91_solver` reusing its cached factorisation, and
+    "cold" is `Atmos.s91_solver` with the cache cleared before every call.
+
+    Args:
+        number (int, optional): number of solves to average over.
+            Defaults to 200.
+        cfg (Optional[DictConfig], optional): config. Defaults to None.
+
+    Returns:
+        dict: time in seconds per solve, and the largest difference in
+            (u, v, phi) between the baseline and new solvers relative to
+            their size.
+    """
+    atmos = bench_atmos(cfg)
+    rng = np.random.default_rng(0)
+    q1 = 1e-5 * rng.normal(size=(atmos.atm.ny - 1, atmos.atm.nx))
+
+    def time_solves(solver: Callable, clear_cache: bool = False) -> float:
+        ts = time.perf_counter()
+        for _ in range(number):
+            if clear_cache:
+                S91_FACTOR_CACHE.clear()
+            solver(q1)
+        te = time.perf_counter()
+        return (te - ts) / number
+
+    before_output = baseline_s91_solver(atmos, q1)
+    after_output = atmos.s91_solver(q1)
+    results = {
+        "s91_before": time_solves(lambda x: baseline_s91_solver(atmos, x)),
+        "s91_after": time_solves(atmos.s91_solver),
+        "s91_cold": time_solves(atmos.s91_solver, clear_cache=True),
+        "s91_max_rel_diff": max(
+            float(np.max(np.abs(x - y)) / np.max(np.abs(x)))
+            for x, y in zip(before_output, after_output)
+        ),
+    }
+
+    for key in ["s91_before", "s91_after", "s91_cold"]:
+        print(key, hr_time(results[key]), "per iteration")
+    print("speed up", results["s91_before"] / results["s91_after"])
+    print("s91_max_rel_diff", results["s91_max_rel_diff"])
+
+    return results
+
+
+def synthetic_inputs(
+    atmos: Atmos,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Make idealised inputs for `Atmos.iterate` without any data files.
+
+    The SST peaks at 28 C on the equator, with a warm pool in the west
+    Pacific, and there is a block of land in the Americas.
+
+    Args:
+        atmos (Atmos): the atmosphere model.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray,
+            np.ndarray]: pr, pr_c, q_th, e1, qa1, mask on the (Yu, X) grid.
+    """
+    x_axis, y_axis = np.meshgrid(atmos.x_axis, atmos.y_axis_u)
+    mask = ((x_axis > 280) & (x_axis < 320) & (np.abs(y_axis) < 40)).astype(float)
+    ts = (
+        zero_Celsius
+        + 28 * np.cos(np.radians(y_axis)) ** 2
+        + 2 * np.exp(-(((x_axis - 150) / 30) ** 2)) * np.cos(np.radians(y_axis))
+    )
+    sp = np.full(ts.shape, 1010.0)
+    wnsp = np.full(ts.shape, 6.0)
+    q_th = atmos.param("newtonian_cooling_coeff_k1") * (ts - 30) / atmos.atm.b_coeff
+    qa1 = atmos.f_qa(ts, sp)
+    e1 = atmos.f_evap(mask, qa1, wnsp)
+    pr = np.full(ts.shape, 5e-5)
+    return pr, e1.copy(), q_th, e1, qa1, mask
+
+
+def compare_solvers(
+    solvers: Tuple[str, ...] = ("picard", "anderson"),
+    cfg: Optional[DictConfig] = None,
+) -> dict:
+    """
+    Compare the fixed point solvers for the TCAM precipitation.
+
+    Each solver is run to atm.pr_tol (or 1e-6, if that is 0) on the
+    idealised inputs, and compared against a tightly converged Picard
+    reference solution.
+
+    Args:
+        solvers (Tuple[str, ...], optional): values of atm.solver to compare.
+            Defaults to ("picard", "anderson").
+        cfg (Optional[DictConfig], optional): config. Defaults to None.
+
+    Returns:
+        dict: for each solver, the number of iterations to tolerance, the
+            time taken, and the largest relative difference from the
+            reference in pr_c, u and v.
+    """
+    atmos = bench_atmos(cfg)
+    inputs = synthetic_inputs(atmos)
+    pr_tol = atmos.atm.pr_tol or 1e-6
+
+    with open_dict(atmos.atm):
+        atmos.atm.solver = "picard"
+        atmos.atm.pr_tol = min(pr_tol, 1e-6) / 1e3
+        number_iterations = atmos.atm.number_iterations
+        atmos.atm.number_iterations = 1000
+        reference = atmos.iterate(*inputs)
+        atmos.atm.pr_tol = pr_tol
+        atmos.atm.number_iterations = number_iterations
+
+    results = {}
+    for solver in solvers:
+        with open_dict(atmos.atm):
+            atmos.atm.solver = solver
+        ts = time.perf_counter()
+        output = atmos.iterate(*inputs)
+        te = time.perf_counter()
+        results[solver + "_iterations"] = len(output[5])
+        results[solver + "_time"] = te - ts
+        for i, name in enumerate(["pr_c", "u", "v"]):
+            results[solver + "_" + name + "_max_rel_diff"] = float(
+                np.max(np.abs(output[i] - reference[i])) / np.max(np.abs(reference[i]))
+            )
+
+    for key in results:
+        print(key, results[key])
+
+    return results
+
+
+def bench_members(number: int = 20, cfg: Optional[DictConfig] = None) -> dict:
+    """
+    Compare one ensemble solve against solving each member on its own.
+
+    The members sweep eps_days and k_days over the ranges in
+    src/configs/sens_ranges.yaml. Both times include making the model and
+    its inputs, as each separate run has to, but not reading the
+    climatologies, as the inputs are idealised.
+
+    Args:
+        number (int, optional): number of members. Defaults to 20.
+        cfg (Optional[DictConfig], optional): config. Defaults to None.
+
+    Returns:
+        dict: time for the ensemble and for the separate solves, and the
+            largest relative difference between them in pr_c, u and v.
+    """
+    if cfg is None:
+        cfg = load_config()
+    eps_days = np.linspace(0.4, 1.4, number).tolist()
+    k_days = np.linspace(8, 13, number).tolist()
+
+    def member_atmos(eps: Union[float, list], k: Union[float, list]) -> Atmos:
+        member_cfg = cfg.copy()
+        with open_dict(member_cfg):
+            member_cfg.atm.eps_days = eps
+            member_cfg.atm.k_days = k
+        return bench_atmos(derived_param(member_cfg))
+
+    ts = time.perf_counter()
+    atmos = member_atmos(eps_days, k_days)
+    pr, pr_c, q_th, e1, qa1, mask = synthetic_inputs(atmos)
+    output = atmos.iterate(
+        pr, np.broadcast_to(pr_c, q_th.shape).copy(), q_th, e1, qa1, mask
+    )
+    results = {"members_ensemble": time.perf_counter() - ts, "members_separate": 0.0}
+
+    for name in ["pr_c", "u", "v"]:
+        results["members_" + name + "_max_rel_diff"] = 0.0
+    for i in range(number):
+        ts = time.perf_counter()
+        atmos = member_atmos(eps_days[i], k_days[i])
+        inputs = synthetic_inputs(atmos)
+        member_output = atmos.iterate(*inputs)
+        results["members_separate"] += time.perf_counter() - ts
+        for j, name in enumerate(["pr_c", "u", "v"]):
+            key = "members_" + name + "_max_rel_diff"
+            results[key] = max(
+                results[key],
+                float(
+                    np.max(np.abs(output[j][i] - member_output[j]))
+                    / np.max(np.abs(member_output[j]))
+                ),
+            )
+
+    for key in results:
+        print(key, results[key])
+
+    return results
+
+
+if __name__ == "__main__":
+    # python src/models/benchmark.py
+    bench_s91()
+    compare_solvers()
+    bench_members()
@@ -0,0 +1,159 @@
+"""Shared build cache for the ocean model binaries.
+
+Every run copies the Fortran/C sources of the ocean model into its own
+`ocean/SRC`, and used to `make all` there, so every member of a sweep
+compiled the same sources again. `build` instead hashes the sources, the
+Makefile, the commands that make would run (so the compiler names and flags)
+and the compiler versions. The binaries for each key are built once, in
+`OCEAN_BUILD_PATH/<key>`, and are then hard linked (or symlinked, across
+file systems) into each run's `ocean/SRC`. A lock on the key means that runs
+launched together wait for one compile rather than all compiling. If
+`make all` fails, nothing is cached and `build` raises with the make log.
+
+Finding the commands and compiler versions means running make and the
+compilers, so they are only found once in a process for each version of the
+sources.
+
+Example:
+    Link the binaries into a run::
+
+        from src.models.build import build
+
+        build(setup.ocean_src_path, ["tcom", "tios2cdf"])
+
+"""
+from typing import List
+from functools import lru_cache
+import os
+import glob
+import shutil
+import fcntl
+import hashlib
+from subprocess import run, PIPE, STDOUT, CalledProcessError
+from src.constants import OCEAN_BUILD_PATH
+
+SOURCES = ["*.F", "*.c", "*.h", "*.inc", "*.mod", "Makefile"]
+
+
+def _output(command: List[str], cwd: str) -> str:
+    # pylint: disable=subprocess-run-check
+    return run(
+        command, cwd=cwd, stdout=PIPE, stderr=STDOUT, universal_newlines=True
+    ).stdout
+
+
+def compilers(src_path: str) -> List[str]:
+    """The compilers that the Makefile picks.
+
+    Args:
+        src_path (str): directory with the Makefile.
+
+    Returns:
+        List[str]: the Fortran and C compilers.
+    """
+    rule = "compilers:\n\t@echo $(FC)\n\t@echo $(CC)"
+    return _output(["make", "-s", "--eval", rule, "compilers"], src_path).split()
+
+
+@lru_cache(maxsize=None)
+def _toolchain(src_path: str, sources: str) -> str:
+    """The commands make would run and the compiler versions, for a hash.
+
+    Args:
+        src_path (str): directory with the sources and Makefile.
+        sources (str): hash of the sources, so that a change finds them again.
+
+    Returns:
+        str: the output of `make -n -B all` and of each `--version`.
+    """
+    # the commands have the compiler names and flags in them.
+    output = _output(["make", "-n", "-B", "all"], src_path)
+    for compiler in compilers(src_path):
+        output += _output([compiler, "--version"], src_path)
+    return output
+
+
+def build_key(src_path: str) -> str:
+    """Hash of everything that the binaries depend on.
+
+    Args:
+        src_path (str): directory with the sources and Makefile.
+
+    Returns:
+        str: hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(
+        {x for pattern in SOURCES for x in glob.glob(os.path.join(src_path, pattern))}
+    ):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    digest.update(_toolchain(src_path, digest.hexdigest()).encode())
+    return digest.hexdigest()
+
+
+def _link(src: str, dst: str) -> None:
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # e.g. the cache is on another file system.
+        os.symlink(src, dst)
+
+
+def build(
+    src_path: str, binaries: List[str], cache: str = str(OCEAN_BUILD_PATH)
+) -> str:
+    """Build the binaries once for their sources, and link them into src_path.
+
+    Args:
+        src_path (str): directory with the sources and Makefile.
+        binaries (List[str]): the files that `make all` makes, e.g. tcom.
+        cache (str, optional): directory of the build cache.
+            Defaults to OCEAN_BUILD_PATH.
+
+    Returns:
+        str: the directory in the cache that the binaries are linked from.
+
+    Raises:
+        CalledProcessError: if `make all` fails or does not make all the
+            binaries, with the output of make.
+    """
+    key = build_key(src_path)
+    build_path = os.path.join(cache, key)
+    os.makedirs(cache, exist_ok=True)
+    with open(build_path + ".lock", "w") as lock:
+        # only one run compiles each key, the others wait and then link.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.isdir(build_path):
+            tmp_path = build_path + ".tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            for pattern in SOURCES:
+                for path in glob.glob(os.path.join(src_path, pattern)):
+                    shutil.copy2(path, tmp_path)
+            print("compiling the ocean model in", build_path)
+            # pylint: disable=subprocess-run-check
+            make = run(
+                ["make", "all"],
+                cwd=tmp_path,
+                stdout=PIPE,
+                stderr=STDOUT,
+                universal_newlines=True,
+            )
+            missing = [
+                x for x in binaries if not os.path.isfile(os.path.join(tmp_path, x))
+            ]
+            if make.returncode != 0 or missing:
+                shutil.rmtree(tmp_path)
+                print(make.stdout)
+                print("make all failed for", src_path, "missing", missing)
+                raise CalledProcessError(
+                    make.returncode or 1, make.args, output=make.stdout
+                )
+            os.replace(tmp_path, build_path)
+    for binary in binaries:
+        _link(os.path.join(build_path, binary), os.path.join(src_path, binary))
+    return build_path
@@ -0,0 +1,280 @@
+"""Checkpoint the coupled run after each iteration, so it can be resumed.
+
+After each coupling iteration, `Checkpoint.save` records in `checkpoint.json`
+in the run directory the files that the iteration produced, along with the
+metrics that were logged. The `it_N_*` forcing files, which are patched in
+place, are recorded by a content hash, and the `old_io` copies, which are only
+ever written whole, by their size and modification time. The outputs that the
+next iteration reads, but which every iteration writes again (`om_run2f.nc`,
+and the TCAM and dQ outputs of the atmosphere), are hard linked into
+`checkpoint/<it>/` and hashed. Their writers replace these files rather than
+truncate them, so the links keep the old contents without a copy. The links of
+the last two iterations are kept.
+
+If the job dies, `Checkpoint.last_complete` finds the newest iteration whose
+files are all still there and unchanged, and `Checkpoint.restore` puts its
+outputs back, so that `Coupling.run` can carry on from the next iteration.
+
+Example:
+    Resume a coupled run::
+
+        from src.models.checkpoint import Checkpoint
+
+        checkpoint = Checkpoint(setup)
+        it = checkpoint.last_complete()
+        if it >= 0:
+            metrics = checkpoint.restore(it)
+
+"""
+from typing import List
+import os
+import json
+import shutil
+import hashlib
+from src.models.model_setup import ModelSetup
+from src.models.forcing import clone
+
+
+def _stat(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def keep(path: str, copy: str) -> None:
+    """Hard link a file to a new path, or copy it if it cannot be linked.
+
+    Args:
+        path (str): the file.
+        copy (str): the new path, which is replaced if it exists.
+    """
+    if os.path.lexists(copy):
+        os.remove(copy)
+    try:
+        os.link(path, copy)
+    except OSError:
+        clone(path, copy)
+
+
+def file_hash(path: str, block: int = 2 ** 24) -> str:
+    """Content hash of a file.
+
+    Args:
+        path (str): path to the file.
+        block (int, optional): bytes to read at a time. Defaults to 2**24.
+
+    Returns:
+        str: hex digest.
+    """
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(block), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Manifest of the completed coupling iterations in a run directory."""
+
+    def __init__(self, setup: ModelSetup) -> None:
+        """Find the manifest of a run.
+
+        Args:
+            setup (ModelSetup): the setup object for the run.
+        """
+        self.setup = setup
+        self.path = os.path.join(setup.direc, "checkpoint.json")
+        self.state_path = os.path.join(setup.direc, "checkpoint")
+
+    def forcing(self, it: int) -> List[str]:
+        """The forcing files that iteration it wrote.
+
+        Args:
+            it (int): iteration.
+
+        Returns:
+            List[str]: paths to the files.
+        """
+        if it == 0:
+            return []
+        return [
+            self.setup.tau_x(it),
+            self.setup.tau_y(it),
+            self.setup.tau_clim_x(it),
+            self.setup.tau_clim_y(it),
+            self.setup.dq_df(it),
+            self.setup.dq_dt(it),
+            self.setup.ts_trend(it),
+            self.setup.ts_clim60(it),
+            self.setup.ts_clim(it),
+        ]
+
+    def outputs(self, it: int) -> List[str]:
+        """The files that iteration it produced, which later iterations keep.
+
+        Args:
+            it (int): iteration.
+
+        Returns:
+            List[str]: paths to the forcing files and the `old_io` copies.
+        """
+        files = self.forcing(it)
+        for part in ["om_run2f", "om_spin", "om_diag"]:
+            for ending in ["", ".tr", ".tios", ".log"]:
+                files.append(
+                    os.path.join(
+                        self.setup.ocean_old_io_path, str(it) + "_" + part + ending
+                    )
+                )
+        return files
+
+    def state(self) -> List[str]:
+        """The outputs that each iteration overwrites, and the next one reads.
+
+        Returns:
+            List[str]: paths to the files.
+        """
+        return [
+            self.setup.om_run2f_nc(),
+            self.setup.tcam_output(),
+            self.setup.dq_output(),
+        ]
+
+    def _state_copy(self, it: int, path: str) -> str:
+        return os.path.join(self.state_path, str(it), os.path.basename(path))
+
+    def read(self) -> List[dict]:
+        """The manifest entries, one for each completed iteration in order.
+
+        Returns:
+            List[dict]: entries with the iteration, forcing and state hashes,
+                `old_io` sizes and modification times, and metrics.
+        """
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as file:
+            return json.load(file)
+
+    def reset(self) -> None:
+        """Remove the manifest and the saved state, for a fresh run."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        shutil.rmtree(self.state_path, ignore_errors=True)
+
+    def save(self, it: int, metrics: dict) -> None:
+        """Record that iteration it has completed.
+
+        Args:
+            it (int): iteration.
+            metrics (dict): the metrics logged for the iteration.
+        """
+        os.makedirs(os.path.join(self.state_path, str(it)), exist_ok=True)
+        state = {}
+        for path in self.state():
+            if os.path.exists(path):
+                keep(path, self._state_copy(it, path))
+                state[path] = file_hash(self._state_copy(it, path))
+
+        forcing = self.forcing(it)
+        entries = [x for x in self.read() if x["it"] < it]
+        entries.append(
+            {
+                "it": it,
+                "forcing": {path: file_hash(path) for path in forcing},
+                "files": {
+                    path: _stat(path)
+                    for path in self.outputs(it)
+                    if path not in forcing
+                },
+                "state": state,
+                "metrics": {},
+            }
+        )
+        self._write(entries)
+        self.add_metrics(it, metrics)
+
+        # only the last iteration's state is needed to resume, and the one
+        # before in case the last is damaged.
+        for name in os.listdir(self.state_path):
+            if name not in [str(it), str(it - 1)]:
+                shutil.rmtree(os.path.join(self.state_path, name))
+
+    def _write(self, entries: List[dict]) -> None:
+        # write then rename, so a crash never leaves half a manifest.
+        with open(self.path + ".tmp", "w") as file:
+            json.dump(entries, file, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def add_metrics(self, it: int, metrics: dict) -> None:
+        """Record more metrics for an iteration, e.g. from the diagnostics.
+
+        Args:
+            it (int): iteration.
+            metrics (dict): the metrics, of which the numbers are kept.
+        """
+        entries = self.read()
+        for entry in entries:
+            if entry["it"] == it:
+                entry["metrics"].update(
+                    {
+                        key: value.item() if hasattr(value, "item") else value
+                        for key, value in metrics.items()
+                        if isinstance(value, (int, float, bool))
+                        or hasattr(value, "item")
+                    }
+                )
+        self._write(entries)
+
+    def valid(self, entry: dict) -> bool:
+        """Whether the files of an entry are all there and unchanged.
+
+        Args:
+            entry (dict): manifest entry.
+
+        Returns:
+            bool: True if every forcing file and state copy matches its hash,
+                and every `old_io` copy has its size and modification time.
+        """
+        hashes = dict(entry["forcing"])
+        hashes.update(
+            {self._state_copy(entry["it"], x): y for x, y in entry["state"].items()}
+        )
+        return all(
+            os.path.exists(path) and _stat(path) == list(stat)
+            for path, stat in entry["files"].items()
+        ) and all(
+            os.path.exists(path) and file_hash(path) == digest
+            for path, digest in hashes.items()
+        )
+
+    def last_complete(self) -> int:
+        """The newest iteration that can be resumed from.
+
+        The iterations before it must all have completed, and its files
+        must be unchanged. If the files of the last iteration have changed,
+        the one before is tried, and so on.
+
+        Returns:
+            int: the iteration, or -1 if there is none.
+        """
+        entries = self.read()
+        complete = 0
+        while complete < len(entries) and entries[complete]["it"] == complete:
+            complete += 1
+        for entry in reversed(entries[:complete]):
+            if self.valid(entry):
+                return entry["it"]
+        return -1
+
+    def restore(self, it: int) -> List[dict]:
+        """Put back the outputs of iteration it, to resume after it.
+
+        Args:
+            it (int): iteration from `last_complete`.
+
+        Returns:
+            List[dict]: the metrics logged for iterations 0 to it.
+        """
+        entries = self.read()[: it + 1]
+        for path in entries[-1]["state"]:
+            keep(self._state_copy(it, path), path)
+        return [x["metrics"] for x in entries]
@@ -7,18 +7,29 @@ Example:
         from src.models.coupling import Coupling
 
 """
-from typing import Tuple, Union
-from scipy.interpolate import interp2d
+from typing import Dict, List, Optional, Tuple, Union
+import os
+import shutil
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
 from scipy.constants import zero_Celsius
+import numpy as np
 import xarray as xr
 from typeguard import typechecked
 from omegaconf import DictConfig
 import wandb
+from src.constants import SEL_DICT, BLOW_UP_LIMITS
 from src.models.model_setup import ModelSetup
+from src.configs.config import number_members
 from src.models.atmos import Atmos
 from src.models.ocean import Ocean
+from src.models.regrid import regrid
+from src.models.forcing import clone, is_netcdf3, NetCDF3File
+from src.models.fixed_point import Anderson, Relaxation
+from src.models.checkpoint import Checkpoint
+from src.models.history import History
 from src.visualisation.nino import get_nino_trend
-from src.metrics import get_other_trends
+from src.metrics import get_other_trends, get_sst_trends
 from src.xr_utils import can_coords, open_dataset, cut_and_taper, get_trend
 from src.visualisation.ani import animate_coupling
 from src.visualisation.quiver import prcp_quiver_plot
@@ -30,6 +41,50 @@ from src.visualisation.comp_v_seager19 import (
 )
 
 
+def diagnostics(
+    setup: ModelSetup, it: int, path_of_run2f: str, path_of_tcam: str
+) -> dict:
+    """
+    Nino trends of an iteration, and the nino plot.
+
+    Runs in the background worker if coup.async_log.
+
+    Args:
+        setup (ModelSetup): the setup object for the run.
+        it (int): iteration.
+        path_of_run2f (str): path to the main ocean output netcdf.
+        path_of_tcam (str): path to the atmosphere output netcdf.
+
+    Returns:
+        dict: the metrics from get_nino_trend and get_other_trends.
+    """
+    d1 = get_nino_trend(path_of_run2f, setup.nino_png(it), setup.nino_nc(it))
+    d2 = get_other_trends(setup, path_of_run2f, path_of_tcam)
+    return {**d1, **d2}
+
+
+def cut_run2f(path_of_run2f: str, path: str) -> None:
+    """
+    Write the part of the ocean output that `diagnostics` reads.
+
+    That is the fields of `get_nino_trend` and `get_other_trends`, in the
+    window of the nino plot, which holds all of the nino regions. This is a
+    small part of the full output, so it is cheap to hand to the worker.
+
+    Args:
+        path_of_run2f (str): path to the main ocean output netcdf.
+        path (str): path to write the cut to.
+    """
+    ds = open_dataset(path_of_run2f)
+    xr.merge(
+        [
+            can_coords(ds[x]).sel(X=slice(95, 295), Y=slice(-32, 32))
+            for x in ["SST_SST", "TDEEP_HMODEL", "SST_QNET", "SST_W1"]
+        ]
+    ).to_netcdf(path)
+    ds.close()
+
+
 # pylint: disable=no-value-for-parameter
 class Coupling:
     """
@@ -65,11 +120,38 @@ class Coupling:
                 this run containing parameters.
 
         """
+        assert not number_members(cfg.atm), "parameter ensembles are atmosphere only"
         self.coup = cfg.coup
         self.cfg = cfg
         self.setup = setup
         self.ocean = Ocean(cfg, setup)
         self.atmos = Atmos(cfg, setup)
+        # state of the last iteration, for the convergence check.
+        self.last: Optional[dict] = None
+        self.sst_residuals: List[float] = []
+        self.converged = False
+        # accelerator for the coupled fixed point, and the last forcing fed in.
+        assert self.coup.solver in ["picard", "relax", "anderson"]
+        if self.coup.solver == "anderson":
+            self.mixer = Anderson(depth=self.coup.anderson_depth)
+        elif self.coup.solver == "relax":
+            self.mixer = Relaxation(factor=self.coup.relax_factor)
+        else:
+            self.mixer = None
+        self.forcing: Optional[np.ndarray] = None
+        self.checkpoint = Checkpoint(setup)
+        self.history = History(setup)
+        # the last atmosphere outputs, handed over in memory.
+        self.tcam: Optional[xr.Dataset] = None
+        self.dq: Optional[xr.Dataset] = None
+        # background worker for the diagnostics, and the ones still running.
+        if self.coup.async_log:
+            self.pool: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(
+                max_workers=1, mp_context=get_context("spawn")
+            )
+        else:
+            self.pool = None
+        self.pending: List[Tuple[dict, Future]] = []
 
     @typechecked
     def f_stress(
@@ -125,10 +207,26 @@ class Coupling:
                 "Y": ("Y", sfcw50.Y.values),
             }
         )
-        fuend = interp2d(u_vel.X, u_vel.Yu, u_vel, kind="linear")
-        ds["u_vel"] = (["Y", "X"], fuend(sfcw50.X.values, sfcw50.Y.values))
-        fvend = interp2d(v_vel.X, v_vel.Yv, v_vel, kind="linear")
-        ds["v_vel"] = (["Y", "X"], fvend(sfcw50.X.values, sfcw50.Y.values))
+        ds["u_vel"] = (
+            ["Y", "X"],
+            regrid(
+                u_vel.X.values,
+                u_vel.Yu.values,
+                u_vel.transpose("Yu", "X").values,
+                sfcw50.X.values,
+                sfcw50.Y.values,
+            ),
+        )
+        ds["v_vel"] = (
+            ["Y", "X"],
+            regrid(
+                v_vel.X.values,
+                v_vel.Yv.values,
+                v_vel.transpose("Yv", "X").values,
+                sfcw50.X.values,
+                sfcw50.Y.values,
+            ),
+        )
         t_u, t_v = self.f_stress(
             sfcw50,
             ds.u_vel,
@@ -151,17 +249,15 @@ class Coupling:
         #    ("t_utrend", "t_vtrend"),
         #    ("t_uend", "t_vend"),
         # ]
-        # ds = xr.open_dataset(self.setup.tcam_output())
+        # the atmosphere output from memory, or from disk after a resume.
+        if self.tcam is None:
+            ds = xr.open_dataset(self.setup.tcam_output())
+        else:
+            ds = self.tcam
         sfcwind = xr.open_dataset(self.setup.clim_file("sfcWind")).sfcWind
-        ubeg = xr.open_dataset(self.setup.tcam_output()).ubeg
-        vbeg = xr.open_dataset(self.setup.tcam_output()).vbeg
-        utrend = xr.open_dataset(self.setup.tcam_output()).utrend
-        vtrend = xr.open_dataset(self.setup.tcam_output()).vtrend
-        uend = xr.open_dataset(self.setup.tcam_output()).uend
-        vend = xr.open_dataset(self.setup.tcam_output()).vend
-        t_beg_u, t_beg_v = self.get_tau_anom(sfcwind, ubeg, vbeg)
-        t_end_u, t_end_v = self.get_tau_anom(sfcwind, uend, vend)
-        t_trend_u, t_trend_v = self.get_tau_anom(sfcwind, utrend, vtrend)
+        t_beg_u, t_beg_v = self.get_tau_anom(sfcwind, ds.ubeg, ds.vbeg)
+        t_end_u, t_end_v = self.get_tau_anom(sfcwind, ds.uend, ds.vend)
+        t_trend_u, t_trend_v = self.get_tau_anom(sfcwind, ds.utrend, ds.vtrend)
         t_beg_u = t_beg_u.rename("t_beg_u")
         t_beg_v = t_beg_v.rename("t_beg_v")
         t_end_u = t_end_u.rename("t_end_u")
@@ -170,7 +266,106 @@ class Coupling:
         t_trend_v = t_trend_v.rename("t_trend_v")
         return xr.merge([t_beg_u, t_beg_v, t_end_u, t_end_v, t_trend_u, t_trend_v])
 
-    def replace_stress(self, it: int) -> None:
+    def stress_ramp(
+        self,
+        tau: np.ndarray,
+        months: np.ndarray,
+        time_length: int,
+        trend: np.ndarray,
+        beg: np.ndarray,
+    ) -> np.ndarray:
+        """Apply the TCAM stress anomaly to some months of a stress field.
+
+        The anomaly ramps linearly in time over the run, with weight
+        (i / time_length - 1 / 2) for month i if coup.stress_trend, and
+        otherwise (i / time_length) plus the beginning state. It is either
+        added to the original ECMWF stress (coup.add_stress) or replaces it.
+
+        Args:
+            tau (np.ndarray): original stress in the window, shape (T, Y, X).
+            months (np.ndarray): the month index of each row of tau, shape (T,).
+            time_length (int): the number of months in the run.
+            trend (np.ndarray): stress trend from TCAM, shape (Y, X).
+            beg (np.ndarray): stress at the beginning from TCAM, shape (Y, X).
+
+        Returns:
+            np.ndarray: the new stress in the window, shape (T, Y, X).
+        """
+        weight = months / time_length
+        if self.cfg.coup.stress_trend:
+            weight = weight - 1 / 2
+        new = weight[:, np.newaxis, np.newaxis] * trend
+        if self.cfg.coup.add_stress:
+            new = tau + new
+        if not self.cfg.coup.stress_trend:
+            new = new + beg
+        return new
+
+    def patch_stress(
+        self,
+        name: str,
+        template: str,
+        path: str,
+        trend: xr.DataArray,
+        beg: xr.DataArray,
+        chunk: int = 120,
+    ) -> None:
+        """Write a stress file with the TCAM anomaly from a template.
+
+        The template is cloned, and the window between rows 40 and 141
+        (50S to 50N) of the first level is patched in place, `chunk` months
+        at a time, so the full stress record is never held in memory. A
+        template that is not netCDF classic is instead loaded and written out
+        in full, as netCDF classic.
+
+        Args:
+            name (str): stress variable, with dims (T, Z, Y, X).
+            template (str): iteration 0 stress file.
+            path (str): stress file for this iteration.
+            trend (xr.DataArray): stress trend from TCAM, dims (Y, X).
+            beg (xr.DataArray): stress at the beginning from TCAM, dims (Y, X).
+            chunk (int, optional): months to patch at a time. Defaults to 120.
+        """
+        tau_ds = xr.open_dataset(template, decode_times=False)
+        tau = tau_ds[name]
+        # the anomaly has to be on the grid of the window, up to rounding
+        # (to a thousandth of a degree), and is then written by position.
+        window = tau[0, 0, 40:141, :]
+        trend, beg = (x.transpose(*window.dims) for x in [trend, beg])
+        for x in [trend, beg]:
+            assert x.shape == window.shape, "stress anomaly not on the window"
+            for dim in window.dims:
+                assert np.allclose(
+                    x[dim], window[dim], rtol=0, atol=1e-3
+                ), "stress anomaly not on the window"
+        trend, beg = trend.values, beg.values
+        time_length = tau.shape[0]
+        if not is_netcdf3(template):
+            window = (slice(None), 0, slice(40, 141), slice(None))
+            values = tau.values.copy()
+            values[window] = self.stress_ramp(
+                values[window], np.arange(time_length), time_length, trend, beg
+            )
+            tau_ds[name] = tau.copy(data=values)
+            tau_ds.to_netcdf(path, format="NETCDF3_CLASSIC")
+            tau_ds.close()
+            return
+        tau_ds.close()
+
+        clone(template, path)
+        with NetCDF3File(path) as forcing:
+            for start in range(0, time_length, chunk):
+                months = np.arange(start, min(start + chunk, time_length))
+                window = (slice(start, months[-1] + 1), 0, slice(40, 141), slice(None))
+                forcing.write(
+                    name,
+                    window,
+                    self.stress_ramp(
+                        forcing.read(name, window), months, time_length, trend, beg
+                    ),
+                )
+
+    def replace_stress(self, it: int, ds: Optional[xr.Dataset] = None) -> None:
         """Replace the stress files.
 
         Currently just resaves the clim files with a diff name.
@@ -184,78 +379,28 @@ class Coupling:
 
         Args:
             it: the iteration in the coupling scheme.
+            ds (Optional[xr.Dataset], optional): the stress anomaly from
+                `tau_anom_ds`. Defaults to None, which calculates it.
 
         """
         # tau
-        ds = self.tau_anom_ds()
-        taux = xr.open_dataset(self.setup.tau_x(0), decode_times=False)
-        taux_trend = ds.t_trend_u
-        taux_beg = ds.t_beg_u
-        taux_new = taux.copy()
-        tauy = xr.open_dataset(self.setup.tau_y(0), decode_times=False)
-        tauy_trend = ds.t_trend_v
-        tauy_beg = ds.t_beg_v
-        tauy_new = tauy.copy()
-        # ah ok, this is definitely wrong
-        time_length = len(tauy.coords["T"].values)
-        # TODO: There is definitely a more elegant way of doing this.
-        for i in range(time_length):
-            if self.cfg.coup.add_stress:
-                if self.cfg.coup.stress_trend:
-                    taux_new["taux"][i, 0, 40:141, :] = (
-                        taux.taux[i, 0, 40:141, :]
-                        + (i / time_length - 1 / 2) * taux_trend[:, :]
-                    )
-                    tauy_new["tauy"][i, 0, 40:141, :] = (
-                        tauy.tauy[i, 0, 40:141, :]
-                        + (i / time_length - 1 / 2) * tauy_trend[:, :]
-                    )
-                else:
-                    taux_new["taux"][i, 0, 40:141, :] = (
-                        taux.taux[i, 0, 40:141, :]
-                        + (i / time_length) * taux_trend[:, :]
-                        + taux_beg[:, :]
-                    )
-                    tauy_new["tauy"][i, 0, 40:141, :] = (
-                        tauy.tauy[i, 0, 40:141, :]
-                        + (i / time_length) * tauy_trend[:, :]
-                        + tauy_beg[:, :]
-                    )
-
-            else:
-                if self.cfg.coup.stress_trend:
-                    taux_new["taux"][i, 0, 40:141, :] = (
-                        +(i / time_length - 1 / 2) * taux_trend[:, :]
-                    )
-                    tauy_new["tauy"][i, 0, 40:141, :] = (
-                        +(i / time_length - 1 / 2) * tauy_trend[:, :]
-                    )
-                else:
-                    taux_new["taux"][i, 0, 40:141, :] = (
-                        +(i / time_length) * taux_trend[:, :]
-                        + tauy_beg[:, :]
-                    )
-                    tauy_new["tauy"][i, 0, 40:141, :] = (
-                        +(i / time_length) * tauy_trend[:, :]
-                        + tauy_beg[:, :]
-                    )
-
-        taux_new.to_netcdf(self.setup.tau_x(it), format="NETCDF3_CLASSIC")
-        tauy_new.to_netcdf(self.setup.tau_y(it), format="NETCDF3_CLASSIC")
+        if ds is None:
+            ds = self.tau_anom_ds()
+        # as it always has, the x stress starts from the y stress when it
+        # replaces the ECMWF stress.
+        taux_beg = ds.t_beg_u if self.cfg.coup.add_stress else ds.t_beg_v
+        self.patch_stress(
+            "taux", self.setup.tau_x(0), self.setup.tau_x(it), ds.t_trend_u, taux_beg
+        )
+        self.patch_stress(
+            "tauy", self.setup.tau_y(0), self.setup.tau_y(it), ds.t_trend_v, ds.t_beg_v
+        )
 
         # doesn't change tau. TODO: Change tau
         # !!! WARNING: DOES NOTHING !!!
         # !!! JUST ADDED TO MAKE SURE PROCESS WORKS !!!
-        taux_clim_obj = xr.open_dataset(self.setup.tau_clim_x(0), decode_times=False)
-        taux_clim_obj.to_netcdf(
-            self.setup.tau_clim_x(it),
-            format="NETCDF3_CLASSIC",
-        )
-        tauy_clim_obj = xr.open_dataset(self.setup.tau_clim_y(0), decode_times=False)
-        tauy_clim_obj.to_netcdf(
-            self.setup.tau_clim_y(it),
-            format="NETCDF3_CLASSIC",
-        )
+        clone(self.setup.tau_clim_x(0), self.setup.tau_clim_x(it))
+        clone(self.setup.tau_clim_y(0), self.setup.tau_clim_y(it))
 
     def replace_dq(self, it: int) -> None:
         """
@@ -263,33 +408,59 @@ class Coupling:
 
         dQdf
         dQdT
+
+        The templates are patched in place if they are netCDF classic, and
+        otherwise written out in full, as netCDF classic.
         """
-        dq_df_from_atm = open_dataset(self.setup.dq_output()).dq_df
-        dq_df_sample = xr.open_dataarray(
-            self.setup.dq_df(0),
-            decode_times=False,
-        )
-        dq_df_new = dq_df_sample.copy()
-        for t in range(12):
-            dq_df_new[t, 0, 30:151, :] = can_coords(dq_df_from_atm)[:, :]
-        dq_df_new.to_dataset().to_netcdf(
-            self.setup.dq_df(it),
-            format="NETCDF3_CLASSIC",
-        )
-        dq_dt_from_atm = open_dataset(self.setup.dq_output()).dq_dt
-        dq_dt_sample = xr.open_dataarray(
-            self.setup.dq_dt(0),
-            decode_times=False,
-        )
-        dq_dt_new = dq_dt_sample.copy()
-        for t in range(12):
-            dq_dt_new[t, 0, 30:151, :] = can_coords(dq_dt_from_atm)[:, :]
-        dq_dt_new.to_dataset().to_netcdf(
-            self.setup.dq_dt(it),
-            format="NETCDF3_CLASSIC",
-        )
+        if self.dq is None:
+            dq_from_atm = open_dataset(self.setup.dq_output())
+        else:
+            dq_from_atm = self.dq
+        for var, file_name in [
+            ("dq_df", self.setup.dq_df),
+            ("dq_dt", self.setup.dq_dt),
+        ]:
+            sample = xr.open_dataarray(file_name(0), decode_times=False)
+            name, dims = sample.name, sample.dims[-2:]
+            # same field for each of the 12 months.
+            window = (slice(0, 12), 0, slice(30, 151), slice(None))
+            new = can_coords(dq_from_atm[var]).transpose(*dims).values
+            if not is_netcdf3(file_name(0)):
+                values = sample.values.copy()
+                values[window] = new
+                sample.copy(data=values).to_dataset().to_netcdf(
+                    file_name(it), format="NETCDF3_CLASSIC"
+                )
+                sample.close()
+                continue
+            sample.close()
+            clone(file_name(0), file_name(it))
+            with NetCDF3File(file_name(it)) as forcing:
+                forcing.write(name, window, new)
+
+    @staticmethod
+    def write_ts(template: str, path: str, new: xr.Dataset) -> None:
+        """Write a surface temperature file for the atmosphere.
+
+        The template is cloned and patched if it is netCDF classic, and
+        otherwise the dataset is written out in full.
 
-    def replace_surface_temp(self, it: int) -> None:
+        Args:
+            template (str): iteration 0 file.
+            path (str): file for this iteration.
+            new (xr.Dataset): the new dataset, on the grid of the template.
+        """
+        if is_netcdf3(template):
+            clone(template, path)
+            with NetCDF3File(path) as forcing:
+                for name in new.data_vars:
+                    forcing.write(name, (), new[name].values)
+        else:
+            new.to_netcdf(path)
+
+    def replace_surface_temp(
+        self, it: int, trend: Optional[xr.DataArray] = None
+    ) -> None:
         """
         Replace sst for forcing atmosphere model.
 
@@ -297,22 +468,17 @@ class Coupling:
 
         Args:
             it (int): iteration.
+            trend (Optional[xr.DataArray], optional): the SST trend from
+                `sst_trend`. Defaults to None, which calculates it.
         """
         mask = open_dataset(self.setup.om_mask()).mask
 
         sst = can_coords(open_dataset(self.setup.om_run2f_nc()).SST_SST)
         sst_c_mean = sst.mean("T").isel(Z=0).drop("Z")
 
-        trend_new = (
-            (
-                get_trend(sst + zero_Celsius, min_clim_f=True)
-                .rename("ts")
-                .isel(Z=0)
-                .drop("Z")
-            )
-            .where(mask != 0.0)
-            .fillna(0.0)
-        )
+        if trend is None:
+            trend = self.sst_trend()
+        trend_new = trend.rename("ts").fillna(0.0)
         trend_old = xr.open_dataset(self.setup.ts_trend(0), decode_times=False)
         trend_final = trend_old.copy()
         trend_final["ts"][10:171, :] = (
@@ -320,7 +486,9 @@ class Coupling:
         )
         trend_final["ts"][10:171, :] = trend_new[:, :] + trend_final.ts[10:171, :]
         # xr.testing.assert_allclose(trend_final, trend_old, atol=10)
-        trend_final.fillna(0.0).to_netcdf(self.setup.ts_trend(it))
+        self.write_ts(
+            self.setup.ts_trend(0), self.setup.ts_trend(it), trend_final.fillna(0.0)
+        )
 
         # sst_mean: take mean
         # take mean
@@ -340,7 +508,9 @@ class Coupling:
             )[:, :]
         )
         # xr.testing.assert_allclose(sst_mean60_final, sst_mean60_old, atol=10)
-        sst_mean60_final.to_netcdf(self.setup.ts_clim60(it))
+        self.write_ts(
+            self.setup.ts_clim60(0), self.setup.ts_clim60(it), sst_mean60_final
+        )
 
         # ts_clim
         sst_b = sst_mean.rename({"Y": "Y", "X": "X"})
@@ -350,71 +520,327 @@ class Coupling:
             10:171, :
         ].where(mask == 0.0).fillna(0.0)
         # xr.testing.assert_allclose(sst_mean_final, sst_mean_old, atol=10)
-        sst_mean_final.to_netcdf(self.setup.ts_clim(it))
+        self.write_ts(self.setup.ts_clim(0), self.setup.ts_clim(it), sst_mean_final)
+
+    def sst_trend(self) -> xr.DataArray:
+        """
+        SST trend over the last ocean run, masked over land.
+
+        Returns:
+            xr.DataArray: trend, dims (Y, X).
+        """
+        mask = open_dataset(self.setup.om_mask()).mask
+        sst = can_coords(open_dataset(self.setup.om_run2f_nc()).SST_SST)
+        return (
+            get_trend(sst + zero_Celsius, min_clim_f=True).isel(Z=0).drop("Z")
+        ).where(mask != 0.0)
+
+    def mixed_forcing(
+        self, tau: Optional[xr.Dataset] = None
+    ) -> Tuple[xr.DataArray, xr.Dataset]:
+        """
+        SST trend and stress anomaly to force the next iteration.
 
-    def log(self, it: int) -> None:
+        The coupling is a fixed point iteration for these fields. With
+        coup.solver "relax" or "anderson", the fields from the last ocean
+        and atmosphere runs are mixed with the forcing that produced them
+        (see `src.models.fixed_point`), rather than used as they are.
+
+        Args:
+            tau (Optional[xr.Dataset], optional): the stress anomaly from
+                `tau_anom_ds` for the last atmosphere output. Defaults to
+                None, which calculates it.
+
+        Returns:
+            Tuple[xr.DataArray, xr.Dataset]: the SST trend for
+                `replace_surface_temp` and the stress anomaly for
+                `replace_stress`.
+        """
+        sst_trend = self.sst_trend()
+        if tau is None:
+            tau = self.tau_anom_ds()
+        if self.mixer is None:
+            return sst_trend, tau
+
+        names = ["t_trend_u", "t_beg_u", "t_trend_v", "t_beg_v"]
+        fields = [sst_trend] + [tau[name] for name in names]
+        g_x = np.concatenate([np.nan_to_num(x.values).ravel() for x in fields])
+        if self.forcing is None:
+            x_new = g_x
+        else:
+            x_new = self.mixer.update(self.forcing, g_x)
+        self.forcing = x_new
+
+        mixed, start = [], 0
+        for field in fields:
+            values = x_new[start : start + field.size].reshape(field.shape)
+            mixed.append(
+                field.copy(data=np.where(field.isnull().values, np.nan, values))
+            )
+            start += field.size
+        return mixed[0], tau.assign(dict(zip(names, mixed[1:])))
+
+    def convergence(self, nino_dict: dict) -> dict:
+        """
+        Compare this iteration with the last one to decide whether to stop.
+
+        The residuals are the largest change in the SST trend over the ocean,
+        and in the SST trend of the nino regions. The coupling has converged
+        when both are below coup.sst_tol and coup.nino_tol. It has blown up
+        if the mean SSTs are outside of BLOW_UP_LIMITS, and is diverging if
+        the SST residual has grown for coup.diverge_after iterations in a row.
+
+        Args:
+            nino_dict (dict): the SST metrics from get_nino_trend.
+
+        Returns:
+            dict: residuals and decisions, to log.
+        """
+        sst_trend = self.sst_trend()
+        nino = {reg: nino_dict["trend_" + reg] for reg in SEL_DICT}
+        if self.last is None:
+            sst_res, nino_res = np.nan, np.nan
+        else:
+            sst_res = float(abs(sst_trend - self.last["sst_trend"]).max())
+            nino_res = max(abs(nino[reg] - self.last["nino"][reg]) for reg in nino)
+        self.last = {"sst_trend": sst_trend, "nino": nino}
+        self.sst_residuals.append(sst_res)
+
+        blown_up = not all(
+            limits[0] < nino_dict[key] < limits[1]
+            for key, limits in BLOW_UP_LIMITS.items()
+        )
+        recent = self.sst_residuals[-self.coup.diverge_after - 1 :]
+        diverging = len(recent) > self.coup.diverge_after and bool(
+            np.all(np.diff(recent) > 0)
+        )
+        converged = sst_res < self.coup.sst_tol and nino_res < self.coup.nino_tol
+        stop = converged or (self.coup.stop_on_blow_up and (blown_up or diverging))
+        self.converged = converged
+        return {
+            "sst_res": sst_res,
+            "nino_res": nino_res,
+            "converged": converged,
+            "blown_up": blown_up,
+            "diverging": diverging,
+            "stop": stop,
+        }
+
+    def log(self, it: int) -> dict:
         """
         Log the important information about the run.
 
         Args:
             it (int): Which iteration are we on?
+
+        Returns:
+            dict: the logged metrics, where "stop" is whether to stop the
+                coupling after this iteration.
         """
         print("logging")
-        d1 = get_nino_trend(
-            self.setup.om_run2f_nc(),
-            self.setup.nino_png(it),
-            self.setup.nino_nc(it),
-        )
-        d2 = get_other_trends(self.setup)
-        d3 = {**d1, **d2}
+        # the diagnostics read the atmosphere output from disk.
+        self.atmos.wait_for_output()
+        if self.pool is None:
+            d1 = diagnostics(
+                self.setup, it, self.setup.om_run2f_nc(), self.setup.tcam_output()
+            )
+        else:
+            # the next iterations overwrite the outputs, so the worker gets a
+            # copy of the part that it reads, from which the sst trends for
+            # the convergence check are also taken.
+            snapshot = self.setup.diagnostics_snapshot(it)
+            os.makedirs(snapshot, exist_ok=True)
+            paths = [
+                os.path.join(snapshot, os.path.basename(x))
+                for x in [self.setup.om_run2f_nc(), self.setup.tcam_output()]
+            ]
+            cut_run2f(self.setup.om_run2f_nc(), paths[0])
+            clone(self.setup.tcam_output(), paths[1])
+            d1 = get_sst_trends(paths[0])
+        d4 = self.convergence(d1)
+        print("iteration", it, d4)
+        d3 = {**d1, **self.atmos.metrics, **d4}
         d3["it"] = it
         d3["ocean_run"] = self.ocean.run_time
-        if self.cfg.wandb:
-            wandb.log(d3)
+        for stage, seconds in self.ocean.timings.items():
+            d3["ocean_time_" + stage] = seconds
+        if self.pool is None:
+            if self.cfg.wandb:
+                wandb.log(d3)
+        else:
+            self.pending.append(
+                (d3, self.pool.submit(diagnostics, self.setup, it, *paths))
+            )
+        return d3
 
-    def run(self) -> None:
+    def flush(self, wait: bool = False) -> None:
         """
-        Run coupling.
+        Log the diagnostics from the background worker, in order.
 
-        TODO: is this the right way to couple?
+        Args:
+            wait (bool, optional): whether to wait for all of them, rather
+                than only logging the ones that have finished. Defaults to False.
+        """
+        while self.pending and (wait or self.pending[0][1].done()):
+            metrics, future = self.pending.pop(0)
+            metrics = {**future.result(), **metrics}
+            shutil.rmtree(self.setup.diagnostics_snapshot(metrics["it"]))
+            self.checkpoint.add_metrics(metrics["it"], metrics)
+            self.history.add_metrics(metrics["it"], metrics)
+            if self.cfg.wandb:
+                wandb.log(metrics)
+
+    def history_fields(self, it: int, tau: xr.Dataset) -> Dict[str, xr.DataArray]:
         """
-        print("setting up spin up run")
+        The fields passed between the models in iteration it.
 
-        # Initial set up.
-        self.ocean.compile_all()
-        self.ocean.edit_run()
+        The forcing files are sampled where `animate_coupling` plots them:
+        month 600 of the stress, and month 1 of dQ, with canonical
+        coordinates, as `animate_coupling` would read them.
+
+        Args:
+            it (int): iteration.
+            tau (xr.Dataset): the stress anomaly from `tau_anom_ds` for the
+                atmosphere output of this iteration.
 
-        if self.cfg.run:
-            self.ocean.run_all(it=0)
+        Returns:
+            Dict[str, xr.DataArray]: fields for the history, by name.
+        """
+        tcam = self.tcam
+        if tcam is None:
+            tcam = open_dataset(self.setup.tcam_output())
+        dq = self.dq
+        if dq is None:
+            dq = open_dataset(self.setup.dq_output())
+        fields = {"sst_trend": self.last["sst_trend"]}
+        fields.update({x: tcam[x] for x in ["utrend", "vtrend", "PRtrend"]})
+        fields.update(
+            {x: tau[x] for x in ["t_trend_u", "t_trend_v", "t_beg_u", "t_beg_v"]}
+        )
+        fields.update({x: dq[x] for x in ["dq_df", "dq_dt"]})
+
+        # the forcing that the models were run with in this iteration.
+        for name, path, index in [
+            ("taux", self.setup.tau_x(it), {"T": 600}),
+            ("tauy", self.setup.tau_y(it), {"T": 600}),
+            ("dq_df", self.setup.dq_df(it), {"T": 1}),
+            ("dq_dt", self.setup.dq_dt(it), {"T": 1}),
+            ("ts_clim", self.setup.ts_clim(it), {}),
+            ("ts_trend", self.setup.ts_trend(it), {}),
+        ]:
+            with open_dataset(path, use_can_coords=True) as ds:
+                da = ds[name] if name in ds else list(ds.data_vars.values())[0]
+                fields["forcing_" + name] = da.isel(index).squeeze(drop=True).load()
+        return fields
+
+    def resume(self, it: int) -> bool:
+        """
+        Restore the run after iteration it from the checkpoint.
 
-        # atmos model.
-        if self.cfg.atmos:
-            # atmos takes in cfg
-            self.atmos.run_all()
+        The outputs of the iteration are put back, the metrics of the
+        iterations so far are logged again, so that the new wandb run has the
+        whole history, and the convergence monitor carries on from them. The
+        accelerator (coup.solver) starts again with an empty history, and the
+        atmosphere warm starts (atm.warm_start) from the restored TCAM output.
 
-        self.ocean.copy_old_io(0)
-        self.log(0)
+        Args:
+            it (int): the last completed iteration.
 
-        for it in range(1, self.coup.iterations):
+        Returns:
+            bool: whether the coupling had already stopped after iteration it.
+        """
+        print("resuming after coupling iteration", it)
+        history = self.checkpoint.restore(it)
+        if self.cfg.wandb:
+            for metrics in history:
+                wandb.log(metrics)
+        self.sst_residuals = [x["sst_res"] for x in history]
+        self.last = {
+            "sst_trend": self.sst_trend(),
+            "nino": {reg: history[-1]["trend_" + reg] for reg in SEL_DICT},
+        }
+        self.converged = history[-1]["converged"]
+        if self.cfg.atm.warm_start:
+            with open_dataset(self.setup.tcam_output()) as tcam:
+                self.atmos.warm_start(tcam)
+        return history[-1]["stop"]
+
+    def run(self) -> None:
+        """
+        Run coupling.
+
+        If coup.resume, carries on after the last iteration recorded in the
+        checkpoint (see `src.models.checkpoint`), if there is one.
+
+        TODO: is this the right way to couple?
+        """
+        it = self.checkpoint.last_complete() if self.coup.resume else -1
+        if it >= 0:
+            stop = self.resume(it)
+            tau = self.tau_anom_ds()
+        else:
+            print("setting up spin up run")
+            self.checkpoint.reset()
+            self.history.reset()
+
+            # Initial set up.
+            self.ocean.compile_all()
+            self.ocean.edit_run()
+
+            if self.cfg.run:
+                self.ocean.run_all(it=0)
+
+            # atmos model.
+            if self.cfg.atmos:
+                # atmos takes in cfg
+                self.tcam, self.dq = self.atmos.run_all()
+
+            self.ocean.copy_old_io(0)
+            it = 0
+            metrics = self.log(it)
+            self.checkpoint.save(it, metrics)
+            tau = self.tau_anom_ds()
+            self.history.append(it, self.history_fields(it, tau), metrics)
+            stop = metrics["stop"]
+
+        while not stop and it < self.coup.iterations - 1:
+            it += 1
             print(
                 "coupling number ",
                 it,
                 " of " + str(self.coup.iterations) + " iterations.",
             )
+            sst_trend, tau_anom = self.mixed_forcing(tau)
             self.replace_dq(it)
-            self.replace_stress(it)
-            self.replace_surface_temp(it)
+            self.replace_stress(it, tau_anom)
+            self.replace_surface_temp(it, sst_trend)
             self.ocean.edit_inputs(it)
             # self.ocean.rename(x)
             if self.cfg.run:
                 self.ocean.run_all(it=it)
-                self.atmos.run_all(it=it)
+                self.tcam, self.dq = self.atmos.run_all(it=it)
 
             # log wandb information
-            self.log(it)
+            self.flush()
+            metrics = self.log(it)
 
             # copy old io.
             self.ocean.copy_old_io(it)
+            self.checkpoint.save(it, metrics)
+            # the stress anomaly of this output, for the history and the
+            # forcing of the next iteration.
+            tau = self.tau_anom_ds()
+            self.history.append(it, self.history_fields(it, tau), metrics)
+            stop = metrics["stop"]
+
+        print("coupling stopped after", it + 1, "iterations.")
+        for path in self.setup.check_inputs():
+            print("warning: the shared input", path, "was written to by this run.")
+        self.flush(wait=True)
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.cfg.wandb:
+            wandb.log({"coupling_iterations": it + 1, "converged": self.converged})
 
         print(self.cfg.comp.sst, self.cfg.comp.prwnd, self.cfg.comp.htherm)
 
@@ -436,10 +862,10 @@ class Coupling:
             up_therm_qnet(self.setup, save_path=self.setup.tuq_trend_plot())
             prcp_quiver_plot(self.setup, save_path=self.setup.prcp_quiver_plot())
             self.ocean.animate_all()
-            animate_coupling(self.setup)
-            animate_coupling(self.setup, pac=True)
-            animate_coupling(self.setup, pac=True, mask_land=True)
-            animate_coupling(self.setup, pac=False, mask_land=True)
+            animate_coupling(self.setup, iterations=it + 1)
+            animate_coupling(self.setup, pac=True, iterations=it + 1)
+            animate_coupling(self.setup, pac=True, mask_land=True, iterations=it + 1)
+            animate_coupling(self.setup, pac=False, mask_land=True, iterations=it + 1)
             if self.cfg.wandb:
                 d_2 = {
                     "coupling_video_pac_mask_land": wandb.Video(
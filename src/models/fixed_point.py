@@ -0,0 +1,171 @@
+"""Accelerators for the fixed point iterations in the models.
+
+Both the TCAM precipitation loop in `src.models.atmos` and the
+ocean-atmosphere coupling in `src.models.coupling` find a fixed point
+x = g(x) by plain (Picard) iteration, x_{k+1} = g(x_k).
+
+Anderson mixing uses the last few iterates to extrapolate a better next guess,
+which needs far fewer evaluations of g when g is close to linear. Relaxation
+damps the Picard step instead, which helps when plain iteration overshoots.
+
+Walker, H.F. and Ni, P., 2011. Anderson acceleration for fixed-point
+iterations. SIAM Journal on Numerical Analysis, 49(4), pp.1715-1735.
+
+Example:
+    Usage in a fixed point loop::
+
+        from src.models.fixed_point import Anderson
+
+        mixer = Anderson(depth=5)
+        for _ in range(number_iterations):
+            g_x = g(x)
+            x = mixer.update(x, g_x)
+
+"""
+from typing import Optional
+import numpy as np
+
+
+class Anderson:
+    """Anderson mixing (type II) for a fixed point x = g(x)."""
+
+    def __init__(
+        self,
+        depth: int = 5,
+        batch_ndim: int = 0,
+        restart_factor: float = 2.0,
+        lower: Optional[float] = None,
+    ) -> None:
+        """Initialise the mixer with an empty history.
+
+        Args:
+            depth (int, optional): how many previous iterates to mix.
+                Defaults to 5.
+            batch_ndim (int, optional): number of leading axes that are
+                independent fixed point problems, each mixed separately.
+                Defaults to 0.
+            restart_factor (float, optional): safeguard. If the residual of
+                a batch entry grows by more than this factor, the history of
+                that entry is cleared and it takes a plain Picard step.
+                Defaults to 2.0.
+            lower (Optional[float], optional): lower bound to clip the mixed
+                iterate to, e.g. 0.0 for precipitation. Defaults to None.
+        """
+        self.depth = depth
+        self.batch_ndim = batch_ndim
+        self.restart_factor = restart_factor
+        self.lower = lower
+        # how many times a batch entry has been restarted.
+        self.restarts = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the history of iterates."""
+        self._x_hist: list = []
+        self._f_hist: list = []
+        # for each batch entry, the first iterate in the history to mix.
+        self._start: Optional[np.ndarray] = None
+
+    def update(self, x: np.ndarray, g_x: np.ndarray) -> np.ndarray:
+        """Return the next iterate, given the last one and its image under g.
+
+        Args:
+            x (np.ndarray): last iterate.
+            g_x (np.ndarray): g(x), the plain Picard update.
+
+        Returns:
+            np.ndarray: the mixed next iterate.
+        """
+        shape = x.shape
+        batch = int(np.prod(shape[: self.batch_ndim]))
+        x_flat = x.reshape(batch, -1)
+        f_flat = (g_x - x).reshape(batch, -1)
+
+        if self._start is None:
+            self._start = np.zeros(batch, dtype=int)
+        # safeguard: start the entries whose residual has grown again from a
+        # Picard step, by dropping their history.
+        if self._f_hist:
+            grown = np.linalg.norm(f_flat, axis=-1) > self.restart_factor * (
+                np.linalg.norm(self._f_hist[-1], axis=-1)
+            )
+            self._start[grown] = len(self._f_hist)
+            self.restarts += int(np.sum(grown))
+
+        self._x_hist.append(x_flat)
+        self._f_hist.append(f_flat)
+        if len(self._x_hist) > self.depth + 1:
+            self._x_hist.pop(0)
+            self._f_hist.pop(0)
+            self._start = np.maximum(self._start - 1, 0)
+
+        if len(self._x_hist) == 1:
+            x_next = g_x.copy()
+        else:
+            # differences between successive iterates, shape (batch, n, m),
+            # without those from before an entry was restarted.
+            kept = np.arange(len(self._x_hist) - 1) >= self._start[:, None]
+            d_x = np.stack(np.diff(self._x_hist, axis=0), axis=-1) * kept[:, None]
+            d_f = np.stack(np.diff(self._f_hist, axis=0), axis=-1) * kept[:, None]
+            # least squares for gamma in each batch via the normal equations.
+            gram = np.einsum("bnm,bnk->bmk", d_f, d_f)
+            reg = 1e-10 * np.trace(gram, axis1=-2, axis2=-1)[:, None, None]
+            gram += (reg + np.finfo(float).tiny) * np.eye(gram.shape[-1])
+            rhs = np.einsum("bnm,bn->bm", d_f, f_flat)
+            gamma = np.linalg.solve(gram, rhs[..., None])[..., 0]
+            x_next = (
+                x_flat + f_flat - np.einsum("bnm,bm->bn", d_x + d_f, gamma)
+            ).reshape(shape)
+
+        if self.lower is not None:
+            x_next[x_next < self.lower] = self.lower
+
+        return x_next
+
+
+class Relaxation:
+    """Under-relaxation x_{k+1} = x_k + w (g(x_k) - x_k), with adaptive w."""
+
+    def __init__(
+        self,
+        factor: float = 0.5,
+        grow: float = 1.2,
+        shrink: float = 0.5,
+        max_factor: float = 1.0,
+    ) -> None:
+        """Initialise the relaxation factor.
+
+        Args:
+            factor (float, optional): starting relaxation factor w.
+                Defaults to 0.5.
+            grow (float, optional): w is multiplied by this while the
+                residual falls. Defaults to 1.2.
+            shrink (float, optional): w is multiplied by this when the
+                residual grows. Defaults to 0.5.
+            max_factor (float, optional): largest w. Defaults to 1.0,
+                a Picard step.
+        """
+        self.factor = factor
+        self.grow = grow
+        self.shrink = shrink
+        self.max_factor = max_factor
+        self._last_res: Optional[float] = None
+
+    def update(self, x: np.ndarray, g_x: np.ndarray) -> np.ndarray:
+        """Return the next iterate, given the last one and its image under g.
+
+        Args:
+            x (np.ndarray): last iterate.
+            g_x (np.ndarray): g(x), the plain Picard update.
+
+        Returns:
+            np.ndarray: the relaxed next iterate.
+        """
+        res = float(np.linalg.norm(g_x - x))
+        if self._last_res is not None:
+            if res > self._last_res:
+                self.factor *= self.shrink
+            else:
+                self.factor = min(self.factor * self.grow, self.max_factor)
+        self._last_res = res
+        return x + self.factor * (g_x - x)
@@ -0,0 +1,229 @@
+"""Patch the forcing files for each coupling iteration in place.
+
+Each coupling iteration writes new forcing files for the ocean model
+(`it_N_tau.x/.y`, `it_N_dq_df.nc`, `it_N_dq_dt.nc`) and the atmosphere
+(`ts-N-trend.nc` etc.), which only differ from the iteration 0 templates in a
+band of latitudes. Rather than loading, copying and rewriting the whole
+dataset, the template is copied once on disk (`clone`), and only the changed
+hyperslab is written, through a writable memory map of the variable
+(`NetCDF3File`). The layout of the file is read from its header, following
+the netCDF classic (CDF-1) and 64-bit offset (CDF-2) format specification:
+
+https://docs.unidata.ucar.edu/netcdf-c/current/file_format_specifications.html
+
+Example:
+    Patch a latitude band of every month of a stress file::
+
+        from src.models.forcing import clone, NetCDF3File
+
+        clone(template, path)
+        with NetCDF3File(path) as forcing:
+            band = (slice(None), 0, slice(40, 141), slice(None))
+            forcing.write("taux", band, forcing.read("taux", band) + anomaly)
+
+"""
+from typing import Tuple, Union
+import shutil
+import numpy as np
+
+# netCDF classic type codes, and their big-endian numpy types.
+NC_TYPES = {1: ">i1", 2: "S1", 3: ">i2", 4: ">i4", 5: ">f4", 6: ">f8"}
+NC_DIMENSION, NC_VARIABLE, NC_ATTRIBUTE = 10, 11, 12
+
+
+def clone(template: str, path: str) -> None:
+    """Copy a template forcing file to a new path.
+
+    `shutil.copyfile` uses the kernel copy (e.g. `copy_file_range`) where it
+    can, which shares the blocks (a reflink) on filesystems that support it.
+
+    Args:
+        template (str): the iteration 0 file.
+        path (str): the file for the new iteration.
+    """
+    shutil.copyfile(template, path)
+
+
+def is_netcdf3(path: str) -> bool:
+    """Whether a file is netCDF classic or 64-bit offset, which can be patched.
+
+    Args:
+        path (str): path to the file.
+
+    Returns:
+        bool: True for CDF-1 or CDF-2 files.
+    """
+    with open(path, "rb") as file:
+        return file.read(4) in [b"CDF\x01", b"CDF\x02"]
+
+
+class _Header:
+    """Reader for the header of a netCDF classic file."""
+
+    def __init__(self, buffer: np.ndarray) -> None:
+        self.buffer = buffer
+        self.pos = 0
+
+    def bytes(self, number: int) -> bytes:
+        out = self.buffer[self.pos : self.pos + number].tobytes()
+        self.pos += number
+        return out
+
+    def int(self, dtype: str = ">i4") -> int:
+        return int(np.frombuffer(self.bytes(np.dtype(dtype).itemsize), dtype)[0])
+
+    def values(self, nc_type: int, number: int) -> Union[str, np.ndarray]:
+        dtype = np.dtype(NC_TYPES[nc_type])
+        size = dtype.itemsize * number
+        raw = self.bytes(size)
+        self.bytes(-size % 4)  # padding to 4 bytes.
+        if nc_type == 2:
+            return raw.decode("latin-1")
+        return np.frombuffer(raw, dtype)
+
+    def name(self) -> str:
+        return self.values(2, self.int())
+
+    def attributes(self) -> dict:
+        tag, number = self.int(), self.int()
+        assert tag in [0, NC_ATTRIBUTE]
+        atts = {}
+        for _ in range(number):
+            name = self.name()
+            nc_type = self.int()
+            atts[name] = self.values(nc_type, self.int())
+        return atts
+
+
+class NetCDF3File:
+    """Writable memory map of the variables in a netCDF classic file.
+
+    Values are read and written in the decoded form that xarray uses:
+    `scale_factor` and `add_offset` are applied, and the fill value is
+    converted to and from NaN.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map the file and read the layout of its variables.
+
+        Args:
+            path (str): path to a CDF-1 or CDF-2 file.
+
+        Raises:
+            ValueError: if the file is not netCDF classic or 64-bit offset.
+        """
+        if not is_netcdf3(path):
+            raise ValueError(path + " is not a netCDF classic or 64-bit offset file")
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r+")
+        header = _Header(self._mm)
+        offset_type = ">i4" if header.bytes(4)[3] == 1 else ">i8"
+        number_records = header.int()
+
+        tag, number = header.int(), header.int()
+        assert tag in [0, NC_DIMENSION]
+        dim_lengths = []
+        for _ in range(number):
+            header.name()
+            dim_lengths.append(header.int())
+
+        header.attributes()
+
+        tag, number = header.int(), header.int()
+        assert tag in [0, NC_VARIABLE]
+        layout = {}
+        for _ in range(number):
+            name = header.name()
+            dim_ids = [header.int() for _ in range(header.int())]
+            atts = header.attributes()
+            nc_type = header.int()
+            vsize = header.int()
+            begin = header.int(offset_type)
+            shape = tuple(dim_lengths[i] for i in dim_ids)
+            is_record = bool(shape) and shape[0] == 0
+            layout[name] = (begin, shape, nc_type, atts, vsize, is_record)
+
+        # record variables are interleaved, one record of each at a time.
+        record_vars = [x for x in layout if layout[x][5]]
+        if len(record_vars) == 1:
+            # a lone record variable isn't padded to 4 bytes.
+            begin, shape, nc_type = layout[record_vars[0]][:3]
+            record_size = np.dtype(NC_TYPES[nc_type]).itemsize * int(np.prod(shape[1:]))
+        else:
+            record_size = sum(layout[x][4] for x in record_vars)
+
+        self.attrs = {}
+        self._views = {}
+        for name, (begin, shape, nc_type, atts, _, is_record) in layout.items():
+            dtype = np.dtype(NC_TYPES[nc_type])
+            if is_record:
+                shape = (number_records,) + shape[1:]
+            inner = tuple(
+                int(np.prod(shape[i + 1 :])) * dtype.itemsize for i in range(len(shape))
+            )
+            strides = ((record_size,) + inner[1:]) if is_record else inner
+            self.attrs[name] = atts
+            self._views[name] = np.ndarray(
+                shape, dtype, buffer=self._mm, offset=begin, strides=strides
+            )
+
+    def _encoding(self, name: str) -> Tuple[float, float, Union[float, None]]:
+        atts = self.attrs[name]
+        scale = float(atts["scale_factor"][0]) if "scale_factor" in atts else 1.0
+        offset = float(atts["add_offset"][0]) if "add_offset" in atts else 0.0
+        fill = None
+        for key in ["_FillValue", "missing_value"]:
+            if key in atts:
+                fill = atts[key][0]
+                break
+        return scale, offset, fill
+
+    def read(self, name: str, index: tuple = ()) -> np.ndarray:
+        """Read a hyperslab of a variable.
+
+        Args:
+            name (str): variable name.
+            index (tuple, optional): index of the hyperslab. Defaults to ().
+
+        Returns:
+            np.ndarray: decoded values, as float64.
+        """
+        raw = self._views[name][index]
+        scale, offset, fill = self._encoding(name)
+        values = raw.astype(np.float64)
+        if fill is not None:
+            values[raw == fill] = np.nan
+        if scale != 1.0 or offset != 0.0:
+            values = values * scale + offset
+        return values
+
+    def write(self, name: str, index: tuple, values: np.ndarray) -> None:
+        """Write a hyperslab of a variable in place.
+
+        Args:
+            name (str): variable name.
+            index (tuple): index of the hyperslab.
+            values (np.ndarray): decoded values, broadcastable to the hyperslab.
+        """
+        scale, offset, fill = self._encoding(name)
+        values = np.asarray(values, dtype=np.float64)
+        if scale != 1.0 or offset != 0.0:
+            values = (values - offset) / scale
+        if fill is not None:
+            values = np.where(np.isnan(values), fill, values)
+        view = self._views[name]
+        if view.dtype.kind in "iu":
+            values = np.round(values)
+        view[index] = values
+
+    def close(self) -> None:
+        """Flush the changes to disk and release the map."""
+        self._views = {}
+        self._mm.flush()
+        del self._mm
+
+    def __enter__(self) -> "NetCDF3File":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,176 @@
+"""One store for the fields and metrics of every coupling iteration.
+
+`Coupling.run` appends the fields passed between the models after each
+iteration (SST trend, stress anomalies, dQ, TCAM winds and precipitation and
+the forcing as the models saw it), and the scalar metrics, to a netCDF4 file
+with an unlimited `iteration` dimension, chunked one iteration at a time.
+Plots and analysis then open one lazily chunked dataset, rather than the
+`it_N_*`, `ts-N-*` and `nino_N` files of each iteration.
+
+The fields come on several grids. The first grid seen for a dimension keeps
+its name (e.g. `Y`), and other grids are numbered (`Y_1`, ...).
+`history_field` names them back.
+
+Example:
+    Plot the SST trend of the last iteration::
+
+        from src.models.history import open_history, history_field
+
+        ds = open_history(setup)
+        history_field(ds, "sst_trend").isel(iteration=-1).plot()
+
+"""
+from typing import Dict
+import os
+import numpy as np
+import xarray as xr
+import netCDF4
+from src.models.model_setup import ModelSetup
+
+
+def open_history(setup: ModelSetup) -> xr.Dataset:
+    """Open the coupling history of a run lazily, in its stored chunks.
+
+    Args:
+        setup (ModelSetup): the setup object for the run.
+
+    Returns:
+        xr.Dataset: fields and metrics, with an iteration dimension.
+    """
+    return xr.open_dataset(setup.coupling_history(), chunks={})
+
+
+def history_field(ds: xr.Dataset, name: str) -> xr.DataArray:
+    """A field from the history, with its dimensions named as in the model.
+
+    Args:
+        ds (xr.Dataset): from `open_history`.
+        name (str): variable name.
+
+    Returns:
+        xr.DataArray: the field, e.g. with dims (iteration, Y, X).
+    """
+    da = ds[name]
+    return da.rename({x: ds[x].attrs.get("dim", x) for x in da.dims})
+
+
+class History:
+    """Append only store of the coupling iterations."""
+
+    def __init__(self, setup: ModelSetup) -> None:
+        """Find the store of a run.
+
+        Args:
+            setup (ModelSetup): the setup object for the run.
+        """
+        self.path = setup.coupling_history()
+
+    def reset(self) -> None:
+        """Remove the store, for a fresh run."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _open(self) -> netCDF4.Dataset:
+        if os.path.exists(self.path):
+            return netCDF4.Dataset(self.path, "a")
+        nc = netCDF4.Dataset(self.path, "w")
+        nc.createDimension("iteration", None)
+        nc.createVariable("iteration", "i4", ("iteration",))
+        return nc
+
+    @staticmethod
+    def _index(nc: netCDF4.Dataset, it: int) -> int:
+        """The record of iteration it, which is overwritten if it exists."""
+        iterations = list(nc["iteration"][:])
+        if it in iterations:
+            return iterations.index(it)
+        nc["iteration"][len(iterations)] = it
+        return len(iterations)
+
+    @staticmethod
+    def _same(nc: netCDF4.Dataset, name: str, da: xr.DataArray, dim: str) -> bool:
+        """Whether a dimension in the store has the coordinates of da[dim]."""
+        values = da[dim].values if dim in da.coords else np.arange(da.sizes[dim])
+        return len(nc[name]) == len(values) and np.array_equal(nc[name][:], values)
+
+    @staticmethod
+    def _dim(nc: netCDF4.Dataset, da: xr.DataArray, dim: str) -> str:
+        """The name of a dimension in the store, with the same coordinates."""
+        values = da[dim].values if dim in da.coords else np.arange(da.sizes[dim])
+        name, number = dim, 0
+        while name in nc.dimensions:
+            if History._same(nc, name, da, dim):
+                return name
+            number += 1
+            name = dim + "_" + str(number)
+        nc.createDimension(name, len(values))
+        coord = nc.createVariable(name, values.dtype, (name,))
+        coord[:] = values
+        coord.setncattr("dim", dim)
+        return name
+
+    @staticmethod
+    def _check_grid(nc: netCDF4.Dataset, name: str, da: xr.DataArray) -> None:
+        """Raise if a field is not on the grid that it is stored on."""
+        stored = nc[name].dimensions[1:]
+        dims = tuple(nc[x].getncattr("dim") for x in stored)
+        if da.dims != dims:
+            raise ValueError(
+                name + " has dims " + str(da.dims) + ", but is stored with " + str(dims)
+            )
+        for dim, stored_dim in zip(da.dims, stored):
+            if not History._same(nc, stored_dim, da, dim):
+                raise ValueError(
+                    name + " has different " + dim + " coordinates from the store"
+                )
+
+    def append(self, it: int, fields: Dict[str, xr.DataArray], metrics: dict) -> None:
+        """Write the fields and metrics of iteration it.
+
+        Args:
+            it (int): iteration.
+            fields (Dict[str, xr.DataArray]): fields to store.
+            metrics (dict): metrics, of which the numbers are stored.
+
+        Raises:
+            ValueError: if a field that is already stored comes with other
+                dims or coordinates.
+        """
+        with self._open() as nc:
+            for name, da in fields.items():
+                if name in nc.variables:
+                    self._check_grid(nc, name, da)
+            index = self._index(nc, it)
+            for name, da in fields.items():
+                if name not in nc.variables:
+                    dims = tuple(self._dim(nc, da, x) for x in da.dims)
+                    var = nc.createVariable(
+                        name,
+                        "f8",
+                        ("iteration",) + dims,
+                        zlib=True,
+                        chunksizes=(1,) + da.shape,
+                        fill_value=np.nan,
+                    )
+                    if "units" in da.attrs:
+                        var.setncattr("units", str(da.attrs["units"]))
+                nc[name][index] = da.values
+            self._metrics(nc, index, metrics)
+
+    def add_metrics(self, it: int, metrics: dict) -> None:
+        """Write more metrics for iteration it, e.g. from the diagnostics.
+
+        Args:
+            it (int): iteration.
+            metrics (dict): metrics, of which the numbers are stored.
+        """
+        with self._open() as nc:
+            self._metrics(nc, self._index(nc, it), metrics)
+
+    @staticmethod
+    def _metrics(nc: netCDF4.Dataset, index: int, metrics: dict) -> None:
+        for key, value in metrics.items():
+            if isinstance(value, (int, float, bool, np.number, np.bool_)):
+                if key not in nc.variables:
+                    nc.createVariable(key, "f8", ("iteration",), fill_value=np.nan)
+                nc[key][index] = float(value)
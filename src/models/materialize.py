@@ -0,0 +1,114 @@
+"""Put the model inputs into a run directory without copying them all.
+
+Every run used to `cp *` the ocean and atmosphere input directories,
+including the large climatologies and 60 year stress files, which a run
+only ever reads. `materialize` instead copies only the files that a run
+writes to (e.g. the `om_*` run files), and links the rest: as a reflink
+(a copy on write clone) where the file system has them, and as a symlink
+otherwise.
+
+A write through a symlink would change the shared input for every run, so
+`materialize` records the size and modification time of each linked input,
+and `changed_inputs` finds any that have changed since.
+
+Example:
+    Link the atmosphere inputs into a run::
+
+        from src.models.materialize import materialize, changed_inputs
+
+        linked = materialize(ATMOS_DATA_PATH, setup.atmos_data_path, [])
+        ...
+        assert not changed_inputs(linked)
+
+"""
+from typing import List, Dict
+import os
+import fcntl
+import shutil
+import fnmatch
+
+# from linux/fs.h, clone a whole file (as in cp --reflink).
+FICLONE = 0x40049409
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Clone a file as copy on write, if the file system supports it.
+
+    Args:
+        src (str): file to clone.
+        dst (str): new file.
+
+    Returns:
+        bool: whether dst was made.
+    """
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def _stat(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def materialize(
+    src_dir: str, dst_dir: str, mutable: List[str], link: bool = True
+) -> Dict[str, List[int]]:
+    """Put the files in src_dir into dst_dir, linking the read only ones.
+
+    As with `cp *`, only the files at the top of src_dir that are not
+    hidden are included.
+
+    Args:
+        src_dir (str): directory of the inputs.
+        dst_dir (str): directory in the run.
+        mutable (List[str]): patterns of the file names that the run writes
+            to, which are copied.
+        link (bool, optional): whether to link the other files.
+            Defaults to True. If False, everything is copied.
+
+    Returns:
+        Dict[str, List[int]]: the inputs that are symlinked, with their size
+            and modification time, for `changed_inputs`.
+    """
+    linked: Dict[str, List[int]] = {}
+    if not os.path.isdir(src_dir):
+        # e.g. the data has not been downloaded.
+        return linked
+    os.makedirs(dst_dir, exist_ok=True)
+    for name in sorted(os.listdir(src_dir)):
+        src = os.path.join(os.path.abspath(src_dir), name)
+        dst = os.path.join(dst_dir, name)
+        if name.startswith(".") or not os.path.isfile(src):
+            continue
+        # never write through an old link to the shared input.
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if not link or any(fnmatch.fnmatch(name, x) for x in mutable):
+            shutil.copy2(src, dst)
+        elif not reflink(src, dst):
+            os.symlink(src, dst)
+            linked[src] = _stat(src)
+    return linked
+
+
+def changed_inputs(linked: Dict[str, List[int]]) -> List[str]:
+    """The shared inputs that have been written to since they were linked.
+
+    Args:
+        linked (Dict[str, List[int]]): from `materialize`.
+
+    Returns:
+        List[str]: paths of the changed inputs.
+    """
+    return [
+        path
+        for path, stat in linked.items()
+        if not os.path.exists(path) or _stat(path) != list(stat)
+    ]
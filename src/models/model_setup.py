@@ -1,6 +1,8 @@
 """Set up the model, copy the files, get the names."""
+from typing import List
 import os
-from omegaconf import DictConfig
+import json
+from omegaconf import DictConfig, ListConfig
 from src.constants import (
     OCEAN_RUN_PATH,
     OCEAN_SRC_PATH,
@@ -11,6 +13,7 @@ from src.constants import (
     VAR_DICT,
 )
 from src.model_utils.mem_to_input import mem_to_dict
+from src.models.materialize import materialize, changed_inputs
 
 
 class ModelSetup:
@@ -46,6 +49,7 @@ class ModelSetup:
         self.ocean_data_path = os.path.join(self.ocean_path, "DATA")
         self.ocean_output_path = os.path.join(self.ocean_path, "output")
         self.ocean_old_io_path = os.path.join(self.ocean_path, "old_io")
+        self.ocean_log_path = os.path.join(self.ocean_path, "logs")
 
         # setup atmospheric paths
         self.atmos_path = os.path.join(direc, "atmos")
@@ -62,42 +66,51 @@ class ModelSetup:
 
         self.input_dict = mem_to_dict(self.cfg.atm.mem)
 
+        # the inputs that are linked rather than copied, see `move_files`.
+        self.linked: dict = {}
         if make_move:
-
-            for i in [
-                # make general paths
-                self.gif_path,
-                self.nino_data_path,
-                self.nino_plot_path,
-                self.plot_path,
-                # make ocean paths
-                self.ocean_path,
-                self.ocean_run_path,
-                self.ocean_src_path,
-                self.ocean_data_path,
-                self.ocean_output_path,
-                self.ocean_old_io_path,
-                # make atmos paths
-                self.atmos_path,
-                self.atmos_data_path,
-                self.atmos_tmp_path,
-            ]:
-                if not os.path.exists(i):
-                    os.mkdir(i)
-
-            # make symlinks in ocean model
-
-            for i, j in [
-                [self.ocean_data_path, os.path.join(self.ocean_run_path, "DATA")],
-                [self.ocean_data_path, os.path.join(self.ocean_src_path, "DATA")],
-                [self.ocean_output_path, os.path.join(self.ocean_run_path, "output")],
-                [self.ocean_output_path, os.path.join(self.ocean_src_path, "output")],
-            ]:
-                if not os.path.exists(j):
-                    os.symlink(i, j)
-
-            self._init_ocean()
-            self._init_atmos()
+            self.move_files()
+
+    def move_files(self) -> None:
+        """Make the folders, and copy or link the model files into them."""
+        for i in [
+            # make general paths
+            self.gif_path,
+            self.nino_data_path,
+            self.nino_plot_path,
+            self.plot_path,
+            # make ocean paths
+            self.ocean_path,
+            self.ocean_run_path,
+            self.ocean_src_path,
+            self.ocean_data_path,
+            self.ocean_output_path,
+            self.ocean_old_io_path,
+            self.ocean_log_path,
+            # make atmos paths
+            self.atmos_path,
+            self.atmos_data_path,
+            self.atmos_tmp_path,
+        ]:
+            if not os.path.exists(i):
+                os.mkdir(i)
+
+        # make symlinks in ocean model
+
+        for i, j in [
+            [self.ocean_data_path, os.path.join(self.ocean_run_path, "DATA")],
+            [self.ocean_data_path, os.path.join(self.ocean_src_path, "DATA")],
+            [self.ocean_output_path, os.path.join(self.ocean_run_path, "output")],
+            [self.ocean_output_path, os.path.join(self.ocean_src_path, "output")],
+        ]:
+            if not os.path.exists(j):
+                os.symlink(i, j)
+
+        self.linked = {}
+        self._init_ocean()
+        self._init_atmos()
+        with open(self.inputs_manifest(), "w") as file:
+            json.dump(self.linked, file, indent=1)
 
     def _init_ocean(self) -> None:
         """initialise the ocean model by copying files over."""
@@ -122,46 +135,39 @@ class ModelSetup:
             + str(self.ocean_src_path)
         )
 
-        os.system(
-            "cd "
-            + str(OCEAN_RUN_PATH)
-            + " \n cp "
-            + "*"
-            + " "
-            + str(self.ocean_run_path)
-        )
-
-        os.system(
-            "cd "
-            + str(OCEAN_DATA_PATH)
-            + " \n cp "
-            + "*"
-            + " "
-            + str(self.ocean_data_path)
-        )
+        # the run files are edited, and qflx.nc is remade by ingrid.
+        self._materialize(str(OCEAN_RUN_PATH), self.ocean_run_path, ["om_*"])
+        self._materialize(str(OCEAN_DATA_PATH), self.ocean_data_path, ["qflx*.nc"])
 
         os.system("cd " + str(self.ocean_data_path) + " \n make all")
 
     def _init_atmos(self) -> None:
         """Creating atmos by copying files over."""
+        self._materialize(str(ATMOS_DATA_PATH), self.atmos_data_path, [])
+        self._materialize(str(ATMOS_TMP_PATH), self.atmos_tmp_path, [])
 
-        os.system(
-            "cd "
-            + str(ATMOS_DATA_PATH)
-            + " \n cp "
-            + "*"
-            + " "
-            + str(self.atmos_data_path)
-        )
-        os.system(
-            "cd "
-            + str(ATMOS_TMP_PATH)
-            + " \n cp "
-            + "*"
-            + " "
-            + str(self.atmos_tmp_path)
+    def _materialize(self, src_dir: str, dst_dir: str, mutable: List[str]) -> None:
+        """Copy the mutable inputs, and link the rest if link_inputs."""
+        self.linked.update(
+            materialize(src_dir, dst_dir, mutable, link=self.cfg.link_inputs)
         )
 
+    def inputs_manifest(self) -> str:
+        """The record of the inputs that are linked rather than copied."""
+        return os.path.join(self.direc, "inputs.json")
+
+    def check_inputs(self) -> List[str]:
+        """
+        Find the shared inputs that have been written to through their links.
+
+        Returns:
+            List[str]: paths of the changed inputs.
+        """
+        if not os.path.exists(self.inputs_manifest()):
+            return []
+        with open(self.inputs_manifest()) as file:
+            return changed_inputs(json.load(file))
+
     # Iteration 0 is the initial name, itertion Z+ returns
     # a new name. The name alone should be an option to
     # allow renaming to occur.
@@ -169,10 +175,14 @@ class ModelSetup:
     # pylint: disable=missing-function-docstring
     def tcam_output(self, path: bool = True) -> str:
 
+        h_q = self.cfg.atm.h_q
+        if isinstance(h_q, ListConfig):
+            # an ensemble of members, see src.configs.config.member_param.
+            h_q = "-".join(str(x) for x in h_q)
         name = (
             "S91"
             + "-hq"
-            + str(self.cfg.atm.h_q)
+            + str(h_q)
             + "-prcp_land"
             + str(self.cfg.atm.prcp_land)
             + ".nc"
@@ -298,6 +308,12 @@ class ModelSetup:
     def nino_nc(self, it: int) -> str:
         return os.path.join(self.nino_data_path, "nino_" + str(it) + ".nc")
 
+    def diagnostics_snapshot(self, it: int) -> str:
+        return os.path.join(self.direc, "diagnostics", str(it))
+
+    def coupling_history(self) -> str:
+        return os.path.join(self.direc, "coupling_history.nc")
+
     def coupling_video(self, pac: bool = False, mask_land=False) -> str:
         name = "coupling"
         if pac:
@@ -1,16 +1,23 @@
 """Ocean model."""
 import os
+import json
+import shlex
 import shutil
-from typing import List
+import subprocess
+from typing import List, Optional, Dict, Tuple, Callable, Any
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import xarray as xr
 import logging
 from omegaconf import DictConfig
 from typeguard import typechecked
 from src.visualisation.ani import animate_ds, animate_qflx_diff
 from src.utils import timeit, hr_time
+from src.constants import OCEAN_BUILD_PATH, OCEAN_SPIN_CACHE_PATH
 from src.data_loading.ingrid import linear_qflx_replacement
 from src.models.model_setup import ModelSetup
+from src.models.build import build
+from src.models.spin_cache import SpinCache
 
 log = logging.getLogger(__name__)
 
@@ -37,6 +44,42 @@ def replace_item(init: str, fin: str, loc_string_list: List[str]) -> List[str]:
     return loc_string_list
 
 
+def run_graph(
+    stages: Dict[str, Tuple[Callable[[], Any], List[str]]], workers: int = 2
+) -> None:
+    """
+    Run stages as soon as the stages that they depend on have finished.
+
+    With one worker the stages run one at a time, in the order given
+    (among those that are ready).
+
+    Args:
+        stages (Dict[str, Tuple[Callable[[], Any], List[str]]]): for each
+            stage, the function to call and the names of the stages it needs.
+        workers (int, optional): stages to run at once. Defaults to 2.
+
+    Raises:
+        Exception: the first error from a stage, once the running stages
+            have finished. The stages after it are not started.
+    """
+    done: set = set()
+    running: dict = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(done) < len(stages):
+            for name, (func, needs) in stages.items():
+                if (
+                    name not in done
+                    and name not in running.values()
+                    and all(x in done for x in needs)
+                ):
+                    running[pool.submit(func)] = name
+            assert running, "stages " + str(set(stages) - done) + " cannot start"
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                future.result()
+                done.add(running.pop(future))
+
+
 class Ocean:
     """Ocean model component."""
 
@@ -50,31 +93,156 @@ class Ocean:
         self.setup = setup
         self.cfg = cfg
         self.run_time = 0
+        self.it = 0
+        # seconds taken by each stage of the last run_all.
+        self.timings: dict = {}
 
     def compile_all(self) -> None:
-        """Compile the Fortran/C."""
-        os.system("cd " + self.setup.ocean_src_path + " \npwd\nmake all")
+        """Compile the Fortran/C.
+
+        If ocean.build_cache, the binaries are only compiled once for each
+        version of the sources and compilers, and are linked in from the
+        shared cache in ocean.build_dir (see `src.models.build`). Otherwise
+        `make all` runs in the run's sources, and a failure is not fatal.
+
+        Raises:
+            CalledProcessError: if ocean.build_cache and `make all` fails.
+        """
+        if self.cfg.ocean.build_cache:
+            build(
+                self.setup.ocean_src_path,
+                [self.cfg.ocean.tcom_name, self.cfg.ocean.tios2cdf_name],
+                self.cfg.ocean.build_dir or str(OCEAN_BUILD_PATH),
+            )
+        else:
+            os.system("cd " + self.setup.ocean_src_path + " \npwd\nmake all")
 
     @typechecked
-    def run(self, command: str) -> float:
+    def run(
+        self,
+        command: str,
+        stage: Optional[str] = None,
+        outputs: Optional[List[str]] = None,
+    ) -> float:
         """
-        Runs a line of bash in the ocean/RUN directory
+        Runs a command in the ocean/RUN directory
         and times how long it takes.
 
+        The command is split as the shell would, but is run without one, so
+        it cannot use pipes or redirection. If it is a stage of the model,
+        its stdout and stderr go to `<it>_<stage>.out` in the ocean logs
+        directory, it is killed after ocean.timeouts (of the first key that
+        the stage starts with), and its timing is appended to
+        `timings.jsonl` there.
+
         Args:
-            command (str): a valid bash command.
+            command (str): a command, e.g. "../SRC/tcom -i om_test".
+            stage (Optional[str], optional): name of the stage, e.g. "om_spin".
+                Defaults to None.
+            outputs (Optional[List[str]], optional): files, relative to
+                ocean/RUN, that the command must write. Defaults to None.
+
+        Raises:
+            subprocess.CalledProcessError: if the command fails.
+            subprocess.TimeoutExpired: if the stage takes too long.
+            FileNotFoundError: if an output is missing, or was not rewritten.
 
         Returns:
             float: time in seconds.
         """
-
-        rc_prefix = "cd " + self.setup.ocean_run_path + " \n"
-        full_command = rc_prefix + command
+        timeout = None
+        if stage is not None:
+            os.makedirs(self.setup.ocean_log_path, exist_ok=True)
+            for key, value in self.cfg.ocean.timeouts.items():
+                if stage.startswith(key):
+                    timeout = value
+                    break
+        start = time.time()
         ts = time.perf_counter()
-        os.system(full_command)
+        if stage is None:
+            subprocess.run(
+                shlex.split(command), cwd=self.setup.ocean_run_path, check=True
+            )
+        else:
+            out_path = os.path.join(
+                self.setup.ocean_log_path, str(self.it) + "_" + stage + ".out"
+            )
+            with open(out_path, "w") as out:
+                subprocess.run(
+                    shlex.split(command),
+                    cwd=self.setup.ocean_run_path,
+                    stdout=out,
+                    stderr=subprocess.STDOUT,
+                    timeout=timeout,
+                    check=True,
+                )
         te = time.perf_counter()
         diff = te - ts
-        print(full_command + " " + hr_time(diff))
+        print("cd " + self.setup.ocean_run_path + " \n" + command + " " + hr_time(diff))
+
+        for output in outputs or []:
+            path = os.path.join(self.setup.ocean_run_path, output)
+            # an output from an earlier iteration is stale.
+            if not os.path.exists(path) or os.path.getmtime(path) < start - 1:
+                raise FileNotFoundError(command + " did not write " + path)
+
+        if stage is not None:
+            self.timings[stage] = diff
+            with open(
+                os.path.join(self.setup.ocean_log_path, "timings.jsonl"), "a"
+            ) as file:
+                record = {"it": self.it, "stage": stage, "command": command}
+                record.update({"start": start, "seconds": diff})
+                file.write(json.dumps(record) + "\n")
+        return diff
+
+    def tcom(self, part: str) -> float:
+        """
+        Run the ocean model with one of its run files.
+
+        Args:
+            part (str): the run file, e.g. "om_spin".
+
+        Returns:
+            float: time in seconds.
+        """
+        if part == "om_test":
+            return self.run(
+                "../SRC/" + self.cfg.ocean.tcom_name + " -i om_test", stage=part
+            )
+        return self.run(
+            "../SRC/"
+            + self.cfg.ocean.tcom_name
+            + " -i "
+            + part
+            + " -t "
+            + part
+            + ".tios",
+            stage=part,
+            outputs=["output/" + part + ".data", "output/" + part + ".indx"],
+        )
+
+    def tios2cdf(self, part: str) -> float:
+        """
+        Convert the output of one of the run files to netCDF.
+
+        Args:
+            part (str): the run file, e.g. "om_spin".
+
+        Returns:
+            float: time in seconds.
+        """
+        # write a new file rather than truncate the last one, which the
+        # checkpoint may hold a hard link to.
+        path = os.path.join(self.setup.ocean_run_path, "output", part + ".nc")
+        if os.path.exists(path):
+            os.remove(path)
+        diff = self.run(
+            "../SRC/" + self.cfg.ocean.tios2cdf_name + " -f output/" + part,
+            stage="tios2cdf_" + part,
+            outputs=["output/" + part + ".nc"],
+        )
+        self.run("rm -rf output/" + part + ".data output/" + part + ".indx")
         return diff
 
     def edit_run(self) -> None:
@@ -217,41 +385,76 @@ class Ocean:
             with open(file_name, "w") as write_file:
                 write_file.writelines(string_list)
 
+    def spin_up(self) -> None:
+        """Spin up the ocean, diagnose the heat flux and remake qflx.nc.
+
+        The stages only wait for the outputs that they read, so with
+        ocean.overlap the netCDF conversion of om_spin runs alongside
+        om_diag, which only needs the restart file. Returns once every
+        stage has finished.
+        """
+        stages: Dict[str, Tuple[Callable[[], Any], List[str]]] = {}
+        restart: List[str] = []
+        if self.cfg.ocean.spin:
+            stages["om_spin"] = (lambda: self.tcom("om_spin"), [])
+            stages["tios2cdf_om_spin"] = (
+                lambda: self.tios2cdf("om_spin"),
+                ["om_spin"],
+            )
+            stages["restart_om_spin"] = (
+                lambda: self.run(
+                    "cp -f output/om_spin.save output/om_spin.20y.restart"
+                ),
+                ["om_spin"],
+            )
+            restart = ["restart_om_spin"]
+        if self.cfg.ocean.diag:
+            stages["om_diag"] = (lambda: self.tcom("om_diag"), restart)
+            stages["tios2cdf_om_diag"] = (
+                lambda: self.tios2cdf("om_diag"),
+                ["om_diag"],
+            )
+            stages["restart_om_diag"] = (
+                lambda: self.run("cp -f output/om_diag.save output/om_diag.2y.restart"),
+                ["om_diag"],
+            )
+        if self.cfg.ocean.ingrid:
+            # needs om_diag.nc.
+            stages["ingrid"] = (
+                lambda: linear_qflx_replacement(self.setup),
+                ["tios2cdf_om_diag"] if self.cfg.ocean.diag else [],
+            )
+        run_graph(stages, workers=2 if self.cfg.ocean.overlap else 1)
+
     @timeit
     def run_all(self, it=0) -> None:
-        """Run all the executables."""
+        """Run all the executables.
+
+        If ocean.spin_cache, the whole spin up is taken from an earlier run
+        with the same ocean configuration, if there is one, in
+        ocean.spin_cache_dir (see `src.models.spin_cache`).
+
+        Each stage raises if it fails (see `run`).
+        """
         print(it)
+        self.it = it
+        self.timings = {}
         # Run the test to see if it's working.
-        self.run("../SRC/" + self.cfg.ocean.tcom_name + " -i om_test")
+        self.tcom("om_test")
         if not self.cfg.ocean.flux_once or it == 0:
-            if self.cfg.ocean.spin:
-                self.run(
-                    "../SRC/" + self.cfg.ocean.tcom_name + " -i om_spin -t om_spin.tios"
-                )
-                self.run(
-                    "../SRC/" + self.cfg.ocean.tios2cdf_name + " -f output/om_spin"
-                )
-                self.run("rm -rf output/om_spin.data output/om_spin.indx")
-                self.run("cp -f output/om_spin.save output/om_spin.20y.restart")
-            if self.cfg.ocean.diag:
-                self.run(
-                    "../SRC/" + self.cfg.ocean.tcom_name + " -i om_diag -t om_diag.tios"
-                )
-                self.run(
-                    "../SRC/" + self.cfg.ocean.tios2cdf_name + " -f output/om_diag"
-                )
-                self.run("rm -rf output/om_diag.data output/om_diag.indx")
-                self.run("cp -f output/om_diag.save output/om_diag.2y.restart")
-            if self.cfg.ocean.ingrid:
-                linear_qflx_replacement(self.setup)
+            if self.cfg.ocean.spin_cache and all(
+                self.cfg.ocean[x] for x in ["spin", "diag", "ingrid"]
+            ):
+                cache = self.cfg.ocean.spin_cache_dir or str(OCEAN_SPIN_CACHE_PATH)
+                with SpinCache(self.setup, cache).entry() as restored:
+                    if not restored:
+                        self.spin_up()
+            else:
+                self.spin_up()
         if self.cfg.ocean.run_through:
-            run_time = self.run(
-                "../SRC/" + self.cfg.ocean.tcom_name + " -i om_run2f -t om_run2f.tios"
-            )
+            run_time = self.tcom("om_run2f")
             self.run_time = run_time  # is later accessed by log in coupling.
-
-            self.run("../SRC/" + self.cfg.ocean.tios2cdf_name + " -f output/om_run2f")
-            self.run("rm -rf output/om_run2f.data output/om_run2f.indx")
+            self.tios2cdf("om_run2f")
 
     @timeit
     def animate_all(self) -> None:
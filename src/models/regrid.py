@@ -0,0 +1,118 @@
+"""Bilinear regridding between rectangular grids with cached weights.
+
+The atmosphere and coupling regrid many fields between the same few pairs
+of grids (the 1 degree input data, the atmosphere `Yu`/`Yv` grids and the
+ocean grid). The bilinear weights for a pair of grids only depend on the
+axes, so they are built once as a sparse matrix, stored in `REGRID_CACHE`,
+and every later regrid between the same grids is a sparse matrix product.
+
+This replaces `scipy.interpolate.interp2d(x, y, z, kind="linear")`, and
+keeps its behaviour: points outside the source grid take the value at the
+nearest edge, and the source axes do not need to be sorted.
+
+Example:
+    Regrid a field on (Y, X) onto the atmosphere grid::
+
+        from src.models.regrid import regrid
+
+        new = regrid(ds.X.values, ds.Y.values, ds.ts.values, x_axis, y_axis_u)
+
+"""
+import numpy as np
+from scipy.sparse import csr_matrix, kron
+
+# bilinear weight matrices, keyed by the source and target axes.
+# persists across coupling iterations and runs.
+REGRID_CACHE: dict = {}
+
+
+def linear_weights(x_src: np.ndarray, x_tgt: np.ndarray) -> csr_matrix:
+    """Weights for linear interpolation along one axis.
+
+    Args:
+        x_src (np.ndarray): source axis, shape (n_src,).
+        x_tgt (np.ndarray): target axis, shape (n_tgt,).
+
+    Returns:
+        csr_matrix: weights, shape (n_tgt, n_src).
+    """
+    x_src = np.asarray(x_src, dtype=np.float64)
+    x_tgt = np.asarray(x_tgt, dtype=np.float64)
+    order = np.argsort(x_src, kind="stable")
+    x_sorted = x_src[order]
+    rows = np.arange(x_tgt.shape[0])
+    if x_sorted.shape[0] == 1:
+        return csr_matrix(
+            (np.ones(x_tgt.shape[0]), (rows, np.zeros_like(rows))),
+            shape=(x_tgt.shape[0], 1),
+        )
+    # nearest neighbour extrapolation outside the source axis.
+    x_clip = np.clip(x_tgt, x_sorted[0], x_sorted[-1])
+    left = np.clip(
+        np.searchsorted(x_sorted, x_clip, side="right") - 1, 0, x_sorted.shape[0] - 2
+    )
+    frac = (x_clip - x_sorted[left]) / (x_sorted[left + 1] - x_sorted[left])
+    weights = csr_matrix(
+        (
+            np.concatenate([1 - frac, frac]),
+            (np.concatenate([rows, rows]), order[np.concatenate([left, left + 1])]),
+        ),
+        shape=(x_tgt.shape[0], x_src.shape[0]),
+    )
+    # drop zero weights so that NaNs only spread to the points that use them.
+    weights.eliminate_zeros()
+    return weights
+
+
+def bilinear_weights(
+    x_src: np.ndarray, y_src: np.ndarray, x_tgt: np.ndarray, y_tgt: np.ndarray
+) -> csr_matrix:
+    """Bilinear weights between two grids, from the cache if possible.
+
+    Args:
+        x_src (np.ndarray): source x axis, shape (nx_src,).
+        y_src (np.ndarray): source y axis, shape (ny_src,).
+        x_tgt (np.ndarray): target x axis, shape (nx_tgt,).
+        y_tgt (np.ndarray): target y axis, shape (ny_tgt,).
+
+    Returns:
+        csr_matrix: weights, shape (ny_tgt * nx_tgt, ny_src * nx_src),
+            for fields flattened from (Y, X).
+    """
+    axes = [np.asarray(x, dtype=np.float64) for x in [x_src, y_src, x_tgt, y_tgt]]
+    key = tuple((x.shape, x.tobytes()) for x in axes)
+    if key not in REGRID_CACHE:
+        REGRID_CACHE[key] = kron(
+            linear_weights(axes[1], axes[3]),
+            linear_weights(axes[0], axes[2]),
+            format="csr",
+        )
+    return REGRID_CACHE[key]
+
+
+def regrid(
+    x_src: np.ndarray,
+    y_src: np.ndarray,
+    field: np.ndarray,
+    x_tgt: np.ndarray,
+    y_tgt: np.ndarray,
+) -> np.ndarray:
+    """Bilinearly interpolate a field from one rectangular grid to another.
+
+    Any leading axes of the field are regridded together.
+
+    Args:
+        x_src (np.ndarray): source x axis, shape (nx_src,).
+        y_src (np.ndarray): source y axis, shape (ny_src,).
+        field (np.ndarray): field on the source grid, shape (..., ny_src, nx_src).
+        x_tgt (np.ndarray): target x axis, shape (nx_tgt,).
+        y_tgt (np.ndarray): target y axis, shape (ny_tgt,).
+
+    Returns:
+        np.ndarray: field on the target grid, shape (..., ny_tgt, nx_tgt).
+    """
+    field = np.asarray(field)
+    weights = bilinear_weights(x_src, y_src, x_tgt, y_tgt)
+    flat = field.reshape((-1, field.shape[-2] * field.shape[-1]))
+    out = (weights @ flat.T).T
+    return out.reshape(field.shape[:-2] + (len(y_tgt), len(x_tgt)))
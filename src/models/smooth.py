@@ -0,0 +1,99 @@
+"""Array kernel for the [0.25, 0.5, 0.25] smoothing stencil.
+
+This is the kernel behind `src.models.atmos.Atmos.smooth121`, which keeps the
+xarray interface. Working on raw arrays avoids building padded DataArrays,
+rolling windows and dot products on every pass, which matters because the
+smoother is called on the moisture convergence in every TCAM iteration.
+
+Example:
+    Smooth the last two axes of a stack of fields, periodic in longitude::
+
+        from src.models.smooth import smooth121
+
+        smoothed = smooth121(fields, [-2, -1], periodic_axes=[-1])
+
+"""
+from typing import Sequence
+import numpy as np
+
+
+def _fill_one(padded: np.ndarray, axis: int) -> np.ndarray:
+    """Fill NaNs next to valid values, like bfill and then ffill with limit=1.
+
+    Args:
+        padded (np.ndarray): array with the smoothing axis moved to `axis`.
+        axis (int): the axis to fill along.
+
+    Returns:
+        np.ndarray: the filled array.
+    """
+    # bfill(limit=1): a NaN takes the value just after it.
+    before = np.take(padded, range(0, padded.shape[axis] - 1), axis=axis)
+    after = np.take(padded, range(1, padded.shape[axis]), axis=axis)
+    before[...] = np.where(np.isnan(before) & ~np.isnan(after), after, before)
+    filled = np.concatenate([before, np.take(padded, [-1], axis=axis)], axis=axis)
+    # ffill(limit=1): a NaN takes the value just before it.
+    before = np.take(filled, range(0, filled.shape[axis] - 1), axis=axis)
+    after = np.take(filled, range(1, filled.shape[axis]), axis=axis)
+    after[...] = np.where(np.isnan(after) & ~np.isnan(before), before, after)
+    return np.concatenate([np.take(filled, [0], axis=axis), after], axis=axis)
+
+
+def smooth121(
+    arr: np.ndarray,
+    axes: Sequence[int],
+    number_smooths: int = 1,
+    periodic_axes: Sequence[int] = (),
+) -> np.ndarray:
+    """Applies [0.25, 0.5, 0.25] stencil along each axis, one at a time.
+
+    At a periodic boundary the stencil wraps around. Otherwise the edge value
+    is reflected, so that the stencil sees [v[0], v[0], v[1]] at the start.
+
+    NaNs are treated as missing: a NaN next to a valid value is filled from
+    its neighbour before each pass, and points that were NaN in the input
+    are NaN in the output. Any other axes (e.g. a stack of states or
+    ensemble members) are smoothed independently.
+
+    Args:
+        arr (np.ndarray): the array to smooth.
+        axes (Sequence[int]): axes over which to smooth.
+        number_smooths (int, optional): number of smooths to apply
+            along each axis. Defaults to 1.
+        periodic_axes (Sequence[int], optional): axes to treat as periodic.
+            Defaults to ().
+
+    Returns:
+        np.ndarray: smoothed array, of the same shape.
+    """
+    mask = np.isnan(arr)
+    periodic = [x % arr.ndim for x in periodic_axes]
+    v = arr
+
+    for axis in axes:
+        axis = axis % arr.ndim
+        length = arr.shape[axis]
+        if axis in periodic:
+            ends = [length - 1, 0]
+        else:
+            ends = [0, length - 1]
+        for _ in range(0, number_smooths):
+            padded = np.concatenate(
+                [
+                    np.take(v, [ends[0]], axis=axis),
+                    v,
+                    np.take(v, [ends[1]], axis=axis),
+                ],
+                axis=axis,
+            )
+            if np.isnan(padded).any():
+                padded = _fill_one(padded, axis)
+            v = (
+                0.25 * np.take(padded, range(0, length), axis=axis)
+                + 0.5 * np.take(padded, range(1, length + 1), axis=axis)
+                + 0.25 * np.take(padded, range(2, length + 2), axis=axis)
+            )
+
+    if mask.any():
+        v = np.where(mask, np.nan, v)
+    return v
@@ -0,0 +1,148 @@
+"""Share the ocean spin up between runs with the same ocean configuration.
+
+Before the coupled run, `Ocean.run_all` spins the ocean up for 20 years
+(`om_spin`), runs 2 more years to diagnose the heat flux (`om_diag`), and
+remakes `qflx.nc` from it (`linear_qflx_replacement`). That only depends on
+the `om_spin` and `om_diag` run files, the `.tios` files, the input data
+they name and the ocean binaries, so an atmosphere only sweep repeats the
+same 22 model years in every run.
+
+`SpinCache` keys the spin up on a hash of all of those. The restart files,
+`qflx.nc`, the netCDF outputs and the logs of the first run with a key are
+stored in `OCEAN_SPIN_CACHE_PATH/<key>`, and later runs copy them in rather
+than integrating again. Runs launched together wait on a lock for the first
+one to finish.
+
+Example:
+    Spin up only if no earlier run has::
+
+        from src.models.spin_cache import SpinCache
+
+        with SpinCache(setup).entry() as restored:
+            if not restored:
+                ocean.spin_up()
+
+"""
+from typing import List, Iterator
+import os
+import re
+import glob
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+from src.constants import OCEAN_SPIN_CACHE_PATH
+from src.models.model_setup import ModelSetup
+from src.models.build import build_key
+from src.models.checkpoint import file_hash
+from src.models.forcing import clone
+
+# the run files of the spin up, in the ocean RUN directory.
+RUN_FILES = ["om_spin", "om_spin.tios", "om_diag", "om_diag.tios"]
+
+
+class SpinCache:
+    """Cache of the spin up outputs, keyed by everything they depend on."""
+
+    def __init__(self, setup: ModelSetup, cache: str = str(OCEAN_SPIN_CACHE_PATH)):
+        """Find the cache for a run.
+
+        Args:
+            setup (ModelSetup): the setup object for the run.
+            cache (str, optional): directory of the cache.
+                Defaults to OCEAN_SPIN_CACHE_PATH.
+        """
+        self.setup = setup
+        self.cache = cache
+
+    def outputs(self) -> List[str]:
+        """The outputs of the spin up that the rest of the run uses.
+
+        Returns:
+            List[str]: paths in the run, the first three are required.
+        """
+        output, run = self.setup.ocean_output_path, self.setup.ocean_run_path
+        return [
+            os.path.join(output, "om_spin.20y.restart"),
+            os.path.join(output, "om_diag.2y.restart"),
+            os.path.join(self.setup.ocean_data_path, "qflx.nc"),
+            os.path.join(output, "om_spin.nc"),
+            os.path.join(output, "om_diag.nc"),
+        ] + [
+            os.path.join(run, x + y)
+            for x in ["om_spin", "om_diag"]
+            for y in [".tr", ".log"]
+        ]
+
+    def inputs(self) -> List[str]:
+        """The input data that the spin up run files name.
+
+        A name without an extension, such as the wind file, stands for all
+        the files that start with it (e.g. the `.x` and `.y` stresses).
+
+        Returns:
+            List[str]: paths in the run.
+        """
+        paths = set()
+        for name in ["om_spin", "om_diag"]:
+            with open(os.path.join(self.setup.ocean_run_path, name)) as file:
+                text = file.read()
+            for ref in re.findall(r"['\"](DATA/[^'\"]+)['\"]", text):
+                path = os.path.join(self.setup.ocean_run_path, ref)
+                if os.path.isfile(path):
+                    paths.add(path)
+                else:
+                    paths.update(glob.glob(path + ".*"))
+        return sorted(paths)
+
+    def key(self) -> str:
+        """Hash of the run files, their input data and the ocean binaries.
+
+        Returns:
+            str: hex digest.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(build_key(self.setup.ocean_src_path).encode())
+        for path in [os.path.join(self.setup.ocean_run_path, x) for x in RUN_FILES]:
+            with open(path, "rb") as file:
+                digest.update(file.read())
+        for path in self.inputs():
+            digest.update(os.path.basename(path).encode())
+            digest.update(file_hash(path).encode())
+        return digest.hexdigest()
+
+    def _cached(self, path: str, entry: str) -> str:
+        return os.path.join(entry, os.path.basename(path))
+
+    @contextmanager
+    def entry(self) -> Iterator[bool]:
+        """Restore the spin up if it is cached, and otherwise store it after.
+
+        Holds a lock on the key meanwhile, so only one run spins up each
+        configuration.
+
+        Yields:
+            bool: whether the outputs were restored, so the spin up is done.
+        """
+        entry = os.path.join(self.cache, self.key())
+        os.makedirs(self.cache, exist_ok=True)
+        with open(entry + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.isdir(entry):
+                print("restoring the ocean spin up from", entry)
+                for path in self.outputs():
+                    if os.path.exists(self._cached(path, entry)):
+                        if os.path.lexists(path):
+                            os.remove(path)
+                        clone(self._cached(path, entry), path)
+                yield True
+            else:
+                yield False
+                if all(os.path.exists(x) for x in self.outputs()[:3]):
+                    # write then rename, so a crash never leaves half an entry.
+                    shutil.rmtree(entry + ".tmp", ignore_errors=True)
+                    os.makedirs(entry + ".tmp")
+                    for path in self.outputs():
+                        if os.path.exists(path):
+                            clone(path, self._cached(path, entry + ".tmp"))
+                    os.replace(entry + ".tmp", entry)
@@ -0,0 +1,155 @@
+"""Batched tri-diagonal matrix algorithm (Thomas algorithm) solver.
+
+The S91 atmosphere solver (`src.models.atmos.Atmos.s91_solver`) forms one
+tri-diagonal system in latitude for every zonal wavenumber. This module solves
+all of these systems at once, and also any number of stacked systems along
+extra leading axes (e.g. scenario, parameter set, ensemble member).
+
+Layout convention: the equations run along axis -2, and every other axis is
+an independent system. E.g. the S91 system has shape (ny - 2, nx), and a
+stack of them has shape (..., ny - 2, nx).
+
+For each system the following is solved::
+
+    a[i] * x[i-1] + b[i] * x[i] + c[i] * x[i+1] = d[i]
+
+where a[0] and c[-1] are ignored.
+
+If the same operator is solved many times with different right hand sides,
+the forward elimination can be done once with `tdma_factor`, and then each
+solve is only a substitution pass with `tdma_substitute`.
+
+Example:
+    Import statement usage::
+
+        from src.models.tdma import tdma_solve, tdma_factor, tdma_substitute
+
+"""
+from typing import Optional
+import numpy as np
+
+
+def tdma_factor(
+    a_loc: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Forward eliminate the coefficients of a batch of tri-diagonal systems.
+
+    The elimination only depends on the coefficients, not on the right
+    hand side, so the result can be stored and reused for every solve
+    with the same operator using `tdma_substitute`.
+
+    Args:
+        a_loc (np.ndarray): sub-diagonal, shape (..., n, m).
+        b (np.ndarray): diagonal, shape (..., n, m).
+        c (np.ndarray): super-diagonal, shape (..., n, m).
+        out (Optional[np.ndarray], optional): preallocated buffer of shape
+            (2, ..., n, m). Defaults to None, which allocates a new array.
+
+    Returns:
+        np.ndarray: factor, with the modified super-diagonal c' in factor[0]
+            and the inverse of the modified diagonal in factor[1].
+    """
+    nf = b.shape[-2]  # number of equations
+    coeff_shape = np.broadcast_shapes(a_loc.shape, b.shape, c.shape)
+    if out is None:
+        out = np.empty((2,) + coeff_shape, dtype=np.result_type(a_loc, b, c))
+    assert out.shape == (2,) + coeff_shape, "out has shape " + str(out.shape)
+    c_prime, inv_denom = out[0], out[1]
+
+    np.divide(1.0, b[..., 0, :], out=inv_denom[..., 0, :])
+    np.multiply(c[..., 0, :], inv_denom[..., 0, :], out=c_prime[..., 0, :])
+    for it in range(1, nf):
+        np.divide(
+            1.0,
+            b[..., it, :] - a_loc[..., it, :] * c_prime[..., it - 1, :],
+            out=inv_denom[..., it, :],
+        )
+        np.multiply(c[..., it, :], inv_denom[..., it, :], out=c_prime[..., it, :])
+
+    return out
+
+
+def tdma_substitute(
+    a_loc: np.ndarray,
+    factor: np.ndarray,
+    d: np.ndarray,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Solve a batch of tri-diagonal systems given their factorisation.
+
+    Only does the substitution passes over the right hand side.
+
+    Args:
+        a_loc (np.ndarray): sub-diagonal, shape (..., n, m).
+        factor (np.ndarray): output of `tdma_factor` for the same operator.
+        d (np.ndarray): right hand side, shape (..., n, m).
+        out (Optional[np.ndarray], optional): preallocated output buffer with
+            the broadcast shape of all inputs. Can be `d` itself to solve in
+            place. Defaults to None, which allocates a new array.
+
+    Returns:
+        np.ndarray: x, the solution (the `out` buffer if given).
+    """
+    nf = d.shape[-2]  # number of equations
+    c_prime, inv_denom = factor[0], factor[1]
+    shape = np.broadcast_shapes(a_loc.shape, c_prime.shape, d.shape)
+
+    if out is None:
+        out = np.empty(shape, dtype=np.result_type(factor, d))
+    assert out.shape == shape, "out has shape " + str(out.shape)
+
+    # forward substitution, storing d' in out.
+    np.multiply(d[..., 0, :], inv_denom[..., 0, :], out=out[..., 0, :])
+    for it in range(1, nf):
+        out[..., it, :] = (
+            d[..., it, :] - a_loc[..., it, :] * out[..., it - 1, :]
+        ) * inv_denom[..., it, :]
+
+    # back substitution.
+    for il in range(nf - 2, -1, -1):
+        out[..., il, :] -= c_prime[..., il, :] * out[..., il + 1, :]
+
+    return out
+
+
+def tdma_solve(
+    a_loc: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    d: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    work: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Solve a batch of tri-diagonal systems with the Thomas algorithm.
+
+    The coefficients are only read, never copied. The arrays only need to
+    be broadcastable against each other, so the coefficients for one grid
+    can be shared between many right hand sides.
+
+    Args:
+        a_loc (np.ndarray): sub-diagonal, shape (..., n, m).
+        b (np.ndarray): diagonal, shape (..., n, m).
+        c (np.ndarray): super-diagonal, shape (..., n, m).
+        d (np.ndarray): right hand side, shape (..., n, m).
+        out (Optional[np.ndarray], optional): preallocated output buffer with
+            the broadcast shape of all inputs. Can be `d` itself to solve in
+            place. Defaults to None, which allocates a new array.
+        work (Optional[np.ndarray], optional): preallocated buffer for the
+            factorisation, of shape (2, ..., n, m) with the broadcast shape of
+            the coefficients. Defaults to None, which allocates a new array.
+
+    Returns:
+        np.ndarray: x, the solution (the `out` buffer if given).
+
+    Example:
+        Solving a stack of two systems in a preallocated buffer::
+
+            x = np.empty((2, n, m), dtype=np.complex128)
+            tdma_solve(a, b, c, d, out=x)
+
+    """
+    factor = tdma_factor(a_loc, b, c, out=work)
+    return tdma_substitute(a_loc, factor, d, out=out)
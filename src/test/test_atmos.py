@@ -6,9 +6,14 @@ Example:
         pytest src/test/test_atmos.py
 
 """
+import numpy as np
+import xarray as xr
+from omegaconf import open_dict
 from src.models.atmos import Atmos
+from src.models.benchmark import synthetic_inputs, baseline_s91_solver
 from src.data_loading.download import get_data
 from src.configs.load_config import load_config
+from src.configs.config import derived_param
 from src.models.model_setup import ModelSetup
 from src.constants import TEST_DIREC
 
@@ -23,3 +28,141 @@ def test_atmos():
     # atmos.make_figure()
     # atmos.output_trends()
     # atmos.output_dq()
+
+
+def test_warm_start(tmp_path) -> None:
+    """Check a warm started solve converges at once to the same state."""
+    cfg = load_config()
+    cfg.atm.pr_tol = 1e-6
+    atmos = Atmos(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    pr, pr_c, q_th, e1, qa1, mask = synthetic_inputs(atmos)
+    cold = atmos.iterate(pr, pr_c, q_th, e1, qa1, mask)
+    assert len(cold[5]) > 2
+
+    # as if read back from the TCAM output.
+    tcam = xr.Dataset(
+        {
+            var + state: (dims, x)
+            for var, dims, x in [
+                ("PR", ("Yu", "X"), cold[0]),
+                ("u", ("Yu", "X"), cold[1]),
+                ("v", ("Yv", "X"), cold[2]),
+            ]
+            for state in ["end", "beg"]
+        }
+    )
+    atmos.warm_start(tcam)
+    warm = atmos.iterate(
+        pr,
+        atmos.warm["pr_c_end"],
+        q_th,
+        e1,
+        qa1,
+        mask,
+        uv=(atmos.warm["u_end"], atmos.warm["v_end"]),
+    )
+    assert len(warm[5]) <= 2
+    for x, y in zip(cold[:3], warm[:3]):
+        np.testing.assert_allclose(x, y, atol=1e-5 * np.abs(x).max())
+
+
+def test_members(tmp_path) -> None:
+    """Check each ensemble member matches a solve of that member on its own."""
+    params = {"eps_days": [0.4, 0.75, 1.4], "k_days": [8.0, 10.0, 13.0]}
+
+    def member_atmos(values: dict) -> Atmos:
+        cfg = load_config()
+        with open_dict(cfg):
+            for name, value in values.items():
+                cfg.atm[name] = value
+        cfg = derived_param(cfg)
+        return Atmos(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+
+    atmos = member_atmos(params)
+    pr, pr_c, q_th, e1, qa1, mask = synthetic_inputs(atmos)
+    assert q_th.shape[0] == 3
+    ensemble = atmos.iterate(
+        pr, np.broadcast_to(pr_c, q_th.shape).copy(), q_th, e1, qa1, mask
+    )
+    for i in range(3):
+        atmos = member_atmos({name: value[i] for name, value in params.items()})
+        member = atmos.iterate(*synthetic_inputs(atmos))
+        # pr_c, u, v, phi and mc.
+        for x, y in zip(ensemble[:5], member[:5]):
+            assert x[i].shape == y.shape
+            np.testing.assert_allclose(
+                x[i], y, rtol=1e-10, atol=1e-12 * np.abs(y).max()
+            )
+
+
+def test_s91_solver(tmp_path) -> None:
+    """Check the rfft and cached factorisation solver against the baseline."""
+    cfg = load_config()
+    atmos = Atmos(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    q1 = 1e-5 * np.random.default_rng(0).normal(size=(cfg.atm.ny - 1, cfg.atm.nx))
+    for x, y in zip(baseline_s91_solver(atmos, q1), atmos.s91_solver(q1)):
+        np.testing.assert_allclose(y, x, rtol=0, atol=1e-10 * np.abs(x).max())
+
+
+def test_s91_key(tmp_path) -> None:
+    """Check the S91 factorisation is only shared by identical operators."""
+    keys = []
+    for name, value in [
+        (None, None),
+        (None, None),
+        ("y_north_lim", 50),
+        ("omega_2", 1e-4),
+    ]:
+        cfg = load_config()
+        if name is not None:
+            cfg.atm[name] = value
+        atmos = Atmos(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+        keys.append(atmos.s91_key())
+    assert keys[0] == keys[1]
+    assert len(set(keys)) == 3
+
+
+def test_get_dclim(tmp_path, monkeypatch) -> None:
+    """Check the fused flux kernel against the xarray flux functions."""
+    cfg = load_config()
+    atmos = Atmos(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    rng = np.random.default_rng(0)
+    lat, lon = np.linspace(-30, 30, 7), np.linspace(100, 280, 9)
+
+    def field(low: float, high: float) -> xr.DataArray:
+        return xr.DataArray(
+            rng.uniform(low, high, size=(7, 9)),
+            dims=("lat", "lon"),
+            coords={"lat": lat, "lon": lon},
+        )
+
+    dclim = xr.Dataset(
+        {
+            "ts": field(290, 305),
+            "sfcWind": field(2, 10),
+            "clt": field(20, 90),
+            "rh": field(60, 95).T,
+        }
+    )
+    monkeypatch.setattr(atmos, "load_clim60", lambda: dclim.copy())
+    monkeypatch.setattr(atmos, "write_output", lambda ds, path: None)
+
+    for vary_cloud_const in [False, True]:
+        atmos.atm.vary_cloud_const = vary_cloud_const
+        new = atmos.get_dclim()[0]
+        t_sb = dclim.ts
+        u_b = np.maximum(dclim.sfcWind, atmos.atm.wnsp_min)
+        c_b, rh = dclim.clt / 100, dclim.rh / 100
+        for name, u_sp, cloud_cover in [
+            ("dTse0", atmos.atm.u_bar, atmos.atm.c_bar),
+            ("dTse1", u_b, atmos.atm.c_bar),
+            ("dTse2", atmos.atm.u_bar, c_b),
+            ("dTse", u_b, c_b),
+        ]:
+            alh = atmos.f_dqlh_dtemp(t_sb, u_sp, rh)
+            alw = atmos.f_dqlw_dtemp(t_sb, cloud_cover, atmos.atm.f1_bar, rh)
+            blw = atmos.f_dqlw_df(t_sb, cloud_cover)
+            old = -blw * atmos.atm.f1prime / (alh + alw)
+            xr.testing.assert_allclose(
+                new[name], old.transpose(*t_sb.dims).reindex_like(t_sb)
+            )
@@ -0,0 +1,103 @@
+"""Test the build cache for the ocean binaries.
+
+Example:
+    Test using::
+
+        pytest src/test/test_build.py
+
+"""
+import os
+from subprocess import CalledProcessError
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.models import build as build_module
+from src.models.build import build, build_key
+
+MAKEFILE = """CC = gcc
+
+all: tcom tios2cdf
+
+tcom: tcom.c
+\t$(CC) -o tcom tcom.c
+\techo tcom >> {log}
+
+tios2cdf: tcom.c
+\t$(CC) -o tios2cdf tcom.c
+"""
+
+
+def test_build(tmp_path) -> None:
+    """Check each version of the sources is compiled once, for all runs."""
+    log = tmp_path / "compiles.log"
+    runs = []
+    for i in range(4):
+        src_path = tmp_path / ("run_" + str(i)) / "SRC"
+        os.makedirs(src_path)
+        with open(src_path / "Makefile", "w") as file:
+            file.write(MAKEFILE.format(log=log))
+        with open(src_path / "tcom.c", "w") as file:
+            file.write("int main(void) { return 0; }\n")
+        runs.append(str(src_path))
+
+    cache = str(tmp_path / "build")
+    with ThreadPoolExecutor(4) as pool:
+        paths = list(pool.map(lambda x: build(x, ["tcom", "tios2cdf"], cache), runs))
+    assert len(set(paths)) == 1
+    with open(log) as file:
+        assert file.read() == "tcom\n"
+    for src_path in runs:
+        assert os.system(os.path.join(src_path, "tcom")) == 0
+        assert os.path.samefile(
+            os.path.join(src_path, "tios2cdf"), os.path.join(paths[0], "tios2cdf")
+        )
+
+    # a change to the sources is a new build.
+    with open(os.path.join(runs[0], "tcom.c"), "a") as file:
+        file.write("/* changed */\n")
+    assert build(runs[0], ["tcom", "tios2cdf"], cache) != paths[0]
+    assert build(runs[1], ["tcom", "tios2cdf"], cache) == paths[0]
+    with open(log) as file:
+        assert file.read() == "tcom\ntcom\n"
+
+
+def test_build_fails(tmp_path) -> None:
+    """Check a failed compile raises with the make log and is not cached."""
+    src_path = tmp_path / "SRC"
+    os.makedirs(src_path)
+    with open(src_path / "Makefile", "w") as file:
+        file.write(MAKEFILE.format(log=tmp_path / "compiles.log"))
+    with open(src_path / "tcom.c", "w") as file:
+        file.write("int main(void) { return 0 }\n")
+    cache = tmp_path / "build"
+    with pytest.raises(CalledProcessError) as error:
+        build(str(src_path), ["tcom", "tios2cdf"], str(cache))
+    assert "tcom.c" in error.value.output
+    assert [x for x in os.listdir(cache) if not x.endswith(".lock")] == []
+    assert not os.path.exists(src_path / "tcom")
+
+
+def test_build_key(monkeypatch, tmp_path) -> None:
+    """Check make and the compilers are only run once for each version."""
+    src_path = tmp_path / "SRC"
+    os.makedirs(src_path)
+    with open(src_path / "Makefile", "w") as file:
+        file.write(MAKEFILE.format(log=tmp_path / "compiles.log"))
+    with open(src_path / "tcom.c", "w") as file:
+        file.write("int main(void) { return 0; }\n")
+    commands = []
+    output = build_module._output
+
+    def counted(command, cwd):
+        commands.append(command)
+        return output(command, cwd)
+
+    monkeypatch.setattr(build_module, "_output", counted)
+    key = build_key(str(src_path))
+    assert commands
+    number = len(commands)
+    assert build_key(str(src_path)) == key
+    assert len(commands) == number
+    with open(src_path / "tcom.c", "a") as file:
+        file.write("/* changed */\n")
+    assert build_key(str(src_path)) != key
+    assert len(commands) == 2 * number
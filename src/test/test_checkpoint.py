@@ -0,0 +1,61 @@
+"""Test the checkpoint of the coupled run.
+
+Example:
+    Test using::
+
+        pytest src/test/test_checkpoint.py
+
+"""
+import os
+from src.configs.load_config import load_config
+from src.models.model_setup import ModelSetup
+from src.models.checkpoint import Checkpoint
+
+
+def test_checkpoint(tmp_path) -> None:
+    """Check an iteration is resumed only if its files are unchanged."""
+    setup = ModelSetup(str(tmp_path), load_config(), make_move=False)
+    checkpoint = Checkpoint(setup)
+    assert checkpoint.last_complete() == -1
+
+    for it in range(2):
+        for path in checkpoint.outputs(it) + checkpoint.state():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # the models write new outputs, rather than truncate the old ones.
+            if os.path.exists(path):
+                os.remove(path)
+            with open(path, "w") as file:
+                file.write(path + str(it))
+        checkpoint.save(it, {"it": it, "sst_res": 0.5, "stop": False})
+    assert checkpoint.last_complete() == 1
+
+    # the state is linked, not copied.
+    copy = os.path.join(checkpoint.state_path, "1", "om_run2f.nc")
+    assert os.path.samefile(copy, setup.om_run2f_nc())
+
+    # the next iteration writes a new output, as the models do, and then dies.
+    os.remove(setup.om_run2f_nc())
+    with open(setup.om_run2f_nc(), "w") as file:
+        file.write("half a run")
+    assert checkpoint.last_complete() == 1
+    history = checkpoint.restore(1)
+    assert [x["it"] for x in history] == [0, 1]
+    with open(setup.om_run2f_nc()) as file:
+        assert file.read() == setup.om_run2f_nc() + "1"
+
+    # a forcing file patched in place, with the same size and modification
+    # time, is caught by its hash, and the iteration before is used.
+    stat = os.stat(setup.ts_trend(1))
+    with open(setup.ts_trend(1), "r+") as file:
+        file.write("X")
+    os.utime(setup.ts_trend(1), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert checkpoint.last_complete() == 0
+    assert [x["it"] for x in checkpoint.restore(0)] == [0]
+    with open(setup.om_run2f_nc()) as file:
+        assert file.read() == setup.om_run2f_nc() + "0"
+    with open(os.path.join(checkpoint.state_path, "0", "om_run2f.nc"), "w") as file:
+        file.write("changed")
+    assert checkpoint.last_complete() == -1
+
+    checkpoint.reset()
+    assert checkpoint.read() == []
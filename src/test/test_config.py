@@ -0,0 +1,49 @@
+"""Test the derived parameters in the config.
+
+Example:
+    Test using::
+
+        pytest src/test/test_config.py
+
+"""
+import numpy as np
+import pytest
+from omegaconf import open_dict
+from src.configs.load_config import load_config
+from src.configs.config import derived_param, member_param, number_members
+
+
+def test_member_param() -> None:
+    """Test that list parameters give the same members as scalar runs."""
+    cfg = load_config()
+    assert number_members(cfg.atm) == 0
+    ens_cfg = cfg.copy()
+    with open_dict(ens_cfg):
+        ens_cfg.atm.eps_days = [0.5, 0.75, 1.0]
+        ens_cfg.atm.k_days = [8, 10, 12]
+    ens_cfg = derived_param(ens_cfg)
+    assert number_members(ens_cfg.atm) == 3
+
+    for i, (eps_days, k_days) in enumerate(zip([0.5, 0.75, 1.0], [8, 10, 12])):
+        member_cfg = cfg.copy()
+        with open_dict(member_cfg):
+            member_cfg.atm.eps_days = eps_days
+            member_cfg.atm.k_days = k_days
+        member_cfg = derived_param(member_cfg)
+        for name in ["eps_u", "eps_v", "eps_p", "newtonian_cooling_coeff_k1"]:
+            assert member_param(ens_cfg.atm, name)[i] == member_cfg.atm[name]
+        # parameters that aren't lists stay scalar.
+        assert np.isscalar(member_param(ens_cfg.atm, "h_q"))
+
+    with open_dict(ens_cfg):
+        ens_cfg.atm.e_frac = [0.5, 2]
+    with pytest.raises(AssertionError):
+        derived_param(ens_cfg)
+
+
+def test_number_iterations() -> None:
+    """Test that an atmosphere solve without any passes is refused."""
+    cfg = load_config()
+    cfg.atm.number_iterations = 0
+    with pytest.raises(AssertionError):
+        derived_param(cfg)
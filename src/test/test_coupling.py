@@ -1,10 +1,14 @@
 """Test the stress script."""
+import os
+from concurrent.futures import Future
+from typing import Tuple
 import numpy as np
 import pandas as pd
 import xarray as xr
-from src.models.coupling import Coupling, ModelSetup
+import pytest
+from src.models.coupling import Coupling, ModelSetup, cut_run2f
 from src.configs.load_config import load_config
-from src.constants import TEST_DIREC
+from src.constants import TEST_DIREC, SEL_DICT
 
 
 def test_stress() -> None:
@@ -56,3 +60,233 @@ def test_stress() -> None:
 
     couple.replace_stress(1)
     couple.replace_dq(1)
+
+
+def test_convergence(monkeypatch, tmp_path) -> None:
+    """Check the stopping decisions from successive iterations."""
+    cfg = load_config()
+    cfg.coup.sst_tol = 0.1
+    cfg.coup.stop_on_blow_up = True
+    couple = Coupling(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    trend = xr.DataArray(np.ones((2, 3)), dims=("Y", "X"))
+    nino = {"trend_" + reg: 0.5 for reg in SEL_DICT}
+    nino.update({"mean_pac": 25.0, "mean_nino3.4": 26.0})
+
+    def check(sst_trend: xr.DataArray, nino_dict: dict) -> dict:
+        monkeypatch.setattr(couple, "sst_trend", lambda: sst_trend)
+        return couple.convergence(nino_dict)
+
+    first = check(trend, nino)
+    assert np.isnan(first["sst_res"]) and not first["stop"]
+    moved = check(trend + 1, nino)
+    assert moved["sst_res"] == 1.0 and not moved["stop"]
+    still = check(trend + 1.01, nino)
+    assert still["converged"] and still["stop"]
+    hot = check(trend + 1.01, {**nino, "mean_nino3.4": 35.0})
+    assert hot["blown_up"] and hot["stop"]
+
+
+def test_mixed_forcing(monkeypatch, tmp_path) -> None:
+    """Check the relaxed forcing for the next iteration."""
+    cfg = load_config()
+    cfg.coup.solver = "relax"
+    cfg.coup.relax_factor = 0.5
+    couple = Coupling(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    trend = xr.DataArray(np.ones((2, 3)), dims=("Y", "X"))
+    trend[0, 0] = np.nan
+    tau = xr.Dataset(
+        {
+            name: xr.DataArray(np.ones((4, 5)), dims=("Y", "X"))
+            for name in ["t_trend_u", "t_beg_u", "t_trend_v", "t_beg_v", "t_end_u"]
+        }
+    )
+
+    def mixed(scale: float) -> Tuple[xr.DataArray, xr.Dataset]:
+        monkeypatch.setattr(couple, "sst_trend", lambda: scale * trend)
+        monkeypatch.setattr(couple, "tau_anom_ds", lambda: scale * tau)
+        return couple.mixed_forcing()
+
+    # the first iterate is used as it is, then relaxed halfway.
+    sst_trend, tau_anom = mixed(1.0)
+    xr.testing.assert_equal(sst_trend, trend)
+    sst_trend, tau_anom = mixed(3.0)
+    xr.testing.assert_equal(sst_trend, 2 * trend)
+    xr.testing.assert_equal(tau_anom.t_beg_v, 2 * tau.t_beg_v)
+    xr.testing.assert_equal(tau_anom.t_end_u, 3 * tau.t_end_u)
+
+
+def test_flush(tmp_path) -> None:
+    """Check the background diagnostics are logged in order."""
+    cfg = load_config()
+    cfg.coup.async_log = True
+    cfg.wandb = False
+    couple = Coupling(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    futures = [Future() for _ in range(2)]
+    for it, future in enumerate(futures):
+        os.makedirs(tmp_path / "diagnostics" / str(it))
+        couple.pending.append(({"it": it}, future))
+
+    # the second has finished, but waits for the first.
+    futures[1].set_result({"trend_SST_W1_pac": 1.0})
+    couple.flush()
+    assert len(couple.pending) == 2
+    futures[0].set_result({"trend_SST_W1_pac": 0.0})
+    couple.flush()
+    assert not couple.pending
+    assert not os.listdir(tmp_path / "diagnostics")
+    couple.pool.shutdown()
+
+
+def test_cut_run2f(tmp_path) -> None:
+    """Check the worker gets the fields it reads, in the nino plot window."""
+    rng = np.random.default_rng(0)
+    names = ["SST_SST", "TDEEP_HMODEL", "SST_QNET", "SST_W1", "SST_QFLX"]
+    ds = xr.Dataset(
+        {x: (("T", "Z", "Y", "X"), rng.normal(size=(3, 1, 25, 36))) for x in names},
+        coords={
+            "T": ("T", np.arange(3) * 30.0 + 15, {"units": "days since 1958-01-01"}),
+            "Z": [5.0],
+            "Y": np.linspace(-60, 60, 25),
+            "X": np.arange(36) * 10.0 + 5,
+        },
+    )
+    ds.to_netcdf(tmp_path / "om_run2f.nc")
+    cut_run2f(str(tmp_path / "om_run2f.nc"), str(tmp_path / "cut.nc"))
+    with xr.open_dataset(tmp_path / "cut.nc", decode_times=False) as cut:
+        assert sorted(cut.data_vars) == sorted(names[:4])
+        assert cut.X.min() >= 95 and cut.X.max() <= 295
+        assert cut.Y.min() >= -32 and cut.Y.max() <= 32
+        for name in names[:4]:
+            np.testing.assert_array_equal(
+                cut[name], ds[name].sel(X=cut.X, Y=cut.Y).values
+            )
+
+
+def _tau(path: str, fmt: str, name: str = "taux") -> xr.DataArray:
+    """A small stress file on the rows of the ocean grid."""
+    rng = np.random.default_rng(0)
+    tau = xr.DataArray(
+        rng.normal(size=(6, 1, 181, 4)).astype("float32"),
+        dims=("T", "Z", "Y", "X"),
+        coords={
+            "T": np.arange(6) + 0.5,
+            "Z": [5.0],
+            "Y": np.linspace(-90, 90, 181),
+            "X": np.arange(4) + 0.5,
+        },
+        name=name,
+    )
+    tau.to_dataset().to_netcdf(path, format=fmt)
+    return tau
+
+
+def test_patch_stress(tmp_path) -> None:
+    """Check the stress anomaly is the same for netCDF classic and netCDF4."""
+    cfg = load_config()
+    couple = Coupling(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    tau = _tau(str(tmp_path / "tau_0.x"), "NETCDF3_CLASSIC")
+    _tau(str(tmp_path / "tau_0.nc"), "NETCDF4")
+    window = tau[0, 0, 40:141, :]
+    # the regridded anomaly only matches the grid of the file up to rounding.
+    trend = xr.full_like(window, 2.0, dtype="float64")
+    trend = trend.assign_coords(Y=trend.Y + 1e-7)
+    beg = xr.full_like(window, 1.0, dtype="float64")
+    for template in ["tau_0.x", "tau_0.nc"]:
+        path = str(tmp_path / template.replace("0", "1"))
+        couple.patch_stress("taux", str(tmp_path / template), path, trend, beg, chunk=4)
+        new = xr.open_dataset(path, decode_times=False)
+        expected = tau.copy(deep=True)
+        expected[:, 0, 40:141, :] = couple.stress_ramp(
+            tau.values[:, 0, 40:141, :], np.arange(6), 6, trend.values, beg.values
+        )
+        xr.testing.assert_allclose(new.taux, expected)
+        new.close()
+
+
+@pytest.mark.parametrize("add_stress", [True, False])
+@pytest.mark.parametrize("stress_trend", [True, False])
+def test_replace_stress(tmp_path, add_stress: bool, stress_trend: bool) -> None:
+    """Check the stress files match the loop that replace_stress replaced."""
+    cfg = load_config()
+    cfg.coup.add_stress = add_stress
+    cfg.coup.stress_trend = stress_trend
+    setup = ModelSetup(str(tmp_path), cfg, make_move=False)
+    os.makedirs(setup.ocean_data_path)
+    for path in [setup.tau_x(0), setup.tau_clim_x(0)]:
+        taux = _tau(path, "NETCDF3_CLASSIC")
+    for path in [setup.tau_y(0), setup.tau_clim_y(0)]:
+        tauy = _tau(path, "NETCDF3_CLASSIC", name="tauy")
+    window = taux[0, 0, 40:141, :]
+    ds = xr.Dataset(
+        {
+            name: xr.full_like(window, value, dtype="float64")
+            for name, value in [
+                ("t_trend_u", 3.0),
+                ("t_beg_u", 1.0),
+                ("t_trend_v", 4.0),
+                ("t_beg_v", 2.0),
+            ]
+        }
+    )
+    Coupling(cfg, setup).replace_stress(1, ds)
+
+    # the loop of the baseline, in which the x stress starts from t_beg_v
+    # when it replaces the ECMWF stress.
+    time_length = taux.sizes["T"]
+    for path, tau, trend, beg in [
+        (setup.tau_x(1), taux, 3.0, 1.0 if add_stress else 2.0),
+        (setup.tau_y(1), tauy, 4.0, 2.0),
+    ]:
+        expected = tau.copy(deep=True)
+        for i in range(time_length):
+            old = tau[i, 0, 40:141, :].values if add_stress else 0.0
+            if stress_trend:
+                new = old + (i / time_length - 1 / 2) * trend
+            else:
+                new = old + (i / time_length) * trend + beg
+            expected[i, 0, 40:141, :] = new
+        with xr.open_dataset(path, decode_times=False) as new_ds:
+            xr.testing.assert_allclose(new_ds[tau.name], expected, atol=1e-6)
+
+
+def test_history_fields(tmp_path) -> None:
+    """Check the forcing goes into the history with canonical coordinates."""
+    cfg = load_config()
+    setup = ModelSetup(str(tmp_path), cfg, make_move=False)
+    os.makedirs(setup.ocean_data_path)
+    os.makedirs(setup.atmos_data_path)
+    # files on the grid names of the inputs, with latitude going south.
+    lat, lon = np.linspace(20, -20, 3), np.arange(4) + 0.5
+    for path, name, months in [
+        (setup.tau_x(1), "taux", 601),
+        (setup.tau_y(1), "tauy", 601),
+        (setup.dq_df(1), "dq_df", 2),
+        (setup.dq_dt(1), "dq_dt", 2),
+    ]:
+        xr.DataArray(
+            np.zeros((months, 1, 3, 4)),
+            dims=("T", "Z", "lat", "lon"),
+            coords={"T": np.arange(months) + 0.5, "Z": [5.0], "lat": lat, "lon": lon},
+            name=name,
+        ).to_dataset().to_netcdf(path)
+    for path in [setup.ts_clim(1), setup.ts_trend(1)]:
+        xr.DataArray(
+            np.zeros((3, 4)),
+            dims=("lat", "lon"),
+            coords={"lat": lat, "lon": lon},
+            name="ts",
+        ).to_dataset().to_netcdf(path)
+
+    couple = Coupling(cfg, setup)
+    field = xr.DataArray(np.zeros((3, 4)), dims=("Y", "X"))
+    couple.last = {"sst_trend": field}
+    couple.tcam = xr.Dataset({x: field for x in ["utrend", "vtrend", "PRtrend"]})
+    couple.dq = xr.Dataset({x: field for x in ["dq_df", "dq_dt"]})
+    tau = xr.Dataset(
+        {x: field for x in ["t_trend_u", "t_trend_v", "t_beg_u", "t_beg_v"]}
+    )
+    fields = couple.history_fields(1, tau)
+    for name in ["taux", "tauy", "dq_df", "dq_dt", "ts_clim", "ts_trend"]:
+        da = fields["forcing_" + name]
+        assert da.dims == ("Y", "X")
+        np.testing.assert_array_equal(da.Y, lat[::-1])
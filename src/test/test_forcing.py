@@ -0,0 +1,75 @@
+"""Test the in place patching of forcing files.
+
+Example:
+    Test using::
+
+        pytest src/test/test_forcing.py
+
+"""
+import numpy as np
+import xarray as xr
+import pytest
+from src.models.forcing import clone, is_netcdf3, NetCDF3File
+
+
+def _forcing(path: str, fmt: str) -> xr.Dataset:
+    """A small stress like dataset, with two record variables."""
+    rng = np.random.default_rng(0)
+    tau = xr.DataArray(
+        rng.normal(size=(7, 1, 9, 5)).astype("float32"),
+        dims=("T", "Z", "Y", "X"),
+        coords={
+            "T": np.arange(7) + 0.5,
+            "Z": [5.0],
+            "Y": np.linspace(-20, 20, 9),
+            "X": np.arange(5) + 0.5,
+        },
+        name="taux",
+    )
+    tau[0, 0, 0, 0] = np.nan
+    ds = tau.to_dataset()
+    ds["dq"] = (tau * 10).astype("float64")
+    ds["level"] = ("Y", np.arange(9, dtype="int16"))
+    encoding = {
+        "taux": {"_FillValue": -1e34},
+        "dq": {"dtype": "int16", "scale_factor": 0.01, "_FillValue": -999},
+    }
+    ds.to_netcdf(
+        path,
+        format=fmt,
+        unlimited_dims=["T"],
+        encoding=encoding,
+    )
+    return xr.open_dataset(path)
+
+
+@pytest.mark.parametrize("fmt", ["NETCDF3_CLASSIC", "NETCDF3_64BIT"])
+def test_patch(fmt: str, tmp_path) -> None:
+    """Check patched files read back as if written by xarray."""
+    template = str(tmp_path / ("forcing_0." + fmt))
+    path = str(tmp_path / ("forcing_1." + fmt))
+    ds = _forcing(template, fmt)
+    assert is_netcdf3(template)
+    clone(template, path)
+    band = (slice(None), 0, slice(2, 7), slice(None))
+    with NetCDF3File(path) as forcing:
+        for name in ds.data_vars:
+            np.testing.assert_array_equal(forcing.read(name), ds[name].values)
+        forcing.write("taux", band, forcing.read("taux", band) + 1)
+        forcing.write("dq", band, np.full((5, 5), np.nan))
+    new = xr.open_dataset(path)
+    expected = ds.load().copy(deep=True)
+    expected["taux"][band] = ds.taux[band] + 1
+    expected["dq"][band] = np.nan
+    xr.testing.assert_allclose(new, expected)
+    new.close()
+    ds.close()
+
+
+def test_not_netcdf3(tmp_path) -> None:
+    """Check netCDF4 files are refused."""
+    path = str(tmp_path / "forcing.nc")
+    xr.Dataset({"ts": ("X", np.arange(3.0))}).to_netcdf(path, format="NETCDF4")
+    assert not is_netcdf3(path)
+    with pytest.raises(ValueError):
+        NetCDF3File(path)
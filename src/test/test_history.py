@@ -0,0 +1,76 @@
+"""Test the coupling history store.
+
+Example:
+    Test using::
+
+        pytest src/test/test_history.py
+
+"""
+import numpy as np
+import xarray as xr
+import pytest
+from src.configs.load_config import load_config
+from src.models.model_setup import ModelSetup
+from src.models.history import History, open_history, history_field
+
+
+def test_history(tmp_path) -> None:
+    """Check fields on two grids and metrics are stored by iteration."""
+    setup = ModelSetup(str(tmp_path), load_config(), make_move=False)
+    history = History(setup)
+
+    def field(value: float, ny: int) -> xr.DataArray:
+        return xr.DataArray(
+            np.full((ny, 4), value),
+            dims=("Y", "X"),
+            coords={"Y": np.linspace(-10, 10, ny), "X": np.arange(4.0)},
+        )
+
+    for it in range(3):
+        history.append(
+            it,
+            {"sst_trend": field(it, 3), "ts_trend": field(2 * it, 5)},
+            {"it": it, "mean_pac": 25.0 + it, "name": "not a number"},
+        )
+    # iteration 2 again, as after a resume, then the late diagnostics.
+    history.append(2, {"sst_trend": field(7, 3), "ts_trend": field(8, 5)}, {})
+    history.add_metrics(1, {"trend_SST_W1_pac": 0.5})
+
+    ds = open_history(setup)
+    np.testing.assert_array_equal(ds.iteration.values, [0, 1, 2])
+    sst_trend = history_field(ds, "sst_trend")
+    ts_trend = history_field(ds, "ts_trend")
+    assert sst_trend.dims == ("iteration", "Y", "X")
+    assert ts_trend.sizes["Y"] == 5
+    xr.testing.assert_equal(ts_trend.sel(iteration=2, drop=True).load(), field(8, 5))
+    np.testing.assert_array_equal(ds.mean_pac.values, [25.0, 26.0, 27.0])
+    assert np.isnan(ds.trend_SST_W1_pac.values[[0, 2]]).all()
+    assert "name" not in ds
+    ds.close()
+
+    history.reset()
+    history.append(0, {"sst_trend": field(0, 3)}, {})
+    with open_history(setup) as ds:
+        assert ds.sizes["iteration"] == 1
+
+
+def test_history_grid(tmp_path) -> None:
+    """Check a field on another grid than it is stored on is refused."""
+    setup = ModelSetup(str(tmp_path), load_config(), make_move=False)
+    history = History(setup)
+    field = xr.DataArray(
+        np.zeros((3, 4)),
+        dims=("Y", "X"),
+        coords={"Y": np.linspace(-10, 10, 3), "X": np.arange(4.0)},
+    )
+    history.append(0, {"sst_trend": field}, {})
+    for other in [
+        field.T,
+        field.assign_coords(Y=field.Y + 1),
+        field.isel(X=slice(0, 3)),
+    ]:
+        with pytest.raises(ValueError):
+            history.append(1, {"sst_trend": other}, {"it": 1})
+    with open_history(setup) as ds:
+        assert ds.sizes["iteration"] == 1
+        assert "it" not in ds
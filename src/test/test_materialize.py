@@ -0,0 +1,46 @@
+"""Test the linking of inputs into a run directory.
+
+Example:
+    Test using::
+
+        pytest src/test/test_materialize.py
+
+"""
+import os
+from src.models.materialize import materialize, changed_inputs
+
+
+def test_materialize(tmp_path) -> None:
+    """Check only the mutable files are copied, and writes to links are found."""
+    src_dir = tmp_path / "DATA"
+    os.makedirs(src_dir / "subdir")
+    for name in ["om_run2f", "tau.x", "clim.nc"]:
+        with open(src_dir / name, "w") as file:
+            file.write(name)
+
+    dst_dir = tmp_path / "run" / "DATA"
+    linked = materialize(str(src_dir), str(dst_dir), ["om_*"])
+    assert sorted(os.listdir(dst_dir)) == ["clim.nc", "om_run2f", "tau.x"]
+    for name in ["om_run2f", "tau.x", "clim.nc"]:
+        with open(dst_dir / name) as file:
+            assert file.read() == name
+    assert not os.path.islink(dst_dir / "om_run2f")
+    assert str(src_dir / "om_run2f") not in linked
+    # symlinks are recorded, reflinks are private copies.
+    for name in ["tau.x", "clim.nc"]:
+        assert os.path.islink(dst_dir / name) == (str(src_dir / name) in linked)
+    assert changed_inputs(linked) == []
+
+    with open(dst_dir / "om_run2f", "a") as file:
+        file.write(" edited")
+    with open(dst_dir / "tau.x", "a") as file:
+        file.write(" edited through the link")
+    assert changed_inputs(linked) == [x for x in linked if x.endswith("tau.x")]
+
+    # materializing again never writes through the old links.
+    materialize(str(src_dir), str(dst_dir), ["*"])
+    assert not os.path.islink(dst_dir / "clim.nc")
+    with open(dst_dir / "clim.nc", "w") as file:
+        file.write("changed")
+    with open(src_dir / "clim.nc") as file:
+        assert file.read() == "clim.nc"
@@ -1,8 +1,15 @@
 """Test ocean model runs."""
+import os
+import json
+import time
+import subprocess
+import threading
+from typing import Callable
+import pytest
 from src.configs.load_config import load_config
 from src.models.model_setup import ModelSetup
 from src.constants import TEST_DIREC
-from src.models.ocean import Ocean
+from src.models.ocean import Ocean, run_graph
 
 
 def test_ocean() -> None:
@@ -15,3 +22,126 @@ def test_ocean() -> None:
         ocean.run_all()
     if cfg.animate:
         ocean.animate_all()
+
+
+def test_stages(tmp_path) -> None:
+    """Check the stages are timed, and fail on errors and stale outputs."""
+    cfg = load_config()
+    cfg.ocean.timeouts.om_spin = 1
+    setup = ModelSetup(str(tmp_path), cfg, make_move=False)
+    for path in [setup.ocean_run_path, setup.ocean_src_path, setup.ocean_output_path]:
+        os.makedirs(path)
+    os.symlink(setup.ocean_output_path, os.path.join(setup.ocean_run_path, "output"))
+    tcom = os.path.join(setup.ocean_src_path, cfg.ocean.tcom_name)
+    with open(tcom, "w") as file:
+        # a model that fails for om_test, hangs for om_spin, and only
+        # writes the .data output for om_diag.
+        file.write(
+            "#!/bin/sh\n"
+            'echo "running $2"\n'
+            '[ "$2" = om_test ] && exit 3\n'
+            '[ "$2" = om_spin ] && sleep 5\n'
+            "touch output/$2.data\n"
+            '[ "$2" = om_diag ] && exit 0\n'
+            "touch output/$2.indx\n"
+        )
+    os.chmod(tcom, 0o755)
+
+    ocean = Ocean(cfg, setup)
+    ocean.it = 2
+    assert ocean.tcom("om_run2f") >= 0
+    assert list(ocean.timings) == ["om_run2f"]
+    with open(os.path.join(setup.ocean_log_path, "2_om_run2f.out")) as file:
+        assert file.read() == "running om_run2f\n"
+    with open(os.path.join(setup.ocean_log_path, "timings.jsonl")) as file:
+        assert json.loads(file.read())["stage"] == "om_run2f"
+
+    with pytest.raises(subprocess.CalledProcessError):
+        ocean.tcom("om_test")
+    with pytest.raises(subprocess.TimeoutExpired):
+        ocean.tcom("om_spin")
+    with pytest.raises(FileNotFoundError):
+        ocean.tcom("om_diag")
+    # an old output is not taken for a new one.
+    old = time.time() - 60
+    os.utime(os.path.join(setup.ocean_output_path, "om_diag.data"), (old, old))
+    with open(os.path.join(setup.ocean_output_path, "om_diag.indx"), "w") as file:
+        file.write("from the last iteration")
+    os.utime(os.path.join(setup.ocean_output_path, "om_diag.indx"), (old, old))
+    with pytest.raises(FileNotFoundError):
+        ocean.tcom("om_diag")
+
+
+def test_run_graph() -> None:
+    """Check stages wait only for what they need, and errors stop the rest."""
+    order = []
+    converted = threading.Event()
+
+    def stage(name: str, needs_event: bool = False) -> Callable[[], None]:
+        def func() -> None:
+            if needs_event:
+                # only finishes if the conversion runs at the same time.
+                assert converted.wait(timeout=5)
+            if name == "tios2cdf":
+                converted.set()
+            order.append(name)
+
+        return func
+
+    run_graph(
+        {
+            "spin": (stage("spin"), []),
+            "diag": (stage("diag", needs_event=True), ["spin"]),
+            "tios2cdf": (stage("tios2cdf"), ["spin"]),
+            "ingrid": (stage("ingrid"), ["diag", "tios2cdf"]),
+        }
+    )
+    assert order == ["spin", "tios2cdf", "diag", "ingrid"]
+
+    # one at a time, in the order given.
+    order.clear()
+    run_graph(
+        {
+            "spin": (stage("spin"), []),
+            "tios2cdf": (stage("tios2cdf"), ["spin"]),
+            "diag": (stage("diag"), ["spin"]),
+            "ingrid": (stage("ingrid"), ["diag", "tios2cdf"]),
+        },
+        workers=1,
+    )
+    assert order == ["spin", "tios2cdf", "diag", "ingrid"]
+
+    def fail() -> None:
+        raise ValueError("tcom crashed")
+
+    order.clear()
+    with pytest.raises(ValueError):
+        run_graph({"spin": (fail, []), "diag": (stage("diag"), ["spin"])})
+    assert not order
+
+
+def test_spin_up_order(tmp_path, monkeypatch) -> None:
+    """Check the default spin up runs its stages one at a time, in order."""
+    cfg = load_config()
+    for name in ["spin", "diag", "ingrid"]:
+        cfg.ocean[name] = True
+    assert not cfg.ocean.overlap
+    ocean = Ocean(cfg, ModelSetup(str(tmp_path), cfg, make_move=False))
+    order = []
+    monkeypatch.setattr(ocean, "tcom", lambda part: order.append(part))
+    monkeypatch.setattr(ocean, "tios2cdf", lambda part: order.append("tios2cdf"))
+    monkeypatch.setattr(ocean, "run", lambda command: order.append(command[:2]))
+    monkeypatch.setattr(
+        "src.models.ocean.linear_qflx_replacement",
+        lambda setup: order.append("ingrid"),
+    )
+    ocean.spin_up()
+    assert order == [
+        "om_spin",
+        "tios2cdf",
+        "cp",
+        "om_diag",
+        "tios2cdf",
+        "cp",
+        "ingrid",
+    ]
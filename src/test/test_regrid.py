@@ -0,0 +1,46 @@
+"""Test the bilinear regridding.
+
+Example:
+    Test using::
+
+        pytest src/test/test_regrid.py
+
+"""
+import numpy as np
+from src.models.regrid import regrid, bilinear_weights
+
+
+def test_regrid() -> None:
+    """Test `src.models.regrid.regrid` on a bilinear field."""
+    x_src = np.linspace(0, 358, 180)
+    # descending source axis, as interp2d allowed.
+    y_src = np.linspace(-59, 59, 60)[::-1]
+    x_tgt = np.linspace(1, 357, 100)
+    y_tgt = np.linspace(-50, 50, 41)
+
+    def field(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return (
+            1 + 0.1 * x[np.newaxis, :] - 0.3 * y[:, np.newaxis] + 1e-3 * np.outer(y, x)
+        )
+
+    stack = np.stack([field(x_src, y_src), 2 * field(x_src, y_src)])
+    out = regrid(x_src, y_src, stack, x_tgt, y_tgt)
+    assert out.shape == (2, 41, 100)
+    assert np.allclose(out[0], field(x_tgt, y_tgt))
+    assert np.allclose(out[1], 2 * field(x_tgt, y_tgt))
+    # the weights are cached between calls.
+    assert bilinear_weights(x_src, y_src, x_tgt, y_tgt) is bilinear_weights(
+        x_src, y_src, x_tgt, y_tgt
+    )
+
+
+def test_regrid_edges() -> None:
+    """Test extrapolation to the nearest edge, and that NaNs stay local."""
+    x_src = np.array([0.0, 1.0, 2.0])
+    y_src = np.array([0.0, 1.0])
+    values = np.array([[0.0, 1.0, np.nan], [2.0, 3.0, 4.0]])
+    out = regrid(x_src, y_src, values, np.array([-1.0, 0.5, 3.0]), np.array([2.0]))
+    assert np.allclose(out, [[2.0, 2.5, 4.0]])
+    out = regrid(x_src, y_src, values, np.array([0.5, 1.5]), np.array([0.0]))
+    assert np.isclose(out[0, 0], 0.5)
+    assert np.isnan(out[0, 1])
@@ -0,0 +1,36 @@
+"""Test the 1-2-1 smoother.
+
+Example:
+    Test using::
+
+        pytest src/test/test_smooth.py
+
+"""
+import numpy as np
+from src.models.smooth import smooth121
+
+
+def test_smooth121() -> None:
+    """Test `src.models.smooth.smooth121` edges and batching."""
+    v = np.array([1.0, 0.0, 0.0, 0.0, 2.0])
+    assert np.allclose(smooth121(v, [0]), [0.75, 0.25, 0.0, 0.5, 1.5])
+    assert np.allclose(
+        smooth121(v, [0], periodic_axes=[0]), [1.0, 0.25, 0.0, 0.5, 1.25]
+    )
+    # leading axes are smoothed independently.
+    stack = np.stack([v, 2 * v])
+    assert np.allclose(smooth121(stack, [-1])[1], 2 * smooth121(v, [0]))
+    # the mean is conserved with periodic boundaries.
+    rng = np.random.default_rng(0)
+    field = rng.normal(size=(2, 6, 8))
+    smoothed = smooth121(field, [-2, -1], number_smooths=2, periodic_axes=[-2, -1])
+    assert np.allclose(smoothed.mean(axis=(-2, -1)), field.mean(axis=(-2, -1)))
+
+
+def test_smooth121_nan() -> None:
+    """Test that NaNs are filled from neighbours and then masked again."""
+    v = np.array([1.0, np.nan, 3.0, np.nan, np.nan, np.nan, 7.0])
+    out = smooth121(v, [0])
+    assert np.array_equal(np.isnan(out), np.isnan(v))
+    # the single gap is filled with 3.0, and the long gap from each side.
+    assert np.allclose(out[[0, 2, 6]], [1.5, 3.0, 7.0])
@@ -0,0 +1,68 @@
+"""Test the spin up cache.
+
+Example:
+    Test using::
+
+        pytest src/test/test_spin_cache.py
+
+"""
+import os
+from src.configs.load_config import load_config
+from src.models.model_setup import ModelSetup
+from src.models.spin_cache import SpinCache, RUN_FILES
+
+
+def _setup(direc: str) -> ModelSetup:
+    """A run directory with the spin up run files and inputs."""
+    setup = ModelSetup(direc, load_config(), make_move=False)
+    for path in [
+        setup.ocean_run_path,
+        setup.ocean_src_path,
+        setup.ocean_data_path,
+        setup.ocean_output_path,
+    ]:
+        os.makedirs(path)
+    os.symlink(setup.ocean_data_path, os.path.join(setup.ocean_run_path, "DATA"))
+    for name in RUN_FILES:
+        with open(os.path.join(setup.ocean_run_path, name), "w") as file:
+            file.write(name + " +Wind_file 'DATA/tau' +SST_file 'DATA/sst.nc'\n")
+    for name in ["tau.x", "tau.y", "sst.nc", "other.nc"]:
+        with open(os.path.join(setup.ocean_data_path, name), "w") as file:
+            file.write(name)
+    return setup
+
+
+def _spin_up(setup: ModelSetup) -> None:
+    """Make the outputs as the ocean would."""
+    for path in SpinCache(setup).outputs():
+        with open(path, "w") as file:
+            file.write("spun up " + os.path.basename(path))
+
+
+def test_spin_cache(tmp_path) -> None:
+    """Check a spin up is reused only for the same run files and inputs."""
+    cache = str(tmp_path / "cache")
+    first = _setup(str(tmp_path / "first"))
+    assert [os.path.basename(x) for x in SpinCache(first).inputs()] == [
+        "sst.nc",
+        "tau.x",
+        "tau.y",
+    ]
+    with SpinCache(first, cache).entry() as restored:
+        assert not restored
+        _spin_up(first)
+
+    second = _setup(str(tmp_path / "second"))
+    with open(os.path.join(second.ocean_data_path, "other.nc"), "w") as file:
+        file.write("not an input of the spin up")
+    with SpinCache(second, cache).entry() as restored:
+        assert restored
+    for path in SpinCache(second).outputs():
+        with open(path) as file:
+            assert file.read() == "spun up " + os.path.basename(path)
+
+    third = _setup(str(tmp_path / "third"))
+    with open(os.path.join(third.ocean_data_path, "tau.y"), "w") as file:
+        file.write("new stress")
+    with SpinCache(third, cache).entry() as restored:
+        assert not restored
@@ -0,0 +1,58 @@
+"""Test the batched tri-diagonal solver.
+
+Example:
+    Test using::
+
+        pytest src/test/test_tdma.py
+
+"""
+import numpy as np
+from src.models.tdma import tdma_solve, tdma_factor, tdma_substitute
+
+
+def _dense(a_loc: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Make the dense matrix for one tri-diagonal system."""
+    return np.diag(b) + np.diag(a_loc[1:], k=-1) + np.diag(c[:-1], k=1)
+
+
+def test_tdma_solve() -> None:
+    """Test `src.models.tdma.tdma_solve` against a dense solve."""
+    rng = np.random.default_rng(0)
+    n, m = 12, 5
+    a_loc = rng.normal(size=(n, 1))
+    c = rng.normal(size=(n, 1))
+    b = 4 + rng.normal(size=(n, m)) + 1.0j * rng.normal(size=(n, m))
+    # stack of right hand sides with extra leading axes.
+    d = rng.normal(size=(3, 2, n, m)) + 1.0j * rng.normal(size=(3, 2, n, m))
+
+    out = np.empty(d.shape, dtype=np.complex128)
+    x = tdma_solve(a_loc, b, c, d, out=out)
+    assert x is out
+
+    for i in range(3):
+        for j in range(2):
+            for k in range(m):
+                mat = _dense(a_loc[:, 0], b[:, k], c[:, 0])
+                np.testing.assert_allclose(
+                    x[i, j, :, k], np.linalg.solve(mat, d[i, j, :, k])
+                )
+
+    # in place solve gives the same answer.
+    d_copy = d.copy()
+    tdma_solve(a_loc, b, c, d_copy, out=d_copy)
+    np.testing.assert_allclose(d_copy, x)
+
+
+def test_tdma_factor() -> None:
+    """Test reusing `src.models.tdma.tdma_factor` for many right hand sides."""
+    rng = np.random.default_rng(1)
+    n, m = 10, 4
+    a_loc = rng.normal(size=(n, m))
+    b = 4 + rng.normal(size=(n, m))
+    c = rng.normal(size=(n, m))
+    factor = tdma_factor(a_loc, b, c)
+    for _ in range(3):
+        d = rng.normal(size=(2, n, m))
+        np.testing.assert_allclose(
+            tdma_substitute(a_loc, factor, d), tdma_solve(a_loc, b, c, d)
+        )
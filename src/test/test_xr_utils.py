@@ -1,4 +1,5 @@
 """Test xr_utils."""
+import numpy as np
 import xarray as xr
 import recursive_diff
 from src.xr_utils import fix_calendar, open_dataset, sel, cut_and_taper, can_coords
@@ -20,3 +21,21 @@ def test_fix_calendar() -> None:
         cut_and_taper(da_new.isel(Z=0, T=0, variable=0)),
         cut_and_taper(can_coords(da_new.isel(Z=0, T=0)).isel(variable=0)),
     )
+
+
+def test_cut_and_taper() -> None:
+    """Test `src.xr_utils.cut_and_taper` over extra leading dimensions."""
+    da = xr.DataArray(
+        np.ones((2, 3, 7)),
+        dims=("T", "X", "Y"),
+        coords={"Y": [-30.0, -25.0, -22.5, 0.0, 20.0, 24.0, 26.0]},
+        name="tau",
+    )
+    da[0, 0, 0] = np.nan
+    new = cut_and_taper(da)
+    assert new.dims == ("T", "Y", "X")
+    assert new.name == "tau"
+    np.testing.assert_allclose(
+        new.isel(T=0, X=0).values, [0.0, 0.0, 0.5, 1.0, 1.0, 0.2, 0.0]
+    )
+    xr.testing.assert_equal(new.isel(T=0), new.isel(T=1))
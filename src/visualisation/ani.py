@@ -300,7 +300,11 @@ def animate_qflx_diff(
 
 @timeit
 def animate_coupling(
-    setup: ModelSetup, dpi: int = 200, pac: bool = False, mask_land: bool = False
+    setup: ModelSetup,
+    dpi: int = 200,
+    pac: bool = False,
+    mask_land: bool = False,
+    iterations: Optional[int] = None,
 ) -> None:
     """
     Animate coupling.
@@ -311,11 +315,15 @@ def animate_coupling(
         pac (bool, optional): Whether to only plot the Pacific. Defaults to False.
         mask_land (bool, optional): Whether to mask the land in green.
             Defaults to False.
+        iterations (Optional[int], optional): Number of coupling iterations
+            that were run. Defaults to None, which means coup.iterations.
 
     """
     ps_defaults(use_tex=False, dpi=dpi)  # set the plot settings sensibly.
 
-    video_indices = list(range(setup.cfg.coup.iterations))
+    if iterations is None:
+        iterations = setup.cfg.coup.iterations
+    video_indices = list(range(iterations))
     video_path = setup.coupling_video(pac=pac, mask_land=mask_land)
     make_frame = coupling_frame(setup, pac=pac, mask_land=mask_land)
     imageio.mimsave(
@@ -1,4 +1,5 @@
 """Look at the convergence of the coupling scheme."""
+import os
 from typing import Callable
 import numpy as np
 import xarray as xr
@@ -16,6 +17,7 @@ from src.plot_utils import (
 )
 from src.configs.load_config import load_config
 from src.models.model_setup import ModelSetup
+from src.models.history import open_history, history_field
 
 
 def metric_conv_plot(
@@ -142,6 +144,34 @@ def coupling_frame(
 
     mask = rem_var(mask)
 
+    # the coupling history of the run, or the files of each iteration for
+    # runs from before it was kept.
+    if os.path.exists(setup.coupling_history()):
+        history = open_history(setup)
+        month = open_dataset(setup.tau_y(it=0)).coords["T"].values[600]
+    else:
+        history = None
+
+    def forcing(name: str, index: int) -> xr.DataArray:
+        """The forcing of an iteration, where the frame plots it."""
+        if history is not None:
+            da = history_field(history, "forcing_" + name).sel(iteration=index)
+            if name in ["taux", "tauy"]:
+                da = da.assign_coords(T=month)
+            return da.drop("iteration")
+        elif name == "taux":
+            return open_dataset(setup.tau_x(it=index)).taux.isel(T=600)
+        elif name == "tauy":
+            return open_dataset(setup.tau_y(it=index)).tauy.isel(T=600)
+        elif name == "dq_df":
+            return open_dataarray(setup.dq_df(it=index)).isel(T=1)
+        elif name == "dq_dt":
+            return open_dataarray(setup.dq_dt(it=index)).isel(T=1)
+        elif name == "ts_clim":
+            return open_dataarray(setup.ts_clim(it=index))
+        else:
+            return open_dataarray(setup.ts_trend(it=index))
+
     def clip(da: xr.DataArray) -> xr.DataArray:
         da = fix_calendar(da.rename("unknown"))
         da = rem_var(da)
@@ -176,7 +206,7 @@ def coupling_frame(
         }
         fig, axs = plt.subplots(3, 2, figsize=get_dim(ratio=(5 ** 0.5 - 1) / 2 * 1.5))
         plt.suptitle("Iteration: " + str(index))
-        da = clip(add_units(open_dataset(setup.tau_y(it=index)).tauy.isel(T=600)))
+        da = clip(add_units(forcing("tauy", index)))
         da.plot(
             ax=axs[0, 0],
             cmap=cmap("delta"),
@@ -187,7 +217,7 @@ def coupling_frame(
         date = datetime360_to_str(da.coords["T"].values)
         axs[0, 0].set_title(date + r" $\tau_y$ [Pa]")
         axs[0, 0].set_xlabel("")
-        da = clip(add_units(open_dataset(setup.tau_x(it=index)).taux.isel(T=600)))
+        da = clip(add_units(forcing("taux", index)))
         da.plot(
             ax=axs[0, 1],
             cmap=cmap("delta"),
@@ -199,7 +229,7 @@ def coupling_frame(
         axs[0, 1].set_title(date + r" $\tau_x$ [Pa]")
         axs[0, 1].set_xlabel("")
         axs[0, 1].set_ylabel("")
-        clip(add_units(open_dataarray(setup.dq_df(it=index)).isel(T=1))).plot(
+        clip(add_units(forcing("dq_df", index))).plot(
             ax=axs[1, 0],
             cmap=cmap("sst"),
             vmin=180,
@@ -208,13 +238,13 @@ def coupling_frame(
         )
         axs[1, 0].set_title(r"$\frac{dQ}{df}$ [W m$^{-2}$]")
         axs[1, 0].set_xlabel("")
-        clip(add_units(open_dataarray(setup.dq_dt(it=index)).isel(T=1))).plot(
+        clip(add_units(forcing("dq_dt", index))).plot(
             ax=axs[1, 1], cmap=cmap("sst"), vmin=0, vmax=7.5, cbar_kwargs=cbar_dict
         )
         axs[1, 1].set_title(r"$\frac{dQ}{dT}$ [W m$^{-2}$ K$^{-1}$]")
         axs[1, 1].set_xlabel("")
         axs[1, 1].set_ylabel("")
-        clip(add_units(open_dataarray(setup.ts_clim(it=index)))).plot(
+        clip(add_units(forcing("ts_clim", index))).plot(
             ax=axs[2, 0],
             cmap=cmap("sst"),
             vmin=270,
@@ -222,7 +252,7 @@ def coupling_frame(
             cbar_kwargs=cbar_dict,
         )
         axs[2, 0].set_title(r"$\bar{T}_s$ [K]")
-        clip(add_units(open_dataarray(setup.ts_trend(it=index)))).plot(
+        clip(add_units(forcing("ts_trend", index))).plot(
             ax=axs[2, 1], cmap=cmap("delta"), vmin=-5, vmax=5, cbar_kwargs=cbar_dict
         )
         axs[2, 1].set_title(r"$\Delta T_s$ [$\Delta$ K]")
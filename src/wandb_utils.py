@@ -11,7 +11,7 @@ from uncertainties import ufloat
 from omegaconf import DictConfig, OmegaConf
 from subprocess import PIPE, run
 from src.utils import timeit, in_notebook
-from src.constants import DATA_PATH, run_path, DEFAULT_PROJECT
+from src.constants import DATA_PATH, run_path, DEFAULT_PROJECT, BLOW_UP_LIMITS
 from src.models.model_setup import ModelSetup
 from src.model_utils.mem_to_input import mems_to_df
 
@@ -238,8 +238,7 @@ def didnt_blow_up(rn: wandb.apis.public.Run) -> bool:
     Returns:
         bool: whether there was any blow up during the run.
     """
-    # limits (degrees celsius).
-    limits = {"mean_pac": [15, 30], "mean_nino3.4": [20, 30]}
+    limits = BLOW_UP_LIMITS
     results = []
     rn_hist = rn.scan_history(keys=list(limits.keys()))
     for region in limits:
@@ -1,6 +1,7 @@
 """Utilities around opening and processing netcdfs from this project."""
 import numpy as np
 import pathlib
+from functools import lru_cache
 from typing import Union, Tuple, Optional, Literal
 import xarray as xr
 from uncertainties import ufloat
@@ -313,6 +314,22 @@ def open_dataarray(path: Union[str, pathlib.Path]) -> xr.DataArray:
     return fix_calendar(can_coords(xr.open_dataarray(str(path), decode_times=False)))
 
 
+@lru_cache(maxsize=16)
+def _taper_weights(lats: Tuple[float, ...]) -> np.ndarray:
+    """Weights of the latitude taper, 1 within 20° and 0 beyond 25°.
+
+    Args:
+        lats (Tuple[float, ...]): the latitudes, as a tuple so they can be cached.
+
+    Returns:
+        np.ndarray: read only weights, one per latitude.
+    """
+    abs_lat = np.abs(np.array(lats, dtype="float64"))
+    weights = 1.0 - np.clip(0.2 * (abs_lat - 20), 0.0, 1.0)
+    weights.setflags(write=False)
+    return weights
+
+
 def cut_and_taper(
     da: xr.DataArray,
     y_var: str = "Y",
@@ -323,10 +340,12 @@ def cut_and_taper(
 
     Since the atmosphere model dynamics are only applicable
     in the tropics, the computed wind stress anomaly is only
-    applied to the ocean model between 20° S and 20° N, and
-    is linearly tapered to zero at 25° S and 25° N.
+    applied to the ocean model between 20° S and 20° N, and
+    is linearly tapered to zero at 25° S and 25° N.
 
-    Currently only copes if the array is two dimensional.
+    The taper only depends on latitude, so it is a profile of weights
+    along `y_var`, cached for each latitude axis, which is broadcast over
+    any other dimensions (e.g. time or ensemble member).
 
     Args:
         da (xr.DataArray): The datarray.
@@ -334,7 +353,8 @@ def cut_and_taper(
         x_var (str, optional): The name of the X coordinate. Defaults to "X".
 
     Returns:
-        xr.DataArray: The datarray with the function applied.
+        xr.DataArray: The datarray with the function applied,
+            with `y_var` and `x_var` as the last two dimensions.
 
     Example:
         Should achieve::
@@ -351,27 +371,19 @@ def cut_and_taper(
             from src.xr_utils import open_dataset, cut_and_taper
             from src.constants import OCEAN_DATA_PATH
             da_new: xr.DataArray = open_dataset(OCEAN_DATA_PATH / "qflx.nc").qflx
-            cut_and_taper(da_new.isel(Z=0, T=0, variable=0))
+            cut_and_taper(da_new.isel(Z=0, variable=0))
 
     """
     # make sure that they are in the correct order.
-    # TODO: More global checking of order would improve relaibility.
-    da = da.transpose(y_var, x_var)
-
-    @np.vectorize
-    def test_vec(x: float, y: float):
-        if y > 25 or y < -25:
-            x = 0.0
-        elif 20 <= y <= 25:
-            x = x - (0.2 * (y - 20)) * x
-        elif -20 >= y >= -25:
-            x = x - (0.2 * (-y - 20)) * x
-        return x
-
-    for x in range(len(da.coords[x_var].values)):
-        da[:, x] = test_vec(da[:, x], da.coords[y_var])
-
-    return da
+    da = da.transpose(..., y_var, x_var)
+    weights = xr.DataArray(
+        _taper_weights(tuple(da.coords[y_var].values.tolist())),
+        dims=(y_var,),
+        coords={y_var: da.coords[y_var]},
+    )
+    # cut to zero, even where the field is NaN.
+    tapered = da.where(weights != 0, 0.0) * weights
+    return tapered.rename(da.name).assign_attrs(da.attrs)
 
 
 def spatial_mean(da: xr.DataArray) -> xr.DataArray: